@@ -0,0 +1,325 @@
+import logging
+import datetime
+from collections import defaultdict
+
+import pandas as pd
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, UniqueConstraint, select, insert, delete
+
+from database import Base, engine, register_ingest_listener, IN_CLAUSE_CHUNK
+from grant_processor import split_tags, TAG_SEPARATOR
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Most grants listed in one digest; the rest are summarized as a count
+DIGEST_MAX_GRANTS = 50
+
+
+# Define the saved searches table
+class SavedSearch(Base):
+    __tablename__ = 'saved_searches'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    subscriber = Column(String(255), nullable=False)  # email address or Slack channel
+    channel = Column(String(16), nullable=False, default="email")  # "email" or "slack"
+    tags = Column(Text, nullable=True)  # required tags, e.g. "Geography:NY|Topic:Tech"
+    min_award = Column(Float, nullable=True)
+    max_award = Column(Float, nullable=True)
+    deadline_within_days = Column(Integer, nullable=True)
+    keywords = Column(Text, nullable=True)  # all must appear in the title or description
+    active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
+
+# Grants already alerted per saved search, so a grant is announced once
+class AlertLog(Base):
+    __tablename__ = 'alert_log'
+    __table_args__ = (UniqueConstraint('search_id', 'grant_key'),)
+
+    id = Column(Integer, primary_key=True)
+    search_id = Column(Integer, nullable=False)
+    grant_key = Column(String(255), nullable=False)
+    alerted_at = Column(DateTime, default=datetime.datetime.now)
+
+
+def create_alert_tables():
+    """Create the saved search tables if they don't exist."""
+    if engine is None:
+        logging.error("Cannot create alert tables: database engine not initialized")
+        return False
+    try:
+        Base.metadata.create_all(engine, tables=[SavedSearch.__table__, AlertLog.__table__])
+        return True
+    except Exception as e:
+        logging.error(f"Error creating alert tables: {str(e)}")
+        return False
+
+
+def add_saved_search(name, subscriber, tags=None, min_award=None, max_award=None,
+                     deadline_within_days=None, keywords=None, channel="email"):
+    """
+    Save an alert query.
+
+    Args:
+        name (str): Label shown in digests, e.g. "NY tech, $100k+"
+        subscriber (str): Email address, or Slack channel when channel is "slack"
+        tags (list): Required tags as "Dimension:tag" strings or (dimension, tag) tuples
+        min_award (float), max_award (float): Award amount bounds
+        deadline_within_days (int): Only grants closing within this many days of the ingest
+        keywords (list): Words that must all appear in the title or description
+        channel (str): "email" or "slack"
+
+    Returns:
+        int: Id of the saved search, or None on error
+    """
+    if not create_alert_tables():
+        return None
+
+    tag_text = TAG_SEPARATOR.join(
+        tag if isinstance(tag, str) else f"{tag[0]}:{tag[1]}" for tag in (tags or [])
+    ) or None
+    keyword_text = " ".join(keyword.lower() for keyword in (keywords or [])) or None
+
+    try:
+        with engine.begin() as connection:
+            result = connection.execute(insert(SavedSearch).values(
+                name=name, subscriber=subscriber, channel=channel, tags=tag_text,
+                min_award=min_award, max_award=max_award,
+                deadline_within_days=deadline_within_days, keywords=keyword_text,
+                active=True, created_at=datetime.datetime.now()
+            ))
+        logging.info(f"Saved search '{name}' for {subscriber}")
+        return result.inserted_primary_key[0]
+    except Exception as e:
+        logging.error(f"Error saving search: {str(e)}")
+        return None
+
+
+def remove_saved_search(search_id):
+    """Delete a saved search and its alert history."""
+    try:
+        with engine.begin() as connection:
+            connection.execute(delete(AlertLog).where(AlertLog.search_id == search_id))
+            connection.execute(delete(SavedSearch).where(SavedSearch.id == search_id))
+        return True
+    except Exception as e:
+        logging.error(f"Error removing saved search: {str(e)}")
+        return False
+
+
+def load_saved_searches():
+    """Return the active saved searches as a DataFrame (empty if none or on error)."""
+    if engine is None or not create_alert_tables():
+        return pd.DataFrame()
+    try:
+        with engine.connect() as connection:
+            return pd.read_sql(select(SavedSearch).where(SavedSearch.active.is_(True)), connection)
+    except Exception as e:
+        logging.error(f"Error loading saved searches: {str(e)}")
+        return pd.DataFrame()
+
+
+class AlertIndex:
+    """
+    Percolator over saved searches.
+
+    Instead of running every saved search against the grant table, the searches themselves
+    are indexed by their required tags. Each incoming grant looks up only the searches that
+    share one of its tags and counts hits per search; a search whose every tag was hit is a
+    candidate, and only candidates have their award, deadline and keyword conditions checked.
+    Searches with no tags are checked against every grant.
+    """
+
+    def __init__(self, searches):
+        self.searches = {}
+        self.required = {}
+        self.by_tag = defaultdict(list)
+        self.untagged = []
+
+        for search in searches.to_dict("records") if not searches.empty else []:
+            search_id = search["id"]
+            self.searches[search_id] = search
+            tags = set(split_tags(search.get("tags")))
+            self.required[search_id] = len(tags)
+            if tags:
+                for tag in tags:
+                    self.by_tag[tag].append(search_id)
+            else:
+                self.untagged.append(search_id)
+
+    def __len__(self):
+        return len(self.searches)
+
+    def _conditions_hold(self, search, grant, now):
+        amount = grant.get("Award Amount")
+        if search.get("min_award") is not None and not pd.isna(search["min_award"]):
+            if amount is None or pd.isna(amount) or amount < search["min_award"]:
+                return False
+        if search.get("max_award") is not None and not pd.isna(search["max_award"]):
+            if amount is None or pd.isna(amount) or amount > search["max_award"]:
+                return False
+
+        days = search.get("deadline_within_days")
+        if days is not None and not pd.isna(days):
+            deadline = grant.get("Deadline")
+            if deadline is None or pd.isna(deadline):
+                return False
+            deadline = pd.Timestamp(deadline)
+            if deadline < now or deadline > now + pd.Timedelta(days=int(days)):
+                return False
+
+        keywords = search.get("keywords")
+        if isinstance(keywords, str) and keywords:
+            text = f"{grant.get('Title') or ''} {grant.get('Description') or ''}".lower()
+            if not all(keyword in text for keyword in keywords.split()):
+                return False
+
+        return True
+
+    def match(self, grants_df, now=None):
+        """
+        Match grants against the indexed searches.
+
+        Args:
+            grants_df (pandas.DataFrame): Tagged grants (with a "Tags" column)
+            now (datetime): Reference time for deadline windows (defaults to now)
+
+        Returns:
+            dict: search id -> list of matching grant records
+        """
+        now = pd.Timestamp(now or datetime.datetime.now())
+        matches = defaultdict(list)
+        if not self.searches or grants_df.empty:
+            return matches
+
+        for grant in grants_df.to_dict("records"):
+            tags = grant.get("Tags")
+            if isinstance(tags, str):
+                grant_tags = set(split_tags(tags))
+            else:
+                grant_tags = {
+                    (dimension, grant[dimension]) for dimension in ("Geography", "Topic", "Audience")
+                    if isinstance(grant.get(dimension), str)
+                }
+
+            hits = defaultdict(int)
+            for tag in grant_tags:
+                for search_id in self.by_tag.get(tag, ()):
+                    hits[search_id] += 1
+
+            candidates = [search_id for search_id, count in hits.items() if count == self.required[search_id]]
+            for search_id in candidates + self.untagged:
+                if self._conditions_hold(self.searches[search_id], grant, now):
+                    matches[search_id].append(grant)
+
+        return matches
+
+
+def _grant_key(grant):
+    return str(grant.get("Grant ID") or f"{grant.get('Title')}|{grant.get('Funder')}")
+
+
+def _claim_unalerted(connection, matches):
+    """Drop matches already alerted and record the rest in the alert log, in the caller's transaction."""
+    fresh = {}
+    for search_id, grants in matches.items():
+        keys = {_grant_key(grant): grant for grant in grants}
+        key_list = list(keys)
+        seen = set()
+        for start in range(0, len(key_list), IN_CLAUSE_CHUNK):
+            seen.update(connection.execute(
+                select(AlertLog.grant_key).where(
+                    AlertLog.search_id == search_id,
+                    AlertLog.grant_key.in_(key_list[start:start + IN_CLAUSE_CHUNK])
+                )
+            ).scalars())
+        new_keys = [key for key in keys if key not in seen]
+        if new_keys:
+            now = datetime.datetime.now()
+            connection.execute(insert(AlertLog), [
+                {"search_id": search_id, "grant_key": key, "alerted_at": now} for key in new_keys
+            ])
+            fresh[search_id] = [keys[key] for key in new_keys]
+    return fresh
+
+
+def _format_grant(grant):
+    amount = grant.get("Award Amount")
+    deadline = grant.get("Deadline")
+    parts = [f"- {grant.get('Title')} ({grant.get('Funder') or 'Unknown funder'})"]
+    if amount is not None and not pd.isna(amount):
+        parts.append(f"${amount:,.0f}")
+    if deadline is not None and not pd.isna(deadline):
+        parts.append(f"due {pd.Timestamp(deadline):%Y-%m-%d}")
+    line = ", ".join(parts)
+    if grant.get("Link"):
+        line += f"\n  {grant['Link']}"
+    return line
+
+
+def build_digest(searches, matches):
+    """
+    Group matches into one digest per subscriber.
+
+    Returns:
+        dict: (channel, subscriber) -> (subject, body)
+    """
+    sections = defaultdict(list)
+    totals = defaultdict(int)
+    for search_id, grants in matches.items():
+        search = searches[search_id]
+        target = (search["channel"], search["subscriber"])
+        lines = [_format_grant(grant) for grant in grants[:DIGEST_MAX_GRANTS]]
+        if len(grants) > DIGEST_MAX_GRANTS:
+            lines.append(f"... and {len(grants) - DIGEST_MAX_GRANTS} more")
+        sections[target].append(f"{search['name']} ({len(grants)} new)\n" + "\n".join(lines))
+        totals[target] += len(grants)
+
+    return {
+        target: (f"Grant alerts: {totals[target]} new matching grants", "\n\n".join(parts))
+        for target, parts in sections.items()
+    }
+
+
+def process_ingest(changed_df):
+    """
+    Ingest listener: match new or changed grants against saved searches and send digests.
+
+    The alert log is only committed once the digests are in the notification queue, so a
+    failed enqueue leaves the matches unalerted for the next ingest instead of losing them.
+
+    Returns:
+        int: Number of digests queued
+    """
+    searches = load_saved_searches()
+    if searches.empty:
+        return 0
+
+    index = AlertIndex(searches)
+    matches = index.match(changed_df)
+    if not matches:
+        return 0
+
+    from notifications import get_dispatcher
+
+    with engine.begin() as connection:
+        matches = _claim_unalerted(connection, matches)
+        if not matches:
+            return 0
+
+        dispatcher = get_dispatcher()
+        digests = build_digest(index.searches, matches)
+        for (channel, subscriber), (subject, body) in digests.items():
+            if channel == "slack":
+                dispatcher.enqueue_slack(subscriber, f"*{subject}*\n\n{body}")
+            else:
+                dispatcher.enqueue_email(subscriber, subject, body)
+
+    logging.info(f"Queued {len(digests)} alert digests for {sum(len(g) for g in matches.values())} matches")
+    return len(digests)
+
+
+def enable_alerts():
+    """Run saved-search alerts after every grant ingest."""
+    register_ingest_listener(process_ingest)
@@ -0,0 +1,572 @@
+"""
+Read-only JSON API over the grant snapshot.
+
+A plain ASGI application, separate from the Streamlit app, for tools that need grant data
+without scraping the UI:
+
+    GET /grants                 list and filter, soonest deadline first
+    GET /grants/{grant_id}      one grant, including its full description
+    GET /search?q=...           keyword search (BM25), best match first
+    GET /health                 snapshot generation, row count and cache statistics
+
+/grants and /search accept the same filters: source, funder_type, tag (repeatable,
+"Dimension:tag", every tag must match), min_award, max_award, deadline_from and
+deadline_to (YYYY-MM-DD, inclusive). Results come in pages of `limit` grants (default 50,
+at most 500); pass the returned next_cursor as `cursor` to get the next page.
+
+Every response carries an ETag tied to the snapshot generation, so clients revalidating
+with If-None-Match get a 304 until the next ingest. Bodies are compressed with zstd
+(when the zstandard package is installed) or gzip, and recent responses are kept in an
+in-process LRU cache. Run one worker process per core:
+
+    uvicorn api:app --workers 4
+    python api.py --port 8000 --workers 4
+"""
+import os
+import gzip
+import time
+import base64
+import asyncio
+import logging
+import argparse
+import datetime
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qs, unquote
+
+import numpy as np
+import pandas as pd
+
+import json_codec
+from grant_processor import has_tag
+from search import BM25Index, make_snippet, tokenize
+from snapshot_store import snapshot_info, load_snapshot
+
+try:
+    import zstandard
+except ImportError:  # optional; responses fall back to gzip without it
+    zstandard = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Responses kept in the per-process LRU cache
+API_CACHE_SIZE = int(os.getenv("GRANT_API_CACHE_SIZE", "2048"))
+
+# Seconds clients and proxies may reuse a response before revalidating
+API_MAX_AGE = int(os.getenv("GRANT_API_MAX_AGE", "60"))
+
+# How often each worker checks for a new snapshot generation, in seconds
+RELOAD_INTERVAL = float(os.getenv("GRANT_API_RELOAD_INTERVAL", "2"))
+
+# How often the database is re-read when no snapshot is available, in seconds
+DB_RELOAD_INTERVAL = 300
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Fields returned in list and search results; detail responses add the description
+LIST_FIELDS = [
+    "Grant ID", "Title", "Funder", "Funder Type", "Source", "Start Date", "Deadline",
+    "Award Amount", "Eligibility", "Link", "Geography", "Topic", "Audience", "Tags", "Relevance Score"
+]
+DETAIL_FIELDS = LIST_FIELDS + ["Description"]
+
+# Filter masks cached per generation (source, funder type and tag values)
+MASK_CACHE_SIZE = 256
+
+# Sort value for grants without a deadline, so they come last
+NO_DEADLINE = np.iinfo(np.int64).max
+
+FILTER_PARAMS = {"source", "funder_type", "tag", "min_award", "max_award", "deadline_from", "deadline_to"}
+
+
+class ApiError(Exception):
+    """A client error, returned as a JSON body with its HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _grant_keys(grants_df):
+    """Stable per-grant key: the Grant ID, or title and funder for grants without one."""
+    fallback = grants_df.get("Title", pd.Series("", index=grants_df.index)).astype(str) + "|" + \
+        grants_df.get("Funder", pd.Series("", index=grants_df.index)).astype(str)
+    if "Grant ID" not in grants_df.columns:
+        return fallback
+    ids = grants_df["Grant ID"].astype(object)
+    present = ids.notna() & (ids.astype(str).str.len() > 0)
+    return ids.astype(str).where(present, fallback)
+
+
+def _json_ready(grants_df):
+    """Copy of a grants frame holding only JSON-serializable values (ISO dates, None for missing)."""
+    columns = {}
+    for col in grants_df.columns:
+        series = grants_df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.dt.strftime("%Y-%m-%d").astype(object)
+        else:
+            values = series.astype(object)
+        columns[col] = values.where(series.notna(), None)
+    return pd.DataFrame(columns, index=grants_df.index)
+
+
+def encode_cursor(sort_value, key):
+    return base64.urlsafe_b64encode(json_codec.dumps([sort_value, key])).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        sort_value, key = json_codec.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(sort_value, (int, float)) or not isinstance(key, str):
+            raise ValueError("unexpected cursor contents")
+        return sort_value, key
+    except Exception:
+        raise ApiError(400, "Invalid cursor")
+
+
+class GrantCatalog:
+    """
+    One snapshot generation, arranged for API queries.
+
+    Grants are sorted by (deadline, key) once per generation. Listing pages use keyset
+    pagination on that order: a cursor holds the last (deadline, key) served and the next
+    page starts after it via binary search, so deep pages cost the same as the first one
+    and stay consistent while clients page through. Deadline filters narrow the same
+    sorted range; the remaining filters are boolean masks, cached per value.
+    """
+
+    def __init__(self, grants_df, version):
+        self.version = str(version)
+        self.lock = threading.Lock()
+        self.masks = {}
+        self.search_index = None
+
+        df = grants_df.reset_index(drop=True)
+        df["_key"] = _grant_keys(df) if not df.empty else pd.Series(dtype=object)
+        df = df.drop_duplicates("_key", keep="last")
+        if "Deadline" in df.columns:
+            deadlines = pd.to_datetime(df["Deadline"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+            df["_deadline"] = np.where(np.isnat(deadlines), NO_DEADLINE, deadlines.view(np.int64))
+        else:
+            df["_deadline"] = NO_DEADLINE
+        df = df.sort_values(["_deadline", "_key"], kind="mergesort").reset_index(drop=True)
+
+        self.grants = df
+        self.deadlines = df["_deadline"].to_numpy(dtype=np.int64)
+        self.keys = df["_key"].to_numpy(dtype=object)
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+        self.amounts = pd.to_numeric(df.get("Award Amount", pd.Series(np.nan, index=df.index)), errors="coerce").to_numpy(dtype=float)
+
+        # Rows are converted to JSON-ready dicts once, so a page is just a list lookup
+        ready = _json_ready(df[[col for col in DETAIL_FIELDS if col in df.columns]])
+        self.details = ready.to_dict("records")
+        self.summaries = ready[[col for col in LIST_FIELDS if col in ready.columns]].to_dict("records")
+
+    def __len__(self):
+        return len(self.grants)
+
+    def _value_mask(self, column, value):
+        cache_key = (column, value)
+        mask = self.masks.get(cache_key)
+        if mask is None:
+            if column == "Tags":
+                dimension, _, tag = value.partition(":")
+                mask = has_tag(self.grants, dimension, tag).to_numpy(dtype=bool)
+            elif column in self.grants.columns:
+                mask = (self.grants[column].astype(object) == value).to_numpy(dtype=bool)
+            else:
+                mask = np.zeros(len(self.grants), dtype=bool)
+            if len(self.masks) < MASK_CACHE_SIZE:
+                self.masks[cache_key] = mask
+        return mask
+
+    def select(self, filters):
+        """
+        Apply filters.
+
+        Returns:
+            tuple: (lo, hi, mask) where mask covers the sorted positions lo..hi
+        """
+        lo, hi = 0, len(self.grants)
+        if filters.get("deadline_from") is not None:
+            lo = int(np.searchsorted(self.deadlines, filters["deadline_from"].value, side="left"))
+        if filters.get("deadline_to") is not None:
+            end = filters["deadline_to"] + pd.Timedelta(days=1)
+            hi = int(np.searchsorted(self.deadlines, end.value, side="left"))
+        hi = max(lo, hi)
+
+        mask = np.ones(hi - lo, dtype=bool)
+        for column, param in [("Source", "source"), ("Funder Type", "funder_type")]:
+            if filters.get(param):
+                mask &= self._value_mask(column, filters[param])[lo:hi]
+        for tag in filters.get("tag", []):
+            mask &= self._value_mask("Tags", tag)[lo:hi]
+        amounts = self.amounts[lo:hi]
+        with np.errstate(invalid="ignore"):
+            if filters.get("min_award") is not None:
+                mask &= amounts >= filters["min_award"]
+            if filters.get("max_award") is not None:
+                mask &= amounts <= filters["max_award"]
+        return lo, hi, mask
+
+    def _seek(self, deadline, key):
+        """Sorted position just after (deadline, key)."""
+        lo = int(np.searchsorted(self.deadlines, deadline, side="left"))
+        hi = int(np.searchsorted(self.deadlines, deadline, side="right"))
+        return lo + int(np.searchsorted(self.keys[lo:hi], key, side="right"))
+
+    def list_grants(self, filters, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """One page of filtered grants, soonest deadline first."""
+        lo, hi, mask = self.select(filters)
+        start = lo
+        if cursor:
+            start = min(hi, max(lo, self._seek(*decode_cursor(cursor))))
+
+        hits = np.flatnonzero(mask[start - lo:])[:limit + 1] + start
+        page, more = hits[:limit], len(hits) > limit
+        next_cursor = None
+        if more and len(page):
+            last = page[-1]
+            next_cursor = encode_cursor(int(self.deadlines[last]), self.keys[last])
+
+        return {
+            "total": int(mask.sum()),
+            "count": len(page),
+            "next_cursor": next_cursor,
+            "grants": [self.summaries[position] for position in page]
+        }
+
+    def _search_index(self):
+        # Built on first search of each generation; later searches reuse it
+        with self.lock:
+            if self.search_index is None:
+                self.search_index = BM25Index.from_dataframe(self.grants)
+            return self.search_index
+
+    def search(self, query, filters, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """One page of keyword matches, best first, ties broken by key."""
+        terms = tokenize(query)
+        if not terms:
+            raise ApiError(400, "Query must contain at least one search term")
+
+        # Filters are applied while scoring, so every matching grant is ranked and counted
+        lo, hi, mask = self.select(filters)
+        candidates = None
+        if lo > 0 or hi < len(self.grants) or not mask.all():
+            candidates = set((np.flatnonzero(mask) + lo).tolist())
+        ranked = [
+            (score, self.keys[position], position)
+            for position, score in self._search_index().search(query, limit=None, candidates=candidates)
+        ]
+        ranked.sort(key=lambda hit: (-hit[0], hit[1]))
+        # Counted before the cursor, so every page reports the same total
+        total = len(ranked)
+
+        if cursor:
+            after_score, after_key = decode_cursor(cursor)
+            ranked = [hit for hit in ranked if (-hit[0], hit[1]) > (-after_score, after_key)]
+
+        page = ranked[:limit]
+        records = [dict(self.summaries[position]) for _, _, position in page]
+        descriptions = self.grants["Description"] if "Description" in self.grants.columns else self.grants["Title"]
+        for record, (score, _, position) in zip(records, page):
+            record["Relevance"] = round(float(score), 4)
+            record["Snippet"] = make_snippet(descriptions.iat[position], terms)
+
+        return {
+            "total": total,
+            "count": len(page),
+            "next_cursor": encode_cursor(page[-1][0], page[-1][1]) if len(ranked) > limit else None,
+            "grants": records
+        }
+
+    def detail(self, key):
+        position = self.positions.get(key)
+        if position is None:
+            raise ApiError(404, f"Grant '{key}' not found")
+        return self.details[position]
+
+
+def parse_filters(params):
+    """Validate the filter query parameters shared by /grants and /search."""
+    filters = {"tag": [tag for tag in params.get("tag", []) if tag]}
+    for tag in filters["tag"]:
+        if ":" not in tag:
+            raise ApiError(400, f"Tag '{tag}' must look like Dimension:tag")
+    for name in ("source", "funder_type"):
+        if params.get(name):
+            filters[name] = params[name][-1]
+    for name in ("min_award", "max_award"):
+        if params.get(name):
+            try:
+                filters[name] = float(params[name][-1])
+            except ValueError:
+                raise ApiError(400, f"{name} must be a number")
+    for name in ("deadline_from", "deadline_to"):
+        if params.get(name):
+            try:
+                filters[name] = pd.Timestamp(datetime.date.fromisoformat(params[name][-1]))
+            except ValueError:
+                raise ApiError(400, f"{name} must be a date in YYYY-MM-DD format")
+    return filters
+
+
+def parse_limit(params):
+    try:
+        limit = int(params.get("limit", [DEFAULT_PAGE_SIZE])[-1])
+    except ValueError:
+        raise ApiError(400, "limit must be an integer")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of encoded response bodies, one entry per URL and generation."""
+
+    def __init__(self, max_entries=API_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+def accepted_encoding(header):
+    """Pick the best response encoding a client accepts: zstd, gzip or identity."""
+    accepted = set()
+    for part in header.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+    if zstandard is not None and "zstd" in accepted:
+        return "zstd"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def compress(body, encoding):
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return body
+
+
+class CachedResponse:
+    """A response body plus its compressed variants, produced on first request for each."""
+
+    def __init__(self, status, body):
+        self.status = status
+        self.bodies = {"identity": body}
+
+    def body(self, encoding):
+        if len(self.bodies["identity"]) < COMPRESS_MIN_BYTES:
+            encoding = "identity"
+        body = self.bodies.get(encoding)
+        if body is None:
+            body = self.bodies[encoding] = compress(self.bodies["identity"], encoding)
+        return encoding, body
+
+
+class GrantApi:
+    """
+    ASGI application serving the latest grant snapshot.
+
+    Each worker process holds the current generation in memory and checks the snapshot
+    pointer every RELOAD_INTERVAL seconds, swapping in the new generation (and dropping
+    its response cache) after an ingest. Without a snapshot it reads the database.
+    """
+
+    def __init__(self, catalog=None, cache_size=API_CACHE_SIZE):
+        self.catalog = catalog
+        self.static = catalog is not None
+        self.cache = ResponseCache(cache_size)
+        self.checked_at = 0.0
+        self.reload_lock = threading.Lock()
+
+    def _reload_due(self):
+        return not self.static and (self.catalog is None or time.monotonic() - self.checked_at >= RELOAD_INTERVAL)
+
+    def refresh(self):
+        """Load the latest snapshot generation if it differs from the one being served."""
+        with self.reload_lock:
+            if not self._reload_due():
+                return self.catalog
+            self.checked_at = time.monotonic()
+
+            info = snapshot_info()
+            if info is not None:
+                if self.catalog is not None and self.catalog.version == str(info["generation"]):
+                    return self.catalog
+                grants_df, version = load_snapshot(), info["generation"]
+            elif self.catalog is not None and not self.catalog.version.startswith("db-"):
+                return self.catalog
+            elif self.catalog is not None and time.time() - float(self.catalog.version[3:]) < DB_RELOAD_INTERVAL:
+                return self.catalog
+            else:
+                from database import load_grants_from_db
+
+                grants_df, version = load_grants_from_db(), f"db-{time.time():.0f}"
+
+            try:
+                self.catalog = GrantCatalog(grants_df, version)
+                self.cache.clear()
+                logging.info(f"API serving {len(self.catalog)} grants (generation {version})")
+            except Exception as e:
+                logging.error(f"Error loading grants for the API: {str(e)}")
+                if self.catalog is None:
+                    self.catalog = GrantCatalog(pd.DataFrame(), "empty")
+            return self.catalog
+
+    def handle(self, catalog, path, params):
+        """Route a GET request; returns (status, payload)."""
+        if path in ("/grants", "/grants/"):
+            unknown = set(params) - FILTER_PARAMS - {"cursor", "limit"}
+            if unknown:
+                raise ApiError(400, f"Unknown parameters: {', '.join(sorted(unknown))}")
+            cursor = params.get("cursor", [None])[-1]
+            return 200, catalog.list_grants(parse_filters(params), cursor, parse_limit(params))
+
+        if path.startswith("/grants/"):
+            return 200, catalog.detail(unquote(path[len("/grants/"):]))
+
+        if path == "/search":
+            query = params.get("q", [""])[-1]
+            cursor = params.get("cursor", [None])[-1]
+            return 200, catalog.search(query, parse_filters(params), cursor, parse_limit(params))
+
+        if path == "/health":
+            return 200, {"generation": catalog.version, "grants": len(catalog), "cache": self.cache.stats()}
+
+        raise ApiError(404, "Not found")
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await asyncio.to_thread(self.refresh)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope.get("headers", [])}
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            return await self._send(send, method, 405, json_codec.dumps({"error": "Method not allowed"}), extra=[(b"allow", b"GET, HEAD")])
+
+        if self._reload_due():
+            await asyncio.to_thread(self.refresh)
+        catalog = self.catalog
+
+        path = scope["path"]
+        etag = f'W/"{catalog.version}"'
+
+        query_string = scope.get("query_string", b"").decode("latin-1")
+        params = parse_qs(query_string, keep_blank_values=True)
+        cache_key = (catalog.version, path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        entry = self.cache.get(cache_key) if path != "/health" else None
+
+        if entry is None:
+            try:
+                status, payload = await asyncio.to_thread(self.handle, catalog, path, params)
+            except ApiError as e:
+                status, payload = e.status, {"error": e.message}
+            except Exception as e:
+                logging.error(f"Error handling API request {path}?{query_string}: {str(e)}")
+                status, payload = 500, {"error": "Internal server error"}
+            entry = CachedResponse(status, json_codec.dumps(payload))
+            if status == 200 and path != "/health":
+                self.cache.put(cache_key, entry)
+
+        # Only a request that would succeed can be answered "not modified"; bad paths and queries get their error
+        if entry.status == 200 and path != "/health":
+            if_none_match = headers.get("if-none-match", "")
+            if if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]:
+                return await self._send(send, method, 304, b"", etag=etag)
+
+        encoding, body = entry.body(accepted_encoding(headers.get("accept-encoding", "")))
+        await self._send(send, method, entry.status, body, etag=etag if entry.status == 200 else None, encoding=encoding)
+
+    async def _send(self, send, method, status, body, etag=None, encoding="identity", extra=()):
+        response_headers = [(b"vary", b"Accept-Encoding")]
+        if status != 304:
+            response_headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        if etag:
+            response_headers += [
+                (b"etag", etag.encode()),
+                (b"cache-control", f"public, max-age={API_MAX_AGE}".encode())
+            ]
+        if encoding != "identity":
+            response_headers.append((b"content-encoding", encoding.encode()))
+        response_headers.extend(extra)
+
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+        await send({"type": "http.response.body", "body": b"" if method == "HEAD" or status == 304 else body})
+
+
+app = GrantApi()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the grant snapshot as a read-only JSON API")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        logging.error("uvicorn is not installed; run `pip install uvicorn` or serve api:app with another ASGI server")
+        return 1
+
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,30 +1,92 @@
 import streamlit as st
 import pandas as pd
-from foundation_grants_scraper import fetch_foundation_grants
+from deadline_index import DeadlineIndex
+from grant_processor import has_tag, split_tags
+from search import BM25Index, search_dataframe
+from snapshot_store import shared_snapshot_with_generation
 
 st.set_page_config(page_title="Grant Tracker MVP", layout="wide")
 st.title("📊 Pursuit Grant Tracker (MVP)")
 
-# Fetch live grants on load
-df = fetch_foundation_grants()
+# Start from the last good snapshot; only fetch live grants if there is none. The
+# scraper (requests, BeautifulSoup) is imported only then, to keep cold starts short.
+generation, df = shared_snapshot_with_generation()
+if df.empty:
+    from foundation_grants_scraper import fetch_foundation_grants
+    df = fetch_foundation_grants()
+    generation = None
+
+
+@st.cache_resource(max_entries=2)
+def cached_search_index(generation, _grants_df):
+    """BM25 index over every loaded grant, built once per snapshot generation."""
+    return BM25Index.from_dataframe(_grants_df)
+
+
+@st.cache_resource(max_entries=2)
+def cached_deadline_index(generation, _grants_df):
+    """Deadline index over every loaded grant, built once per snapshot generation."""
+    return DeadlineIndex(_grants_df)
+
+
+def search_index():
+    # Live-fetched grants have no generation to key a cache on
+    if generation is None:
+        return BM25Index.from_dataframe(df)
+    return cached_search_index(generation, df)
+
+
+def deadline_index():
+    if generation is None:
+        return DeadlineIndex(df)
+    return cached_deadline_index(generation, df)
+
+
+def tag_options(dimension):
+    """Every tag seen in a dimension, including secondary tags from the "Tags" column."""
+    values = set(df[dimension].dropna().unique().tolist())
+    if "Tags" in df.columns:
+        for tags in df["Tags"].dropna().unique():
+            values.update(tag for dim, tag in split_tags(tags) if dim == dimension)
+    return ["All"] + sorted(values)
+
 
 # Sidebar filters
 st.sidebar.header("Filters")
-geos = ["All"] + sorted(df["Geography"].unique().tolist())
+query = st.sidebar.text_input("Search", placeholder="e.g. coding bootcamp adults")
+
+geos = tag_options("Geography")
 sel_geo = st.sidebar.selectbox("Geography", geos)
-topics = ["All"] + sorted(df["Topic"].unique().tolist())
+topics = tag_options("Topic")
 sel_topic = st.sidebar.selectbox("Topic", topics)
 types = ["All"] + sorted(df["Funder Type"].unique().tolist())
 sel_type = st.sidebar.selectbox("Funder Type", types)
+closing_days = st.sidebar.slider("Closes within (days, 0 = any)", min_value=0, max_value=365, value=0)
+sort_options = (["Mission relevance"] if "Relevance Score" in df.columns else []) + ["Deadline", "Award Amount"]
+sort_by = st.sidebar.selectbox("Sort by", sort_options)
 
-# Apply filters
-filtered = df.copy()
+# Apply filters; the deadline window comes back sorted by deadline
+if closing_days:
+    filtered = deadline_index().upcoming(closing_days).copy()
+else:
+    filtered = df.copy()
 if sel_geo != "All":
-    filtered = filtered[filtered["Geography"] == sel_geo]
+    filtered = filtered[has_tag(filtered, "Geography", sel_geo)]
 if sel_topic != "All":
-    filtered = filtered[filtered["Topic"] == sel_topic]
+    filtered = filtered[has_tag(filtered, "Topic", sel_topic)]
 if sel_type != "All":
     filtered = filtered[filtered["Funder Type"] == sel_type]
+if query:
+    # Rank against the cached index over all grants, then keep the filtered ones; results stay in match order
+    matches = search_dataframe(df, query, index=search_index())
+    filtered = matches[matches.index.isin(filtered.index)]
+elif sort_by == "Mission relevance":
+    # Scores are stored at ingest, so sorting needs no model
+    filtered = filtered.sort_values("Relevance Score", ascending=False, na_position="last")
+elif sort_by == "Award Amount":
+    filtered = filtered.sort_values("Award Amount", ascending=False, na_position="last")
+elif not closing_days:
+    filtered = filtered.sort_values("Deadline", na_position="last")
 
 # Display results
 st.subheader(f"🔍 {len(filtered)} Grants Found")
@@ -0,0 +1 @@
+"""Benchmarks for the grant tracker pipeline. Run individual modules with `python -m benchmarks.<name>`."""
@@ -0,0 +1,65 @@
+"""Request handling in the read-only API, driven in-process without an HTTP server."""
+import asyncio
+
+import pytest
+
+from api import GrantApi, GrantCatalog
+
+# One loop for every call, so timings measure the app rather than loop setup
+_loop = asyncio.new_event_loop()
+
+
+@pytest.fixture(scope="module")
+def catalog(tagged_corpus):
+    return GrantCatalog(tagged_corpus, "bench")
+
+
+def call(app, path, query="", headers=()):
+    """Run one GET through the ASGI app; returns (status, headers, body)."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+        "headers": [(name.encode(), value.encode()) for name, value in headers]
+    }
+    _loop.run_until_complete(app(scope, receive, send))
+    return messages[0]["status"], dict(messages[0]["headers"]), messages[1]["body"]
+
+
+def bench_build_catalog(benchmark, tagged_corpus):
+    catalog = benchmark(GrantCatalog, tagged_corpus, "bench")
+    assert len(catalog) <= len(tagged_corpus)
+
+
+def bench_list_page_uncached(benchmark, catalog):
+    app = GrantApi(catalog, cache_size=0)
+    status, _, _ = benchmark(call, app, "/grants", "limit=50&tag=Topic:Tech&min_award=10000")
+    assert status == 200
+
+
+def bench_list_page_cached(benchmark, catalog):
+    app = GrantApi(catalog)
+    call(app, "/grants", "limit=50&tag=Topic:Tech", [("accept-encoding", "gzip")])
+    status, headers, _ = benchmark(call, app, "/grants", "limit=50&tag=Topic:Tech", [("accept-encoding", "gzip")])
+    assert status == 200 and headers[b"content-encoding"] == b"gzip"
+
+
+def bench_deep_page(benchmark, catalog):
+    # Keyset cursors make the last page as cheap as the first
+    app = GrantApi(catalog, cache_size=0)
+    last = catalog.list_grants({}, limit=len(catalog) - 1)["grants"][-1]
+    cursor = catalog.list_grants({}, limit=len(catalog) - 2)["next_cursor"]
+    status, _, body = benchmark(call, app, "/grants", f"limit=50&cursor={cursor}")
+    assert status == 200 and last["Grant ID"].encode() in body
+
+
+def bench_not_modified(benchmark, catalog):
+    app = GrantApi(catalog)
+    status, _, _ = benchmark(call, app, "/grants", "limit=50", [("if-none-match", 'W/"bench"')])
+    assert status == 304
@@ -0,0 +1,44 @@
+"""The filters the Streamlit app applies to a loaded snapshot."""
+import datetime
+
+from benchmarks.corpus import REFERENCE_DATE
+from deadline_index import DeadlineIndex
+from grant_processor import has_tag
+from search import search_dataframe
+
+
+def bench_filter_by_tag(benchmark, tagged_corpus):
+    def apply_filters():
+        filtered = tagged_corpus[has_tag(tagged_corpus, "Topic", "Tech")]
+        filtered = filtered[has_tag(filtered, "Geography", "NY")]
+        return filtered[filtered["Funder Type"] == "Foundation"]
+
+    result = benchmark(apply_filters)
+    assert len(result) <= len(tagged_corpus)
+
+
+def bench_build_deadline_index(benchmark, tagged_corpus):
+    index = benchmark(DeadlineIndex, tagged_corpus)
+    assert len(index) <= len(tagged_corpus)
+
+
+def bench_deadline_window(benchmark, tagged_corpus):
+    index = DeadlineIndex(tagged_corpus)
+    result = benchmark(index.upcoming, 30, now=REFERENCE_DATE)
+    assert result["Deadline"].is_monotonic_increasing
+
+
+def bench_deadline_window_pandas(benchmark, tagged_corpus):
+    # Baseline: the mask-and-sort the app did before DeadlineIndex
+    def window():
+        end = REFERENCE_DATE + datetime.timedelta(days=30)
+        deadlines = tagged_corpus["Deadline"]
+        return tagged_corpus[(deadlines >= REFERENCE_DATE) & (deadlines <= end)].sort_values("Deadline")
+
+    result = benchmark(window)
+    assert result["Deadline"].is_monotonic_increasing
+
+
+def bench_search(benchmark, tagged_corpus):
+    result = benchmark(search_dataframe, tagged_corpus, "coding bootcamp adults")
+    assert "Relevance" in result.columns
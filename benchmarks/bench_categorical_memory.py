@@ -0,0 +1,111 @@
+"""
+Memory and storage benchmark for the repeated categorical grant fields.
+
+Compares, per grant row:
+  * in-memory size of the DataFrame with Funder/Source/tag columns as plain strings
+    versus pandas categoricals (what process_grants and load_grants_from_db now return)
+  * on-disk size of a SQLite grants table storing those fields as repeated strings
+    versus integer foreign keys into small lookup tables
+
+    python -m benchmarks.bench_categorical_memory [--rows N ...]
+"""
+import os
+import random
+import sqlite3
+import argparse
+import tempfile
+
+import pandas as pd
+
+from funder_data import FUNDER_CATEGORIES
+from grant_processor import CATEGORICAL_COLUMNS, to_categoricals
+
+SOURCES = ["Grants.gov", "NY Grants Gateway", "Foundation Directory", "Sample Data"]
+TAG_VALUES = {
+    "Geography": ["NY", "National"],
+    "Topic": ["Tech", "Workforce", "Economic Mobility", "Other"],
+    "Audience": ["Youth", "Women", "Immigrants", "Low-income", "Other"],
+    "Funder Type": list(FUNDER_CATEGORIES) + ["Other"]
+}
+
+LOOKUP_FIELDS = ["funder", "source", "geography", "topic", "audience", "funder_type"]
+
+
+def make_grants(rows, seed=42):
+    """Build a processed-and-tagged grants frame with realistic repetition of funders and tags."""
+    rng = random.Random(seed)
+    funders = [name for names in FUNDER_CATEGORIES.values() for name in names]
+    return pd.DataFrame({
+        "Grant ID": [f"GRANT-{i}" for i in range(rows)],
+        "Title": [f"Workforce Program Grant {i}" for i in range(rows)],
+        "Funder": [rng.choice(funders) for _ in range(rows)],
+        "Source": [rng.choice(SOURCES) for _ in range(rows)],
+        **{column: [rng.choice(values) for _ in range(rows)] for column, values in TAG_VALUES.items()}
+    })
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def sqlite_bytes(df, normalized):
+    """Store the categorical fields in a fresh SQLite file and return its size in bytes."""
+    fields = dict(zip(CATEGORICAL_COLUMNS, LOOKUP_FIELDS))
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        connection = sqlite3.connect(path)
+        if normalized:
+            connection.execute("CREATE TABLE lookup (id INTEGER PRIMARY KEY, dimension TEXT, name TEXT, UNIQUE (dimension, name))")
+            names = [f"{field}_id" for field in LOOKUP_FIELDS]
+            column_type = "INTEGER"
+            ids = {}
+            for column, field in fields.items():
+                for name in df[column].unique():
+                    cursor = connection.execute("INSERT INTO lookup (dimension, name) VALUES (?, ?)", (field, name))
+                    ids[(column, name)] = cursor.lastrowid
+            rows = zip(df["Grant ID"], *[[ids[(column, name)] for name in df[column]] for column in fields])
+        else:
+            names = list(LOOKUP_FIELDS)
+            column_type = "TEXT"
+            rows = zip(df["Grant ID"], *[df[column] for column in fields])
+
+        columns = ", ".join(f"{name} {column_type}" for name in names)
+        connection.execute(f"CREATE TABLE grants (id INTEGER PRIMARY KEY, grant_id TEXT, {columns})")
+        # Index the funder column on both layouts, as the Grant model does
+        connection.execute(f"CREATE INDEX ix_grants_funder ON grants ({names[0]})")
+        placeholders = ", ".join("?" * (len(names) + 1))
+        connection.executemany(f"INSERT INTO grants (grant_id, {', '.join(names)}) VALUES ({placeholders})", rows)
+        connection.commit()
+        connection.execute("VACUUM")
+        page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        connection.close()
+        return page_count * page_size
+    finally:
+        os.remove(path)
+
+
+def run(row_counts):
+    print(f"{'rows':>9} {'object B/row':>13} {'category B/row':>15} {'sqlite text B/row':>18} "
+          f"{'sqlite fk B/row':>16}")
+    for rows in row_counts:
+        df = make_grants(rows)
+        fields = df[CATEGORICAL_COLUMNS]
+        object_size = frame_bytes(fields)
+        category_size = frame_bytes(to_categoricals(fields.copy()))
+        text_size = sqlite_bytes(df, normalized=False)
+        fk_size = sqlite_bytes(df, normalized=True)
+        print(f"{rows:>9} {object_size / rows:>13.1f} {category_size / rows:>15.1f} "
+              f"{text_size / rows:>18.1f} {fk_size / rows:>16.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="corpus size; repeatable")
+    args = parser.parse_args(argv)
+    run(args.rows or [1000, 10000, 100000])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Grant upsert and load against a throwaway SQLite database (see conftest.py)."""
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+import database
+
+
+@pytest.fixture(scope="module")
+def open_corpus(tagged_corpus):
+    """The corpus with every deadline moved into the future; ingest skips grants that have closed."""
+    deadlines = tagged_corpus["Deadline"]
+    shift = pd.Timestamp.now().normalize() - deadlines.min() + pd.Timedelta(days=1)
+    return tagged_corpus.assign(Deadline=deadlines + shift)
+
+
+def _reset_database():
+    database.Base.metadata.drop_all(database.engine)
+    with database.engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS grants_fts"))
+
+
+def bench_save_new_grants(benchmark, open_corpus):
+    result = benchmark.pedantic(
+        database.save_grants_to_db, args=(open_corpus,), setup=_reset_database, rounds=3
+    )
+    assert result
+
+
+def bench_save_existing_grants(benchmark, open_corpus):
+    # Re-saving the same grants exercises the update path of the upsert
+    _reset_database()
+    database.save_grants_to_db(open_corpus)
+    result = benchmark.pedantic(database.save_grants_to_db, args=(open_corpus,), rounds=3)
+    assert result
+
+
+def bench_load_grants(benchmark, open_corpus):
+    _reset_database()
+    database.save_grants_to_db(open_corpus)
+    result = benchmark(database.load_grants_from_db)
+    assert len(result) == len(open_corpus)
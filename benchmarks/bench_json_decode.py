@@ -0,0 +1,125 @@
+"""
+Micro-benchmark for Grants.gov response decoding.
+
+Compares the stdlib, orjson and msgspec backends (whichever are installed) on recorded
+search payloads, both for plain JSON decoding and for the full decode-to-grant-records path.
+
+    python -m benchmarks.bench_json_decode [--fixture PATH ...] [--repeat N]
+    python -m benchmarks.bench_json_decode --write-fixture   # regenerate the bundled fixture
+"""
+import os
+import gzip
+import json
+import time
+import random
+import argparse
+import datetime
+
+import json_codec
+import grants_gov_schema
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_FIXTURE = os.path.join(FIXTURE_DIR, "grants_gov_search.json.gz")
+
+AGENCIES = [
+    "Department of Labor", "Department of Education", "National Science Foundation",
+    "Department of Commerce", "Department of Health and Human Services", "Small Business Administration"
+]
+TOPICS = [
+    "workforce development", "technology education", "adult education", "job training",
+    "economic mobility", "computer science", "career development", "digital skills"
+]
+
+
+def make_search_payload(hit_count=2000, seed=42):
+    """Build a search response in the standard oppHits shape with realistic field contents."""
+    rng = random.Random(seed)
+    start = datetime.date(2025, 1, 1)
+    hits = []
+    for i in range(hit_count):
+        topic = rng.choice(TOPICS)
+        open_date = start + datetime.timedelta(days=rng.randint(0, 365))
+        close_date = open_date + datetime.timedelta(days=rng.randint(30, 180))
+        hits.append({
+            "id": str(300000 + i),
+            "oppNum": f"{rng.choice(['DOL', 'ED', 'NSF', 'DOC'])}-{rng.randint(10, 99)}-{i:05d}",
+            "title": f"{topic.title()} Program Grant {i}",
+            "agency": rng.choice(AGENCIES),
+            "agencyCode": rng.choice(["DOL-ETA", "ED-OCTAE", "NSF", "DOC-EDA"]),
+            "description": " ".join(rng.choice(TOPICS) for _ in range(rng.randint(20, 60))),
+            "openDate": open_date.strftime("%m/%d/%Y"),
+            "closeDate": close_date.strftime("%m/%d/%Y"),
+            "awardCeiling": rng.choice([50000, 100000, 250000, 500000, 1000000]),
+            "opportunityCategory": "Discretionary",
+            "eligibleApplicants": ["Nonprofits having a 501(c)(3) status", "State governments"],
+            "fundingActivityCategory": "Employment, Labor and Training",
+            "oppStatus": rng.choice(["posted", "forecasted"]),
+            "docType": "synopsis",
+            "cfdaList": [f"17.{rng.randint(200, 299)}"]
+        })
+    return {"hitCount": hit_count, "startRecord": 0, "oppHits": hits}
+
+
+def load_fixture(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return f.read()
+
+
+def time_call(func, content, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(fixtures, repeat):
+    results = []
+    for path in fixtures:
+        content = load_fixture(path)
+        size_mb = len(content) / 1e6
+
+        for backend in json_codec.AVAILABLE_BACKENDS:
+            seconds = time_call(lambda c: json_codec.loads(c, backend=backend), content, repeat)
+            results.append((os.path.basename(path), f"loads[{backend}]", seconds, size_mb))
+
+        # Full path: generic decode + compiled extractor, versus typed struct decode
+        for backend in json_codec.AVAILABLE_BACKENDS:
+            def decode_records(c, backend=backend):
+                return grants_gov_schema.extract_opportunities(json_codec.loads(c, backend=backend))
+            seconds = time_call(decode_records, content, repeat)
+            results.append((os.path.basename(path), f"records[{backend}]", seconds, size_mb))
+
+        if grants_gov_schema.SearchResponse is not None:
+            seconds = time_call(grants_gov_schema.decode_search_response, content, repeat)
+            results.append((os.path.basename(path), "records[msgspec typed]", seconds, size_mb))
+
+    baseline = {fixture: seconds for fixture, name, seconds, _ in results if name == "loads[stdlib]"}
+    print(f"{'fixture':<28} {'decoder':<24} {'best ms':>9} {'MB/s':>8} {'vs stdlib':>10}")
+    for fixture, name, seconds, size_mb in results:
+        print(f"{fixture:<28} {name:<24} {seconds * 1000:>9.2f} {size_mb / seconds:>8.1f} "
+              f"{baseline[fixture] / seconds:>9.2f}x")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", action="append", help="recorded payload (.json or .json.gz); repeatable")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per decoder (best is reported)")
+    parser.add_argument("--write-fixture", action="store_true", help="regenerate the bundled fixture and exit")
+    args = parser.parse_args(argv)
+
+    if args.write_fixture:
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        with open(DEFAULT_FIXTURE, "wb") as f:
+            f.write(gzip.compress(json.dumps(make_search_payload()).encode(), mtime=0))
+        print(f"Wrote {DEFAULT_FIXTURE}")
+        return
+
+    run(args.fixture or [DEFAULT_FIXTURE], args.repeat)
+
+
+if __name__ == "__main__":
+    main()
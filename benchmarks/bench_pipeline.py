@@ -0,0 +1,30 @@
+"""Processing, tagging, funder classification and relevance scoring over the synthetic corpus."""
+import pytest
+
+from grant_processor import process_grants, tag_grants, determine_funder_type
+from relevance import fit_relevance_model, score_relevance
+
+
+def bench_process_grants(benchmark, raw_corpus):
+    result = benchmark(process_grants, raw_corpus)
+    assert len(result) == len(raw_corpus)
+
+
+def bench_tag_grants(benchmark, raw_corpus):
+    processed = process_grants(raw_corpus)
+    result = benchmark(tag_grants, processed)
+    assert len(result) == len(raw_corpus)
+
+
+def bench_determine_funder_type(benchmark, raw_corpus):
+    # Classify row by row, the cost tag_grants avoids by classifying each distinct funder once
+    funders = raw_corpus["Funder"].tolist()
+    result = benchmark(lambda: [determine_funder_type(funder) for funder in funders])
+    assert len(result) == len(funders)
+
+
+def bench_score_relevance(benchmark, tagged_corpus):
+    pytest.importorskip("sklearn")
+    fit_relevance_model(tagged_corpus)
+    result = benchmark(score_relevance, tagged_corpus)
+    assert result["Relevance Score"].between(0, 1).all()
@@ -0,0 +1,51 @@
+"""Cold start of the Streamlit app, each round in a fresh interpreter."""
+import os
+import re
+import sys
+import subprocess
+
+import pytest
+
+from snapshot_store import write_snapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What app.py imports before its first render
+APP_IMPORTS = "import streamlit, deadline_index, grant_processor, search, snapshot_store"
+
+# Only needed to fetch live grants or query the database, never for the first render
+COLD_START_EXCLUDED = {"sqlalchemy", "requests", "bs4"}
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)$", re.MULTILINE)
+
+FIRST_RENDER = f"""
+import time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({os.path.join(ROOT, "app.py")!r}, default_timeout=120).run()
+assert not app.exception, app.exception
+print(time.perf_counter() - started)
+"""
+
+
+def run_python(code, *flags):
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def bench_import_time(benchmark):
+    result = benchmark.pedantic(run_python, args=(APP_IMPORTS, "-X", "importtime"), rounds=3, iterations=1)
+    modules = {name: int(cumulative) for cumulative, _, name in IMPORTTIME_LINE.findall(result.stderr)}
+    top_level = {name: us for name, us in modules.items() if "." not in name}
+    benchmark.extra_info["import_ms"] = {
+        name: round(us / 1000, 1) for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:10]
+    }
+    assert not COLD_START_EXCLUDED & set(modules)
+
+
+def bench_time_to_first_render(benchmark, tagged_corpus):
+    pytest.importorskip("streamlit.testing.v1")
+    pytest.importorskip("pyarrow")
+    # The app must start from a snapshot, not from a live fetch
+    write_snapshot(tagged_corpus)
+    result = benchmark.pedantic(run_python, args=(FIRST_RENDER,), rounds=3, iterations=1)
+    benchmark.extra_info["first_render_seconds"] = float(result.stdout.strip().splitlines()[-1])
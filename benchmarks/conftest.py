@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+import pytest
+
+# database reads these at import time, so point it at a throwaway SQLite file first
+_BENCH_DIR = tempfile.mkdtemp(prefix="grant-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_BENCH_DIR, 'grants.db')}")
+os.environ.setdefault("GRANT_SNAPSHOT_DIR", os.path.join(_BENCH_DIR, "snapshots"))
+os.environ.setdefault("GRANT_RELEVANCE_MODEL", os.path.join(_BENCH_DIR, "relevance.joblib"))
+
+from benchmarks.corpus import make_corpus  # noqa: E402
+from grant_processor import process_grants, tag_grants  # noqa: E402
+
+# Saved runs go next to this file wherever pytest is started from
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".results")
+
+# Corpus sizes to benchmark; larger sizes are opt-in because tagging 1M rows takes minutes
+BENCH_ROWS = [int(rows) for rows in os.getenv("GRANT_BENCH_ROWS", "1000,10000").split(",")]
+
+
+def pytest_configure(config):
+    # Runs before pytest-benchmark opens its storage; an explicit --benchmark-storage still wins
+    if config.getoption("benchmark_storage") == "file://./.benchmarks":
+        config.option.benchmark_storage = RESULTS_DIR
+
+
+@pytest.fixture(scope="session", params=BENCH_ROWS, ids=lambda rows: f"{rows}rows")
+def raw_corpus(request):
+    return make_corpus(request.param)
+
+
+@pytest.fixture(scope="session")
+def tagged_corpus(raw_corpus):
+    return tag_grants(process_grants(raw_corpus))
@@ -0,0 +1,153 @@
+"""
+Seeded synthetic grant corpus for benchmarks.
+
+Generates raw grants in the shape the fetch_* functions return, with funders drawn from
+FUNDER_CATEGORIES plus federal and state agencies, descriptions built from the same
+vocabulary the tagger matches on, and realistic spreads of dates and award amounts.
+The same seed always yields the same corpus, so timings are comparable between commits.
+
+    python -m benchmarks.corpus --rows 100000 --output corpus.parquet
+"""
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from funder_data import FUNDER_CATEGORIES
+
+# Fixed reference date so generated deadlines do not drift with the wall clock
+REFERENCE_DATE = datetime.datetime(2025, 1, 1)
+
+AGENCIES = {
+    "Grants.gov": [
+        "Department of Labor", "Department of Education", "National Science Foundation",
+        "Department of Commerce", "Department of Health and Human Services", "Small Business Administration"
+    ],
+    "NY Grants Gateway": [
+        "NYS Department of Labor", "Empire State Development", "NYS Office of Temporary and Disability Assistance",
+        "City of New York Department of Youth and Community Development"
+    ]
+}
+
+TITLE_PREFIXES = ["Community", "Regional", "Statewide", "National", "Emerging", "Innovative", "Strategic", "Inclusive"]
+TITLE_SUBJECTS = [
+    "Workforce Development", "Technology Training", "Coding Bootcamp", "Career Pathways", "Digital Skills",
+    "Economic Mobility", "Adult Education", "Apprenticeship", "Job Readiness", "Computer Science Education"
+]
+TITLE_SUFFIXES = ["Grant", "Fund", "Initiative", "Program", "Challenge", "Opportunity", "Award"]
+
+DESCRIPTION_SENTENCES = [
+    "Supports workforce training programs that lead to employment in growing industries.",
+    "Funds technology education and software programming courses for career changers.",
+    "Expands access to coding and computer science instruction in underserved communities.",
+    "Invests in economic mobility strategies that help families move out of poverty.",
+    "Provides job training and career services for low-income adults.",
+    "Prioritizes programs serving adults 24 and older who lack a postsecondary credential.",
+    "Applicants must operate in New York City, including Brooklyn, the Bronx and Queens.",
+    "Open to organizations nationwide working across all states.",
+    "Strengthens financial capability and income growth for working age adults.",
+    "Builds partnerships between employers and training providers to close skills gaps.",
+    "Focuses on equity for marginalized and disadvantaged populations.",
+    "Supports vocational programs aligned with regional economic development plans.",
+    "Funds capacity building for community-based nonprofits.",
+    "Encourages evidence-based models with measurable outcomes.",
+    "Awards may be used for staffing, curriculum development and participant support.",
+    "Grantees report quarterly on enrollment, completion and placement."
+]
+
+ELIGIBILITY_OPTIONS = [
+    "501(c)(3) nonprofits based in the U.S.",
+    "Nonprofits having a 501(c)(3) status, State governments",
+    "Community-based organizations in New York State",
+    "Public and private institutions of higher education",
+    "Workforce development boards and nonprofit intermediaries",
+    None
+]
+
+
+def _funder_pool():
+    """(funder, source, link) triples: foundations and corporations plus government agencies."""
+    pool = []
+    for names in FUNDER_CATEGORIES.values():
+        for name in names:
+            pool.append((name, "Foundation Directory", "https://candid.org"))
+    for source, agencies in AGENCIES.items():
+        link = "https://www.grants.gov" if source == "Grants.gov" else "https://grantsgateway.ny.gov"
+        for agency in agencies:
+            pool.append((agency, source, link))
+    return pool
+
+
+def make_corpus(rows, seed=42):
+    """
+    Build a raw grants DataFrame.
+
+    Args:
+        rows (int): Number of grants (1k to 1M are typical benchmark sizes)
+        seed (int): Random seed; equal seeds give identical corpora
+
+    Returns:
+        pandas.DataFrame: Grants with the standard raw columns (Grant ID, Title, Funder,
+        Description, Start Date, Deadline, Award Amount, Eligibility, Link, Source)
+    """
+    rng = np.random.default_rng(seed)
+
+    def pick(options, size=rows):
+        return np.array(options, dtype=object)[rng.integers(0, len(options), size)]
+
+    funders = _funder_pool()
+    funder_index = rng.integers(0, len(funders), rows)
+    funder_names = np.array([name for name, _, _ in funders], dtype=object)[funder_index]
+    sources = np.array([source for _, source, _ in funders], dtype=object)[funder_index]
+    links = np.array([link for _, _, link in funders], dtype=object)[funder_index]
+
+    titles = pick(TITLE_PREFIXES) + " " + pick(TITLE_SUBJECTS) + " " + pick(TITLE_SUFFIXES)
+    descriptions = pick(DESCRIPTION_SENTENCES)
+    for _ in range(2):
+        descriptions = descriptions + " " + pick(DESCRIPTION_SENTENCES)
+
+    # Openings spread over two years; deadlines two weeks to six months later, 5% unknown
+    start_offsets = rng.integers(-365, 365, rows)
+    deadline_offsets = start_offsets + rng.integers(14, 180, rows)
+    start_dates = np.datetime64(REFERENCE_DATE, "D") + start_offsets.astype("timedelta64[D]")
+    deadlines = (np.datetime64(REFERENCE_DATE, "D") + deadline_offsets.astype("timedelta64[D]")).astype("datetime64[ns]")
+    deadlines[rng.random(rows) < 0.05] = np.datetime64("NaT")
+
+    # Award amounts are heavy-tailed, rounded to the nearest $1,000, 10% unknown
+    amounts = np.round(rng.lognormal(mean=11.5, sigma=1.0, size=rows), -3)
+    amounts[rng.random(rows) < 0.10] = np.nan
+
+    return pd.DataFrame({
+        "Grant ID": [f"SYN-{seed}-{i:07d}" for i in range(rows)],
+        "Title": titles,
+        "Funder": funder_names,
+        "Description": descriptions,
+        "Start Date": start_dates.astype("datetime64[ns]"),
+        "Deadline": deadlines,
+        "Award Amount": amounts,
+        "Eligibility": pick(ELIGIBILITY_OPTIONS),
+        "Link": links,
+        "Source": sources
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000, help="number of grants")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--output", help="write to .parquet or .csv instead of printing a summary")
+    args = parser.parse_args(argv)
+
+    corpus = make_corpus(args.rows, seed=args.seed)
+    if args.output is None:
+        print(corpus.head().to_string())
+        print(f"{len(corpus)} rows, {corpus.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+    elif args.output.endswith(".parquet"):
+        corpus.to_parquet(args.output, index=False)
+    else:
+        corpus.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import os
+import time
+import logging
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import pandas as pd
+
+import http_client
+from instrumentation import timed
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Columns every connector record is normalized to
+GRANT_COLUMNS = [
+    "Grant ID", "Title", "Funder", "Description", "Start Date", "Deadline",
+    "Award Amount", "Eligibility", "Link", "Source"
+]
+
+# Modules that ship built-in connectors. Any module next to this one whose name ends in
+# "_connector", and any module listed in GRANT_CONNECTOR_MODULES, is discovered as well.
+BUILTIN_CONNECTOR_MODULES = [
+    "grants_gov_api",
+    "ny_grants_gateway_scraper",
+    "foundation_grants_scraper"
+]
+
+_registry = {}
+_discovered = False
+_discover_lock = threading.Lock()
+
+
+class GrantConnector:
+    """
+    Base class for a grant source.
+
+    Subclasses set a unique `name`, optionally override the scheduling attributes, and
+    implement `fetch_records` to yield one dict per grant. Register them with
+    `@register_connector`.
+    """
+
+    name = None
+
+    # Refresh cadence and jitter for the scheduler, in seconds
+    interval = 24 * 3600
+    jitter = 60 * 60
+
+    # Upper bound on one fetch of this source, in seconds
+    timeout = 5 * 60
+
+    def fetch_records(self):
+        """Yield raw grant records (dicts keyed by GRANT_COLUMNS names)."""
+        raise NotImplementedError
+
+    def fetch_dataframe(self):
+        """Fetch all records for this source as a normalized DataFrame."""
+        return records_to_dataframe(self.fetch_records())
+
+    def partitions(self):
+        """
+        Independent slices of this source, one ingest job each in the job queue.
+
+        A paged source can return page ranges (JSON-serializable, e.g. {"pages": [1, 10]})
+        so several workers share its refresh. None stands for the whole source.
+        """
+        return [None]
+
+    def fetch_partition(self, partition):
+        """Fetch one slice returned by partitions() as a normalized DataFrame."""
+        return self.fetch_dataframe()
+
+
+def normalize_record(record):
+    """Restrict a record to GRANT_COLUMNS, filling missing or null values with None."""
+    normalized = {}
+    for col in GRANT_COLUMNS:
+        value = record.get(col)
+        if value is not None and not isinstance(value, (list, dict)) and pd.isna(value):
+            value = None
+        normalized[col] = value
+    return normalized
+
+
+def dataframe_records(grants_df):
+    """Yield normalized records from a DataFrame returned by a legacy fetch_* function."""
+    if grants_df is None or grants_df.empty:
+        return
+    for record in grants_df.to_dict("records"):
+        yield normalize_record(record)
+
+
+def records_to_dataframe(records):
+    """Build a DataFrame with the standard grant columns from normalized records."""
+    return pd.DataFrame([normalize_record(record) for record in records], columns=GRANT_COLUMNS)
+
+
+def register_connector(connector_class):
+    """Class decorator adding a connector to the registry under its `name`."""
+    if not connector_class.name:
+        raise ValueError(f"{connector_class.__name__} must define a name")
+    _registry[connector_class.name] = connector_class()
+    return connector_class
+
+
+def discover_connectors():
+    """Import every connector module once so their connectors register themselves."""
+    global _discovered
+
+    with _discover_lock:
+        if _discovered:
+            return
+
+        module_names = list(BUILTIN_CONNECTOR_MODULES)
+
+        here = os.path.dirname(os.path.abspath(__file__))
+        module_names += sorted(
+            filename[:-3] for filename in os.listdir(here) if filename.endswith("_connector.py")
+        )
+
+        extra = os.getenv("GRANT_CONNECTOR_MODULES", "")
+        module_names += [name.strip() for name in extra.split(",") if name.strip()]
+
+        for module_name in module_names:
+            try:
+                importlib.import_module(module_name)
+            except Exception as e:
+                logging.error(f"Error loading connector module {module_name}: {str(e)}")
+
+        _discovered = True
+
+
+def get_connectors(names=None):
+    """
+    Return registered connectors, discovering them on first use.
+
+    Args:
+        names (list): Connector names to return (all if None)
+
+    Returns:
+        dict: Connector name -> connector instance
+    """
+    discover_connectors()
+    if names is None:
+        return dict(_registry)
+
+    unknown = [name for name in names if name not in _registry]
+    if unknown:
+        raise KeyError(f"Unknown connectors: {', '.join(unknown)}")
+    return {name: _registry[name] for name in names}
+
+
+def _run_connector(connector):
+    # Deadlines are per-thread context, so each worker sets its own
+    with http_client.deadline(connector.timeout):
+        return [normalize_record(record) for record in connector.fetch_records()]
+
+
+@timed()
+def fetch_all_sources(names=None, max_workers=None):
+    """
+    Run connectors concurrently and merge their records as they complete.
+
+    Each connector gets its own timeout; one that overruns is reported as timed out and
+    its results are dropped, so total time is bounded by the slowest source's timeout
+    rather than the sum of all sources.
+
+    Args:
+        names (list): Connector names to run (all if None)
+        max_workers (int): Thread pool size (one thread per connector if None)
+
+    Returns:
+        tuple: (pandas.DataFrame of merged records, dict of per-source reports)
+    """
+    connectors = get_connectors(names)
+    if not connectors:
+        return records_to_dataframe([]), {}
+
+    start = time.monotonic()
+    records = []
+    reports = {}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(connectors), thread_name_prefix="connector")
+    futures = {executor.submit(_run_connector, connector): connector for connector in connectors.values()}
+    deadlines = {future: start + connector.timeout for future, connector in futures.items()}
+    pending = set(futures)
+
+    try:
+        while pending:
+            now = time.monotonic()
+            for future in [f for f in pending if deadlines[f] <= now and not f.done()]:
+                connector = futures[future]
+                logging.error(f"Connector {connector.name} timed out after {connector.timeout}s")
+                reports[connector.name] = {"status": "timeout", "records": 0, "duration": round(now - start, 3)}
+                pending.discard(future)
+            if not pending:
+                break
+
+            done, _ = wait(pending, timeout=max(0.0, min(deadlines[f] for f in pending) - now),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                connector = futures[future]
+                duration = round(time.monotonic() - start, 3)
+                try:
+                    source_records = future.result()
+                except Exception as e:
+                    logging.error(f"Connector {connector.name} failed: {str(e)}")
+                    reports[connector.name] = {"status": "failed", "records": 0, "duration": duration}
+                    continue
+
+                records.extend(source_records)
+                reports[connector.name] = {"status": "ok", "records": len(source_records), "duration": duration}
+                logging.info(f"Connector {connector.name} returned {len(source_records)} records in {duration:.1f}s")
+    finally:
+        # Do not wait for timed-out connectors; their HTTP deadline will stop them shortly
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return records_to_dataframe(records), reports
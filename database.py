@@ -1,10 +1,22 @@
 import os
+import json
+import time
 import logging
+import threading
+import contextlib
 import pandas as pd
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text, Table, MetaData, func, or_
+import numpy as np
+from sqlalchemy import (create_engine, Column, Integer, String, Float, DateTime, Text, Table, MetaData, ForeignKey,
+                        UniqueConstraint, Index, func, or_, and_, select, insert, delete, inspect, text, bindparam)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship, aliased, lazyload
 import datetime
+from grant_processor import to_categoricals, split_tags, TAG_DIMENSIONS, TAG_SEPARATOR
+from search import ensure_search_index, index_grants, remove_from_index, query_search_index
+from snapshot_store import write_snapshot, load_snapshot
+from instrumentation import timed, instrument_engine
+from quality_rules import score_quality, CLEANUP_RULES
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,58 +26,658 @@ DATABASE_URL = os.getenv("DATABASE_URL", "")
 if not DATABASE_URL:
     logging.error("DATABASE_URL environment variable not set!")
 
+# Optional read replicas (comma-separated URLs); reads go to them, writes to DATABASE_URL
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+# Seconds after a write during which this process reads from the primary (0 = off)
+READ_YOUR_WRITES_WINDOW = float(os.getenv("DATABASE_READ_YOUR_WRITES", "0"))
+
+# How often a replica's health is re-checked, in seconds
+REPLICA_CHECK_INTERVAL = 30
+
 # Create the SQLAlchemy engine
 try:
     engine = create_engine(DATABASE_URL) if DATABASE_URL else None
+    instrument_engine(engine)
+    replica_engines = [create_engine(url) for url in DATABASE_REPLICA_URLS] if engine is not None else []
+    for replica in replica_engines:
+        instrument_engine(replica)
     Base = declarative_base()
     metadata = MetaData()
 except Exception as e:
     logging.error(f"Error initializing database engine: {str(e)}")
     engine = None
+    replica_engines = []
     Base = None
     metadata = None
 
+# Map DataFrame columns to database columns
+COLUMN_MAPPING = {
+    "Grant ID": "grant_id",
+    "Title": "title",
+    "Description": "description",
+    "Start Date": "start_date",
+    "Deadline": "deadline",
+    "Award Amount": "award_amount",
+    "Eligibility": "eligibility",
+    "Link": "link",
+    "Relevance Score": "relevance_score"
+}
+
+# Column order of grant DataFrames loaded from the database
+GRANT_COLUMNS = [
+    "Grant ID", "Title", "Funder", "Description", "Start Date", "Deadline", "Award Amount",
+    "Eligibility", "Link", "Source", "Geography", "Topic", "Audience", "Funder Type", "Relevance Score"
+]
+
+# Define the lookup tables for repeated values
+class Funder(Base):
+    __tablename__ = 'funders'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False, unique=True)
+
+
+class Source(Base):
+    __tablename__ = 'sources'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False, unique=True)
+
+
+class TagValue(Base):
+    __tablename__ = 'tag_values'
+    __table_args__ = (UniqueConstraint('dimension', 'name'),)
+    
+    id = Column(Integer, primary_key=True)
+    dimension = Column(String(32), nullable=False)
+    name = Column(String(255), nullable=False)
+
+
 # Define the grants table
 class Grant(Base):
     __tablename__ = 'grants'
+    # Never hand out the id of an archived or deleted grant again
+    __table_args__ = {'sqlite_autoincrement': True}
     
     id = Column(Integer, primary_key=True)
     grant_id = Column(String(255), nullable=True)
     title = Column(String(255), nullable=False)
-    funder = Column(String(255), nullable=False)
+    funder_id = Column(Integer, ForeignKey('funders.id'), nullable=False, index=True)
     description = Column(Text, nullable=True)
     start_date = Column(DateTime, nullable=True)
     deadline = Column(DateTime, nullable=True)
     award_amount = Column(Float, nullable=True)
     eligibility = Column(Text, nullable=True)
     link = Column(String(1024), nullable=True)
-    source = Column(String(255), nullable=True)
-    geography = Column(String(255), nullable=True)
-    topic = Column(String(255), nullable=True)
-    audience = Column(String(255), nullable=True)
-    funder_type = Column(String(255), nullable=True)
+    source_id = Column(Integer, ForeignKey('sources.id'), nullable=True)
+    geography_id = Column(Integer, ForeignKey('tag_values.id'), nullable=True)
+    topic_id = Column(Integer, ForeignKey('tag_values.id'), nullable=True)
+    audience_id = Column(Integer, ForeignKey('tag_values.id'), nullable=True)
+    funder_type_id = Column(Integer, ForeignKey('tag_values.id'), nullable=True)
+    relevance_score = Column(Float, nullable=True, index=True)  # similarity to the mission profile, see relevance.py
     created_at = Column(DateTime, default=datetime.datetime.now)
     updated_at = Column(DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
     
+    funder = relationship(Funder, lazy="joined")
+    source = relationship(Source, lazy="joined")
+    geography = relationship(TagValue, foreign_keys=[geography_id], lazy="joined")
+    topic = relationship(TagValue, foreign_keys=[topic_id], lazy="joined")
+    audience = relationship(TagValue, foreign_keys=[audience_id], lazy="joined")
+    funder_type = relationship(TagValue, foreign_keys=[funder_type_id], lazy="joined")
+    
     def to_dict(self):
         return {
             "Grant ID": self.grant_id,
             "Title": self.title,
-            "Funder": self.funder,
+            "Funder": _name(self.funder),
             "Description": self.description,
             "Start Date": self.start_date,
             "Deadline": self.deadline,
             "Award Amount": self.award_amount,
             "Eligibility": self.eligibility,
             "Link": self.link,
-            "Source": self.source,
-            "Geography": self.geography,
-            "Topic": self.topic,
-            "Audience": self.audience,
-            "Funder Type": self.funder_type
+            "Source": _name(self.source),
+            "Geography": _name(self.geography),
+            "Topic": _name(self.topic),
+            "Audience": _name(self.audience),
+            "Funder Type": _name(self.funder_type),
+            "Relevance Score": self.relevance_score
         }
 
 
+# Every tag of every grant, one row per (grant, dimension, tag)
+class GrantTag(Base):
+    __tablename__ = 'grant_tags'
+    __table_args__ = (
+        # Covering index for tag filters: the grant ids come straight from the index
+        Index('ix_grant_tags_dimension_tag_grant', 'dimension', 'tag', 'grant_id'),
+    )
+    
+    grant_id = Column(Integer, ForeignKey('grants.id', ondelete='CASCADE'), primary_key=True)
+    dimension = Column(String(32), primary_key=True)
+    tag = Column(String(255), primary_key=True)
+
+
+# Partial index over grants with a deadline, serving "closes between X and Y" range scans.
+# Index predicates cannot reference now(), so "open" is enforced by sweeping expired
+# grants out to archived_grants instead; what remains indexed is the open set.
+OPEN_DEADLINE_INDEX = Index(
+    'ix_grants_open_deadline', Grant.deadline,
+    postgresql_where=Grant.deadline.isnot(None),
+    sqlite_where=Grant.deadline.isnot(None)
+)
+
+
+# Grants whose deadline has passed, moved out of the hot grants table
+class ArchivedGrant(Base):
+    __tablename__ = 'archived_grants'
+    
+    id = Column(Integer, primary_key=True)
+    grant_row_id = Column(Integer, nullable=True, index=True)  # id the grant had in grants; SQLite may reuse it
+    grant_id = Column(String(255), nullable=True, index=True)
+    title = Column(String(255), nullable=False)
+    funder_id = Column(Integer, ForeignKey('funders.id'), nullable=True)
+    description = Column(Text, nullable=True)
+    start_date = Column(DateTime, nullable=True)
+    deadline = Column(DateTime, nullable=True)
+    award_amount = Column(Float, nullable=True)
+    eligibility = Column(Text, nullable=True)
+    link = Column(String(1024), nullable=True)
+    source_id = Column(Integer, ForeignKey('sources.id'), nullable=True)
+    geography_id = Column(Integer, ForeignKey('tag_values.id'), nullable=True)
+    topic_id = Column(Integer, ForeignKey('tag_values.id'), nullable=True)
+    audience_id = Column(Integer, ForeignKey('tag_values.id'), nullable=True)
+    funder_type_id = Column(Integer, ForeignKey('tag_values.id'), nullable=True)
+    tags = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=datetime.datetime.now)
+
+
+# Append-only log of what each ingest changed. An "insert" revision holds every tracked
+# field; an "update" holds only the fields that changed, as [old, new] pairs. Every
+# REVISION_CHECKPOINT_EVERY-th revision also carries the full state, so rebuilding a
+# grant at a point in time starts from the nearest checkpoint instead of its first insert.
+class GrantRevision(Base):
+    __tablename__ = 'grant_revisions'
+    __table_args__ = (
+        UniqueConstraint('grant_key', 'revision', name='ux_grant_revisions_key_revision'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    grant_row_id = Column(Integer, nullable=False)  # grants.id, kept after the grant is archived or deleted
+    grant_key = Column(String(255), nullable=True, index=True)  # the grant's Grant ID; revisions are numbered per key
+    revision = Column(Integer, nullable=False)
+    kind = Column(String(8), nullable=False)  # "insert" or "update"
+    changes = Column(Text, nullable=False)  # JSON: {field: value} for inserts, {field: [old, new]} for updates
+    checkpoint = Column(Text, nullable=True)  # JSON: every tracked field, on checkpoint revisions
+    ingested_at = Column(DateTime, nullable=False, index=True)
+
+
+# Ingestion work shared by every instance through the database; see job_queue.py
+class IngestJob(Base):
+    __tablename__ = 'ingest_jobs'
+    __table_args__ = (
+        Index('ix_ingest_jobs_claim', 'status', 'run_after'),
+        # At most one queued or running job per source partition, however many instances enqueue it
+        Index(
+            'ux_ingest_jobs_active_key', 'job_key', unique=True,
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')")
+        ),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    job_key = Column(String(255), nullable=False, index=True)  # source name plus partition
+    source = Column(String(64), nullable=False)
+    payload = Column(Text, nullable=True)  # JSON partition passed to the connector; null for the whole source
+    status = Column(String(16), nullable=False, default="queued")  # queued, running, done or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_after = Column(DateTime, nullable=False, default=datetime.datetime.now)
+    lease_owner = Column(String(128), nullable=True)  # host:pid of the worker holding the job
+    lease_token = Column(String(32), nullable=True)  # changes on every claim, so a stale worker cannot finish the job
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    result = Column(Text, nullable=True)  # JSON run report
+    error = Column(Text, nullable=True)
+
+
+def _name(lookup_row):
+    return lookup_row.name if lookup_row is not None else None
+
+
+# DataFrame columns stored through lookup tables: (foreign key column, lookup model, tag dimension)
+LOOKUP_COLUMNS = {
+    "Funder": ("funder_id", Funder, None),
+    "Source": ("source_id", Source, None),
+    "Geography": ("geography_id", TagValue, "Geography"),
+    "Topic": ("topic_id", TagValue, "Topic"),
+    "Audience": ("audience_id", TagValue, "Audience"),
+    "Funder Type": ("funder_type_id", TagValue, "Funder Type")
+}
+
+# Maximum number of values bound into one IN (...) clause
+IN_CLAUSE_CHUNK = 500
+
+# Expired grants archived per transaction by sweep_expired_grants
+SWEEP_BATCH_SIZE = 500
+
+# Every this many revisions of a grant also stores its full state
+REVISION_CHECKPOINT_EVERY = 20
+
+# Derived columns whose changes are not recorded as revisions
+REVISION_IGNORED_COLUMNS = {"Relevance Score"}
+
+# DataFrame name of every grants column tracked in the revision log
+REVISION_FIELDS = {
+    db_col: df_col for df_col, db_col in list(COLUMN_MAPPING.items()) + [
+        (df_col, fk) for df_col, (fk, _, _) in LOOKUP_COLUMNS.items()
+    ] if df_col not in REVISION_IGNORED_COLUMNS
+}
+
+
+def resolve_lookup_ids(session, model, names, dimension=None):
+    """
+    Map lookup names to integer ids, inserting any names not yet in the table.
+    
+    Args:
+        session: Active SQLAlchemy session
+        model: Funder, Source or TagValue
+        names (iterable): Distinct names to resolve
+        dimension (str): Tag dimension, for TagValue only
+        
+    Returns:
+        dict: name -> id
+    """
+    names = [name for name in dict.fromkeys(names) if isinstance(name, str)]
+    ids = {}
+    
+    for start in range(0, len(names), IN_CLAUSE_CHUNK):
+        query = select(model.name, model.id).where(model.name.in_(names[start:start + IN_CLAUSE_CHUNK]))
+        if dimension is not None:
+            query = query.where(model.dimension == dimension)
+        ids.update(dict(session.execute(query).all()))
+    
+    missing = [name for name in names if name not in ids]
+    if missing:
+        extra = {"dimension": dimension} if dimension is not None else {}
+        new_rows = [model(name=name, **extra) for name in missing]
+        try:
+            # Savepoint, since another ingest (e.g. a job queue worker) may add the same names first
+            with session.begin_nested():
+                session.add_all(new_rows)
+        except IntegrityError:
+            return resolve_lookup_ids(session, model, names, dimension)
+        ids.update({row.name: row.id for row in new_rows})
+    
+    return ids
+
+
+def migrate_lookup_columns():
+    """
+    Move a grants table created before the lookup tables onto integer foreign keys.
+    
+    Older databases store funder, source and tag names as strings on every grant row.
+    The distinct names are copied into the lookup tables, the foreign keys are filled in,
+    and the string columns are dropped.
+    """
+    columns = {column["name"] for column in inspect(engine).get_columns("grants")}
+    legacy = [df_col for df_col, (fk, _, _) in LOOKUP_COLUMNS.items() if fk[:-3] in columns]
+    if not legacy:
+        return
+    
+    logging.info(f"Migrating grants columns {legacy} to lookup tables...")
+    
+    with engine.begin() as connection:
+        for df_col in legacy:
+            fk, model, dimension = LOOKUP_COLUMNS[df_col]
+            # The legacy string column is the foreign key name without "_id"
+            old = fk[:-3]
+            table = model.__tablename__
+            
+            if fk not in columns:
+                connection.execute(text(f"ALTER TABLE grants ADD COLUMN {fk} INTEGER REFERENCES {table}(id)"))
+            
+            if dimension is None:
+                connection.execute(text(
+                    f"INSERT INTO {table} (name) SELECT DISTINCT {old} FROM grants "
+                    f"WHERE {old} IS NOT NULL AND {old} NOT IN (SELECT name FROM {table})"
+                ))
+                connection.execute(text(
+                    f"UPDATE grants SET {fk} = (SELECT id FROM {table} WHERE {table}.name = grants.{old})"
+                ))
+            else:
+                connection.execute(text(
+                    f"INSERT INTO {table} (dimension, name) SELECT DISTINCT :dimension, {old} FROM grants "
+                    f"WHERE {old} IS NOT NULL AND {old} NOT IN "
+                    f"(SELECT name FROM {table} WHERE dimension = :dimension)"
+                ), {"dimension": dimension})
+                connection.execute(text(
+                    f"UPDATE grants SET {fk} = (SELECT id FROM {table} "
+                    f"WHERE {table}.dimension = :dimension AND {table}.name = grants.{old})"
+                ), {"dimension": dimension})
+            
+            connection.execute(text(f"ALTER TABLE grants DROP COLUMN {old}"))
+    
+    logging.info("Grants lookup migration complete")
+
+
+def migrate_added_columns():
+    """Add nullable grants columns introduced after the table was created, with their indexes."""
+    existing = {column["name"] for column in inspect(engine).get_columns("grants")}
+    missing = [column for column in Grant.__table__.columns if column.name not in existing and column.nullable]
+    if not missing:
+        return
+    
+    with engine.begin() as connection:
+        for column in missing:
+            logging.info(f"Adding grants column {column.name}")
+            connection.execute(text(f"ALTER TABLE grants ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"))
+    for index in Grant.__table__.indexes:
+        if any(column.name in index.columns for column in missing):
+            index.create(engine, checkfirst=True)
+
+
+def migrate_archived_grants():
+    """
+    Give archive tables created before grant_row_id existed their own id sequence.
+    
+    Their id was the grant's id in grants, which SQLite hands out again once the grant
+    is deleted, so it moves to grant_row_id and new archive rows get generated ids.
+    """
+    existing = {column["name"] for column in inspect(engine).get_columns("archived_grants")}
+    if "grant_row_id" in existing:
+        return
+    
+    logging.info("Migrating archived_grants to generated ids")
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE archived_grants ADD COLUMN grant_row_id INTEGER"))
+        connection.execute(text("UPDATE archived_grants SET grant_row_id = id"))
+        # SQLite generates INTEGER PRIMARY KEY values already; PostgreSQL needs a sequence
+        if engine.dialect.name == "postgresql":
+            connection.execute(text("CREATE SEQUENCE IF NOT EXISTS archived_grants_id_seq OWNED BY archived_grants.id"))
+            connection.execute(text(
+                "SELECT setval('archived_grants_id_seq', COALESCE((SELECT MAX(id) FROM archived_grants), 0) + 1, false)"
+            ))
+            connection.execute(text("ALTER TABLE archived_grants ALTER COLUMN id SET DEFAULT nextval('archived_grants_id_seq')"))
+    for index in ArchivedGrant.__table__.indexes:
+        if "grant_row_id" in index.columns:
+            index.create(engine, checkfirst=True)
+
+
+# Function to copy legacy tag columns into grant_tags
+def backfill_grant_tags():
+    """
+    Seed grant_tags from the single-value tag columns of databases created before it existed.
+    
+    Runs only while grant_tags is empty, so it is a no-op after the first ingest.
+    """
+    with engine.begin() as connection:
+        if connection.execute(select(GrantTag.grant_id).limit(1)).first() is not None:
+            return
+        if connection.execute(select(Grant.id).limit(1)).first() is None:
+            return
+        
+        for dimension, _, _, _ in TAG_DIMENSIONS:
+            db_col = LOOKUP_COLUMNS[dimension][0]
+            rows = (
+                select(Grant.id, TagValue.dimension, TagValue.name)
+                .join(TagValue, getattr(Grant, db_col) == TagValue.id)
+            )
+            connection.execute(insert(GrantTag).from_select(["grant_id", "dimension", "tag"], rows))
+        
+        logging.info("Backfilled grant_tags from existing tag columns")
+
+
+def write_grant_tags(session, grants, tags):
+    """
+    Replace the tags of the given grants with bulk delete and insert statements.
+    
+    Args:
+        session: Active session; grants must already be flushed so they have ids
+        grants (list): Grant rows
+        tags (list): "Tags" value for each grant, as produced by tag_grants
+    """
+    # A grant listed twice in one batch keeps its last tags
+    tags_by_id = {grant.id: value for grant, value in zip(grants, tags)}
+    grant_ids = list(tags_by_id)
+    
+    for start in range(0, len(grant_ids), IN_CLAUSE_CHUNK):
+        chunk = grant_ids[start:start + IN_CLAUSE_CHUNK]
+        session.execute(delete(GrantTag).where(GrantTag.grant_id.in_(chunk)))
+    
+    rows = [
+        {"grant_id": grant_id, "dimension": dimension, "tag": tag}
+        for grant_id, value in tags_by_id.items()
+        for dimension, tag in dict.fromkeys(split_tags(value))
+    ]
+    if rows:
+        session.execute(insert(GrantTag), rows)
+
+
+# Callbacks run after each successful save with the new or changed grants
+_ingest_listeners = []
+
+
+def _revision_value(value):
+    """A column value as stored in revision JSON: ISO datetimes, NaN as null, plain Python scalars."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def write_grant_revisions(session, revisions, ingested_at):
+    """
+    Append one revision per inserted or changed grant, in a single bulk insert.
+    
+    Args:
+        session: Active session; grants must already be flushed so they have ids
+        revisions (list): (grant, diff) pairs; diff is None for a new grant, otherwise
+            {db_col: (old, new)} for the columns the ingest changed
+        ingested_at (datetime): Time recorded on every revision
+    
+    Returns:
+        int: Number of revisions written
+    """
+    lookups = {fk: model for fk, model, _ in LOOKUP_COLUMNS.values()}
+    pending = []
+    for grant, diff in revisions:
+        if diff is not None:
+            diff = {db_col: pair for db_col, pair in diff.items() if pair[0] != pair[1]}
+            if not diff:
+                continue
+        pending.append((grant, diff))
+    if not pending:
+        return 0
+    
+    # Continue each grant's revision numbers from the highest already stored under its
+    # Grant ID. Only grants without one are numbered by row id, which a grant created
+    # after another was deleted may have been given before.
+    def series(grant):
+        return ("key", grant.grant_id) if grant.grant_id else ("row", grant.id)
+    
+    latest = {}
+    for kind, column in (("key", GrantRevision.grant_key), ("row", GrantRevision.grant_row_id)):
+        values = list({value for grant_kind, value in map(series, (grant for grant, _ in pending)) if grant_kind == kind})
+        for start in range(0, len(values), IN_CLAUSE_CHUNK):
+            query = select(column, func.max(GrantRevision.revision)).where(column.in_(values[start:start + IN_CLAUSE_CHUNK]))
+            if kind == "row":
+                query = query.where(GrantRevision.grant_key.is_(None))
+            latest.update({(kind, value): revision for value, revision in session.execute(query.group_by(column))})
+    
+    planned = []
+    lookup_ids = {model: set() for model in lookups.values()}
+    for grant, diff in pending:
+        revision = latest.get(series(grant), 0) + 1
+        latest[series(grant)] = revision
+        full = diff is None or revision % REVISION_CHECKPOINT_EVERY == 0
+        planned.append((grant, diff, revision, full))
+        for fk, model in lookups.items():
+            if full:
+                lookup_ids[model].add(getattr(grant, fk))
+            if diff and fk in diff:
+                lookup_ids[model].update(diff[fk])
+    
+    # Revisions store funder, source and tag names rather than lookup ids
+    names = {}
+    for model, ids in lookup_ids.items():
+        ids = [lookup_id for lookup_id in ids if lookup_id is not None]
+        for start in range(0, len(ids), IN_CLAUSE_CHUNK):
+            chunk = ids[start:start + IN_CLAUSE_CHUNK]
+            for lookup_id, name in session.execute(select(model.id, model.name).where(model.id.in_(chunk))):
+                names[(model, lookup_id)] = name
+    
+    def field_value(db_col, value):
+        model = lookups.get(db_col)
+        if model is not None and value is not None:
+            value = names.get((model, value))
+        return _revision_value(value)
+    
+    rows = []
+    for grant, diff, revision, full in planned:
+        state = None
+        if full:
+            state = {df_col: field_value(db_col, getattr(grant, db_col)) for db_col, df_col in REVISION_FIELDS.items()}
+        if diff is None:
+            changes = state
+        else:
+            changes = {
+                REVISION_FIELDS[db_col]: [field_value(db_col, old), field_value(db_col, new)]
+                for db_col, (old, new) in diff.items()
+            }
+        rows.append({
+            "grant_row_id": grant.id,
+            "grant_key": grant.grant_id,
+            "revision": revision,
+            "kind": "insert" if diff is None else "update",
+            "changes": json.dumps(changes, separators=(",", ":")),
+            "checkpoint": json.dumps(state, separators=(",", ":")) if state is not None and diff is not None else None,
+            "ingested_at": ingested_at
+        })
+    
+    session.execute(insert(GrantRevision), rows)
+    return len(rows)
+
+
+def register_ingest_listener(listener):
+    """
+    Call `listener(changed_df)` after every successful save_grants_to_db.
+    
+    changed_df holds only the saved rows that were new or differed from the stored grant,
+    in the DataFrame format passed to save_grants_to_db. Registering twice is a no-op.
+    """
+    if listener not in _ingest_listeners:
+        _ingest_listeners.append(listener)
+
+
+def unregister_ingest_listener(listener):
+    if listener in _ingest_listeners:
+        _ingest_listeners.remove(listener)
+
+
+def _notify_ingest_listeners(changed_df):
+    if changed_df.empty:
+        return
+    for listener in list(_ingest_listeners):
+        try:
+            listener(changed_df)
+        except Exception as e:
+            logging.error(f"Error in ingest listener {getattr(listener, '__name__', listener)}: {str(e)}")
+
+
+_replica_health = {id(replica): {"healthy": True, "checked_at": 0.0} for replica in replica_engines}
+_replica_turn = 0
+_replica_lock = threading.Lock()
+_last_write_at = None
+
+
+def mark_written():
+    """Note that this process just wrote, opening the read-your-writes window."""
+    global _last_write_at
+    _last_write_at = time.monotonic()
+
+
+def _probe_replica(replica):
+    """Run a trivial query against a replica and record whether it answered."""
+    health = _replica_health[id(replica)]
+    try:
+        with replica.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        if not health["healthy"]:
+            logging.info(f"Read replica {replica.url.render_as_string(hide_password=True)} is back")
+        health["healthy"] = True
+    except Exception as e:
+        if health["healthy"]:
+            logging.warning(f"Read replica {replica.url.render_as_string(hide_password=True)} is down: {str(e)}")
+        health["healthy"] = False
+    health["checked_at"] = time.monotonic()
+    return health["healthy"]
+
+
+def read_engine():
+    """
+    Pick the engine for a read-only query.
+    
+    Replicas are used round-robin, skipping any that failed their last health check;
+    each is re-checked every REPLICA_CHECK_INTERVAL seconds. Reads fall back to the
+    primary when there are no healthy replicas, or inside the read-your-writes window
+    after this process wrote.
+    
+    Returns:
+        Engine: A replica engine, or the primary engine
+    """
+    global _replica_turn
+    if not replica_engines:
+        return engine
+    if READ_YOUR_WRITES_WINDOW > 0 and _last_write_at is not None \
+            and time.monotonic() - _last_write_at < READ_YOUR_WRITES_WINDOW:
+        return engine
+    
+    for _ in range(len(replica_engines)):
+        with _replica_lock:
+            replica = replica_engines[_replica_turn % len(replica_engines)]
+            _replica_turn += 1
+        health = _replica_health[id(replica)]
+        if time.monotonic() - health["checked_at"] >= REPLICA_CHECK_INTERVAL:
+            _probe_replica(replica)
+        if health["healthy"]:
+            return replica
+    return engine
+
+
+@contextlib.contextmanager
+def read_connection():
+    """Connection for read-only queries on a replica, falling back to the primary if it fails to connect."""
+    target = read_engine()
+    try:
+        connection = target.connect()
+    except Exception as e:
+        if target is engine:
+            raise
+        _replica_health[id(target)].update(healthy=False, checked_at=time.monotonic())
+        logging.warning(f"Read replica {target.url.render_as_string(hide_password=True)} is down: {str(e)}")
+        connection = engine.connect()
+    with connection:
+        yield connection
+
+
+def replica_status():
+    """Health of each configured replica as {url, healthy, checked_at} dicts."""
+    return [
+        {"url": replica.url.render_as_string(hide_password=True), **_replica_health[id(replica)]}
+        for replica in replica_engines
+    ]
+
+
 # Function to create all tables
 def create_tables():
     """Create all database tables if they don't exist."""
@@ -74,7 +686,19 @@ def create_tables():
         return False
     
     try:
-        Base.metadata.create_all(engine)
+        try:
+            Base.metadata.create_all(engine)
+        except Exception:
+            # Another process (e.g. a second job queue worker) created some tables in between
+            # this one's existence checks and its CREATE TABLE; the second pass skips them
+            Base.metadata.create_all(engine)
+        migrate_lookup_columns()
+        migrate_added_columns()
+        migrate_archived_grants()
+        backfill_grant_tags()
+        # create_all only indexes tables it creates; add the deadline index to older ones
+        OPEN_DEADLINE_INDEX.create(engine, checkfirst=True)
+        ensure_search_index(engine)
         logging.info("Database tables created successfully")
         return True
     except Exception as e:
@@ -83,10 +707,15 @@ def create_tables():
 
 
 # Function to save grants to the database
+@timed(rows="input")
 def save_grants_to_db(grants_df):
     """
     Save grants from a DataFrame to the database.
     
+    New grants whose deadline has already passed are skipped, so grants moved out by
+    sweep_expired_grants are not inserted again by the next ingest. A grant that comes
+    back with a deadline still ahead is a new round and is saved as a live grant.
+    
     Args:
         grants_df (pandas.DataFrame): DataFrame containing grant data
         
@@ -110,62 +739,102 @@ def save_grants_to_db(grants_df):
         if not create_tables():
             return False
         
-        # Map DataFrame columns to database columns
-        column_mapping = {
-            "Grant ID": "grant_id",
-            "Title": "title",
-            "Funder": "funder",
-            "Description": "description",
-            "Start Date": "start_date",
-            "Deadline": "deadline",
-            "Award Amount": "award_amount",
-            "Eligibility": "eligibility",
-            "Link": "link",
-            "Source": "source",
-            "Geography": "geography",
-            "Topic": "topic",
-            "Audience": "audience",
-            "Funder Type": "funder_type"
-        }
+        # Build DB rows column by column; lookup columns become integer foreign keys
+        records_df = pd.DataFrame(index=grants_df.index)
+        for df_col, db_col in COLUMN_MAPPING.items():
+            if df_col in grants_df.columns:
+                records_df[db_col] = grants_df[df_col]
+        
+        for df_col, (db_col, model, dimension) in LOOKUP_COLUMNS.items():
+            if df_col in grants_df.columns:
+                values = grants_df[df_col].astype("category")
+                ids = resolve_lookup_ids(session, model, values.cat.categories, dimension)
+                # Missing values have code -1, which picks the trailing None
+                id_array = np.array([ids.get(name) for name in values.cat.categories] + [None], dtype=object)
+                records_df[db_col] = id_array[values.cat.codes.to_numpy()]
         
-        # Convert DataFrame to list of dictionaries with DB column names
-        grants_data = []
-        for i, row in grants_df.iterrows():
-            grant_dict = {}
-            for df_col, db_col in column_mapping.items():
-                if df_col in row:
-                    # Handle NaT (Not a Time) values for dates
-                    if pd.isna(row[df_col]) or (isinstance(row[df_col], pd.Timestamp) and pd.isnull(row[df_col])):
-                        grant_dict[db_col] = None
-                    else:
-                        grant_dict[db_col] = row[df_col]
-            grants_data.append(grant_dict)
-        
-        # Insert new grants
-        for grant_data in grants_data:
+        # Convert to list of dictionaries, turning NaN/NaT into None
+        records_df = records_df.astype(object)
+        grants_data = records_df.where(records_df.notna(), None).to_dict("records")
+        
+        # Look up existing grants by grant_id in bulk rather than one query per row
+        existing_by_grant_id = {}
+        grant_ids = list({grant_data["grant_id"] for grant_data in grants_data if grant_data.get("grant_id")})
+        for start in range(0, len(grant_ids), IN_CLAUSE_CHUNK):
+            chunk = grant_ids[start:start + IN_CLAUSE_CHUNK]
+            query = session.query(Grant).options(lazyload("*")).filter(Grant.grant_id.in_(chunk))
+            existing_by_grant_id.update({grant.grant_id: grant for grant in query})
+        
+        # Insert new grants, keeping track of every row we touch for the search index,
+        # of which rows are new or actually changed, for ingest listeners, and of the
+        # changed fields of each grant, for the revision log
+        touched_grants = []
+        touched_tags = []
+        changed_rows = []
+        revisions = {}
+        skipped = 0
+        now = datetime.datetime.now()
+        tags = grants_df["Tags"].tolist() if "Tags" in grants_df.columns else [None] * len(grants_data)
+        for grant_data, grant_tags in zip(grants_data, tags):
             # Check if the grant already exists (by grant_id or title+funder combo)
-            if "grant_id" in grant_data and grant_data["grant_id"]:
-                existing_grant = session.query(Grant).filter_by(grant_id=grant_data["grant_id"]).first()
+            if grant_data.get("grant_id"):
+                existing_grant = existing_by_grant_id.get(grant_data["grant_id"])
             else:
                 existing_grant = session.query(Grant).filter_by(
                     title=grant_data["title"],
-                    funder=grant_data["funder"]
+                    funder_id=grant_data.get("funder_id")
                 ).first()
             
             if existing_grant:
                 # Update existing grant
+                changed = False
+                # None when the grant was inserted earlier in this batch; its insert revision has the final state
+                diff = revisions.setdefault(id(existing_grant), (existing_grant, {}))[1]
                 for key, value in grant_data.items():
-                    setattr(existing_grant, key, value)
+                    old = getattr(existing_grant, key)
+                    if old != value:
+                        setattr(existing_grant, key, value)
+                        changed = True
+                        if diff is not None and key in REVISION_FIELDS:
+                            diff[key] = (diff[key][0] if key in diff else old, value)
+                touched_grants.append(existing_grant)
+                touched_tags.append(grant_tags)
+                changed_rows.append(changed)
+            elif grant_data.get("deadline") is not None and grant_data["deadline"] < now:
+                # Expired: either archived already or about to be; keep it out of grants
+                skipped += 1
+                changed_rows.append(False)
             else:
                 # Create new grant
                 new_grant = Grant(**grant_data)
                 session.add(new_grant)
+                touched_grants.append(new_grant)
+                touched_tags.append(grant_tags)
+                changed_rows.append(True)
+                revisions[id(new_grant)] = (new_grant, None)
+                if grant_data.get("grant_id"):
+                    existing_by_grant_id[grant_data["grant_id"]] = new_grant
+        
+        # Flush so new grants get ids, then update the search index and tags in the same transaction
+        session.flush()
+        index_grants(session.connection(), touched_grants)
+        if "Tags" in grants_df.columns:
+            write_grant_tags(session, touched_grants, touched_tags)
+        write_grant_revisions(session, list(revisions.values()), datetime.datetime.now())
         
         # Commit the changes
         session.commit()
         session.close()
+        mark_written()
+        
+        if skipped:
+            logging.info(f"Skipped {skipped} new grants whose deadline has passed")
+        logging.info(f"Successfully saved {len(touched_grants)} grants to database")
+        
+        # Refresh the local snapshot so readers can start from this ingest; replicas may still lag
+        write_snapshot(load_grants_from_db(primary=True))
         
-        logging.info(f"Successfully saved {len(grants_data)} grants to database")
+        _notify_ingest_listeners(grants_df[np.array(changed_rows, dtype=bool)])
         return True
         
     except Exception as e:
@@ -176,49 +845,443 @@ def save_grants_to_db(grants_df):
         return False
 
 
+def _grants_query():
+    """Select every grant column, labelled with its DataFrame name, plus the row id as "_id"."""
+    # Join each lookup table to turn foreign keys back into names
+    labelled = {df_col: getattr(Grant, db_col).label(df_col) for df_col, db_col in COLUMN_MAPPING.items()}
+    query_from = Grant.__table__
+    for df_col, (db_col, model, _) in LOOKUP_COLUMNS.items():
+        lookup = aliased(model)
+        labelled[df_col] = lookup.name.label(df_col)
+        query_from = query_from.outerjoin(lookup, getattr(Grant, db_col) == lookup.id)
+    return select(Grant.id.label("_id"), *[labelled[df_col] for df_col in GRANT_COLUMNS]).select_from(query_from)
+
+
+def _read_grants(connection, query):
+    """Run a _grants_query() select and attach each grant's tags as the "Tags" column."""
+    df = pd.read_sql(query, connection)
+    
+    # Fetch the tags of the selected grants in one pass and join them per grant
+    tag_query = select(GrantTag.grant_id, GrantTag.dimension, GrantTag.tag).where(
+        GrantTag.grant_id.in_(query.with_only_columns(Grant.id).scalar_subquery())
+    ).order_by(GrantTag.grant_id, GrantTag.dimension, GrantTag.tag)
+    tags = pd.read_sql(tag_query, connection)
+    if tags.empty:
+        df["Tags"] = None
+    else:
+        entries = tags["dimension"] + ":" + tags["tag"]
+        joined = entries.groupby(tags["grant_id"]).agg(TAG_SEPARATOR.join)
+        df["Tags"] = df["_id"].map(joined)
+    
+    # Repeated names come back once per row; store them as categoricals
+    to_categoricals(df)
+    return df.drop(columns="_id")
+
+
 # Function to load grants from the database
-def load_grants_from_db():
+@timed()
+def load_grants_from_db(primary=False):
     """
     Load grants from the database.
     
+    Rows are read straight into a DataFrame without building ORM objects. If the
+    database is not configured or unavailable, the last good snapshot is returned.
+    
+    Args:
+        primary (bool): Read from the primary even when read replicas are configured
+    
     Returns:
         pandas.DataFrame: DataFrame containing grant data, or empty DataFrame if error
     """
     if engine is None:
-        logging.error("Cannot load grants: database engine not initialized")
-        return pd.DataFrame()
+        logging.error("Cannot load grants: database engine not initialized, using last snapshot")
+        return load_snapshot()
     
     try:
-        # Create session
-        Session = sessionmaker(bind=engine)
-        session = Session()
+        with (engine.connect() if primary else read_connection()) as connection:
+            df = _read_grants(connection, _grants_query())
         
-        # Query all grants
-        grants = session.query(Grant).all()
-        
-        if not grants:
+        if df.empty:
             logging.info("No grants found in database")
-            session.close()
             return pd.DataFrame()
-            
-        # Convert to list of dictionaries
-        grants_data = [grant.to_dict() for grant in grants]
         
-        # Convert to DataFrame
-        df = pd.DataFrame(grants_data)
+        logging.info(f"Successfully loaded {len(df)} grants from database")
+        return df
         
-        session.close()
+    except Exception as e:
+        logging.error(f"Error loading grants from database: {str(e)}, using last snapshot")
+        return load_snapshot()
+
+
+# Function to search grants in the database
+def search_grants(query, limit=20):
+    """
+    Full-text search over grant title, description and eligibility.
+    
+    Args:
+        query (str): Free-text keyword query
+        limit (int): Maximum number of results
         
-        logging.info(f"Successfully loaded {len(df)} grants from database")
+    Returns:
+        pandas.DataFrame: Matching grants ordered by relevance, with "Relevance" and
+        "Snippet" columns, or empty DataFrame if error
+    """
+    if engine is None:
+        logging.error("Cannot search grants: database engine not initialized")
+        return pd.DataFrame()
+    
+    try:
+        # Read on a replica if one is configured, falling back to the primary if it is down
+        with read_connection() as connection:
+            Session = sessionmaker(bind=connection)
+            session = Session()
+            try:
+                hits = query_search_index(connection, query, limit=limit)
+                if not hits:
+                    return pd.DataFrame()
+
+                # Fetch only the matching rows, then restore rank order
+                grants = session.query(Grant).filter(Grant.id.in_([grant_id for grant_id, _, _ in hits])).all()
+                grants_by_id = {grant.id: grant for grant in grants}
+
+                results = []
+                for grant_id, score, snippet in hits:
+                    grant = grants_by_id.get(grant_id)
+                    if grant is None:
+                        continue
+                    grant_dict = grant.to_dict()
+                    grant_dict["Relevance"] = score
+                    grant_dict["Snippet"] = snippet
+                    results.append(grant_dict)
+            finally:
+                session.close()
+        
+        logging.info(f"Search for '{query}' returned {len(results)} grants")
+        return pd.DataFrame(results)
+        
+    except Exception as e:
+        logging.error(f"Error searching grants: {str(e)}")
+        return pd.DataFrame()
+
+
+def query_grants_by_tags(tags, match_all=True, limit=None):
+    """
+    Find grants carrying the given tags using indexed joins on grant_tags.
+    
+    Args:
+        tags (list): (dimension, tag) tuples or "Dimension:tag" strings, e.g. ["Topic:Tech", "Geography:NY"]
+        match_all (bool): Require every tag (True) or any of them (False)
+        limit (int): Maximum number of results (all if None)
+        
+    Returns:
+        pandas.DataFrame: Matching grants in load_grants_from_db format, or empty DataFrame if error
+    """
+    if engine is None:
+        logging.error("Cannot query grants: database engine not initialized")
+        return pd.DataFrame()
+    
+    pairs = [split_tags(tag)[0] if isinstance(tag, str) else tuple(tag) for tag in tags]
+    if not pairs:
+        return load_grants_from_db()
+    
+    try:
+        query = _grants_query()
+        if match_all:
+            # One join per tag; each is an index seek on (dimension, tag, grant_id)
+            for dimension, tag in pairs:
+                tag_row = aliased(GrantTag)
+                query = query.join(tag_row, and_(
+                    tag_row.grant_id == Grant.id, tag_row.dimension == dimension, tag_row.tag == tag
+                ))
+        else:
+            matching = select(GrantTag.grant_id).where(or_(*[
+                and_(GrantTag.dimension == dimension, GrantTag.tag == tag) for dimension, tag in pairs
+            ]))
+            query = query.where(Grant.id.in_(matching))
+        
+        query = query.order_by(Grant.id)
+        if limit is not None:
+            query = query.limit(limit)
+        
+        with read_connection() as connection:
+            df = _read_grants(connection, query)
+        
+        logging.info(f"Tag query {pairs} returned {len(df)} grants")
         return df
         
     except Exception as e:
-        logging.error(f"Error loading grants from database: {str(e)}")
-        if 'session' in locals():
-            session.close()
+        logging.error(f"Error querying grants by tags: {str(e)}")
         return pd.DataFrame()
 
 
+def query_grants_by_deadline(start=None, end=None, limit=None):
+    """
+    Find grants whose deadline falls in a range, soonest first.
+    
+    The range is served by the partial deadline index, so only matching rows are read.
+    
+    Args:
+        start (datetime): Earliest deadline (defaults to now)
+        end (datetime): Latest deadline (unbounded if None)
+        limit (int): Maximum number of results (all if None)
+        
+    Returns:
+        pandas.DataFrame: Matching grants in load_grants_from_db format, or empty DataFrame if error
+    """
+    if engine is None:
+        logging.error("Cannot query grants: database engine not initialized")
+        return pd.DataFrame()
+    
+    start = start or datetime.datetime.now()
+    
+    try:
+        query = _grants_query().where(Grant.deadline >= start)
+        if end is not None:
+            query = query.where(Grant.deadline <= end)
+        query = query.order_by(Grant.deadline, Grant.id)
+        if limit is not None:
+            query = query.limit(limit)
+        
+        with read_connection() as connection:
+            df = _read_grants(connection, query)
+        
+        logging.info(f"Deadline query {start} to {end} returned {len(df)} grants")
+        return df
+        
+    except Exception as e:
+        logging.error(f"Error querying grants by deadline: {str(e)}")
+        return pd.DataFrame()
+
+
+def query_upcoming_grants(days=30, limit=None):
+    """
+    Find grants closing in the next `days` days, soonest first.
+    
+    Returns:
+        pandas.DataFrame: Matching grants, or empty DataFrame if error
+    """
+    now = datetime.datetime.now()
+    return query_grants_by_deadline(now, now + datetime.timedelta(days=days), limit=limit)
+
+
+def _revision_query():
+    return select(
+        GrantRevision.id, GrantRevision.grant_key, GrantRevision.revision, GrantRevision.kind,
+        GrantRevision.changes, GrantRevision.checkpoint, GrantRevision.ingested_at
+    )
+
+
+def _apply_revision(state, revision):
+    """The state of a grant after one revision, given its state before."""
+    changes = json.loads(revision.changes)
+    if revision.kind == "insert":
+        return changes
+    if revision.checkpoint is not None:
+        return json.loads(revision.checkpoint)
+    state = dict(state)
+    state.update({field: new for field, (_, new) in changes.items()})
+    return state
+
+
+def grant_history(grant_key):
+    """
+    Every recorded revision of a grant, oldest first.
+    
+    Args:
+        grant_key (str): The grant's Grant ID
+        
+    Returns:
+        pandas.DataFrame: One row per revision with Revision, Ingested At, Kind and
+        Changed Fields, followed by the grant's full state after that revision
+    """
+    try:
+        query = _revision_query().where(GrantRevision.grant_key == grant_key).order_by(GrantRevision.id)
+        with read_connection() as connection:
+            revisions = connection.execute(query).all()
+        
+        records = []
+        state = {}
+        for revision in revisions:
+            state = _apply_revision(state, revision)
+            changed = "" if revision.kind == "insert" else ", ".join(json.loads(revision.changes))
+            records.append({
+                "Revision": revision.revision,
+                "Ingested At": revision.ingested_at,
+                "Kind": revision.kind,
+                "Changed Fields": changed,
+                **state
+            })
+        return pd.DataFrame(records)
+        
+    except Exception as e:
+        logging.error(f"Error loading history of grant {grant_key}: {str(e)}")
+        return pd.DataFrame()
+
+
+def grant_state_at(grant_key, when):
+    """
+    Rebuild a grant as it was stored at a point in time.
+    
+    Starts from the latest insert or checkpoint revision at or before `when` and applies
+    the field changes recorded after it, so at most REVISION_CHECKPOINT_EVERY revisions are read.
+    
+    Args:
+        grant_key (str): The grant's Grant ID
+        when (datetime): Point in time
+        
+    Returns:
+        dict: Field values keyed by DataFrame column name, or None if the grant was not stored yet
+    """
+    try:
+        in_range = and_(GrantRevision.grant_key == grant_key, GrantRevision.ingested_at <= when)
+        with read_connection() as connection:
+            base = connection.execute(
+                _revision_query()
+                .where(in_range, or_(GrantRevision.kind == "insert", GrantRevision.checkpoint.isnot(None)))
+                .order_by(GrantRevision.id.desc())
+                .limit(1)
+            ).first()
+            if base is None:
+                return None
+            later = connection.execute(
+                _revision_query().where(in_range, GrantRevision.id > base.id).order_by(GrantRevision.id)
+            ).all()
+        
+        state = _apply_revision({}, base)
+        for revision in later:
+            state = _apply_revision(state, revision)
+        return state
+        
+    except Exception as e:
+        logging.error(f"Error rebuilding grant {grant_key} at {when}: {str(e)}")
+        return None
+
+
+def grant_changes_since(since, include_inserts=True, limit=None):
+    """
+    Everything the ingests changed since a point in time, one row per changed field.
+    
+    Args:
+        since (datetime): Only revisions ingested at or after this time
+        include_inserts (bool): Also list grants first stored in that period, as one row each
+        limit (int): Maximum number of revisions to read
+        
+    Returns:
+        pandas.DataFrame: Grant ID, Revision, Ingested At, Kind, Field, Old Value and New Value;
+        Field is empty on insert rows. Empty DataFrame if error
+    """
+    columns = ["Grant ID", "Revision", "Ingested At", "Kind", "Field", "Old Value", "New Value"]
+    try:
+        query = _revision_query().where(GrantRevision.ingested_at >= since)
+        if not include_inserts:
+            query = query.where(GrantRevision.kind == "update")
+        query = query.order_by(GrantRevision.ingested_at, GrantRevision.id)
+        if limit is not None:
+            query = query.limit(limit)
+        
+        with read_connection() as connection:
+            revisions = connection.execute(query).all()
+        
+        records = []
+        for revision in revisions:
+            prefix = (revision.grant_key, revision.revision, revision.ingested_at, revision.kind)
+            if revision.kind == "insert":
+                records.append(prefix + (None, None, None))
+                continue
+            for field, (old, new) in json.loads(revision.changes).items():
+                records.append(prefix + (field, old, new))
+        
+        logging.info(f"{len(revisions)} grant revisions since {since}")
+        return pd.DataFrame.from_records(records, columns=columns)
+        
+    except Exception as e:
+        logging.error(f"Error loading grant changes since {since}: {str(e)}")
+        return pd.DataFrame(columns=columns)
+
+
+def sweep_expired_grants(now=None, batch_size=SWEEP_BATCH_SIZE, max_batches=None):
+    """
+    Move grants whose deadline has passed from grants to archived_grants.
+    
+    Expired grants are found through the deadline index and archived in small batches,
+    each in its own transaction, so a sweep never holds long locks on the hot table.
+    Their tags are kept on the archive row in the "Tags" format.
+    
+    Args:
+        now (datetime): Cut-off; grants with an earlier deadline are archived (defaults to now)
+        batch_size (int): Grants archived per transaction
+        max_batches (int): Stop after this many batches (until done if None)
+        
+    Returns:
+        int: Number of grants archived, counting batches committed before any error
+    """
+    if engine is None:
+        logging.error("Cannot sweep grants: database engine not initialized")
+        return 0
+    
+    now = now or datetime.datetime.now()
+    archived = 0
+    batches = 0
+    
+    try:
+        Session = sessionmaker(bind=engine)
+        
+        while max_batches is None or batches < max_batches:
+            session = Session()
+            try:
+                grant_ids = session.execute(
+                    select(Grant.id).where(Grant.deadline < now).order_by(Grant.deadline).limit(batch_size)
+                ).scalars().all()
+                if not grant_ids:
+                    break
+                
+                rows = session.execute(
+                    select(Grant.__table__).where(Grant.id.in_(grant_ids))
+                ).mappings().all()
+                tag_rows = session.execute(
+                    select(GrantTag.grant_id, GrantTag.dimension, GrantTag.tag)
+                    .where(GrantTag.grant_id.in_(grant_ids))
+                    .order_by(GrantTag.grant_id, GrantTag.dimension, GrantTag.tag)
+                ).all()
+                tags = {}
+                for grant_id, dimension, tag in tag_rows:
+                    tags.setdefault(grant_id, []).append(f"{dimension}:{tag}")
+                
+                archive_columns = set(ArchivedGrant.__table__.columns.keys()) - {"id"}
+                session.execute(insert(ArchivedGrant), [
+                    {
+                        **{key: value for key, value in row.items() if key in archive_columns},
+                        "grant_row_id": row["id"],
+                        "tags": TAG_SEPARATOR.join(tags.get(row["id"], [])) or None,
+                        "archived_at": now
+                    }
+                    for row in rows
+                ])
+                
+                remove_from_index(session.connection(), grant_ids)
+                session.execute(delete(GrantTag).where(GrantTag.grant_id.in_(grant_ids)))
+                session.execute(delete(Grant).where(Grant.id.in_(grant_ids)))
+                session.commit()
+                mark_written()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+            
+            archived += len(grant_ids)
+            batches += 1
+        
+        if archived:
+            logging.info(f"Archived {archived} expired grants")
+            write_snapshot(load_grants_from_db(primary=True))
+        return archived
+        
+    except Exception as e:
+        logging.error(f"Error sweeping expired grants: {str(e)}")
+        return archived
+
+
 # Initialize the database
 def init_db():
     """Initialize the database by creating tables."""
@@ -245,35 +1308,25 @@ def clean_low_quality_grants():
         Session = sessionmaker(bind=engine)
         session = Session()
         
-        # Find low-quality grants based on title
-        low_quality_keywords = [
-            "click here", "page help", "tutorial", "help", "nysggportal", 
-            "goportal", "login", "register", "pdf", "manual", "grantopportunities", 
-            "mygrants", "learn more", "home", "back", "next"
-        ]
-        
-        # Build query to find grants with problematic titles
-        conditions = []
-        for keyword in low_quality_keywords:
-            conditions.append(Grant.title.ilike(f"%{keyword}%"))
-        
-        # Find grants with very short descriptions
-        conditions.append(func.length(Grant.description) < 30)
-        
-        # Find grants with PDF links or tutorial links
-        conditions.append(Grant.link.ilike("%pdf%"))
-        conditions.append(Grant.link.ilike("%tutorial%"))
-        conditions.append(Grant.link.ilike("%help%"))
+        # Score titles, links and descriptions with the same rules the ingest stage applies
+        candidates = pd.read_sql(
+            select(Grant.id, Grant.title.label("Title"), Grant.link.label("Link"), Grant.description.label("Description")),
+            session.connection()
+        )
+        flags = score_quality(candidates, CLEANUP_RULES)
+        grant_ids = candidates.loc[flags.any(axis=1), "id"].tolist()
         
         # Remove matching grants
-        low_quality_grants = session.query(Grant).filter(or_(*conditions)).all()
-        
-        if low_quality_grants:
-            count = len(low_quality_grants)
-            for grant in low_quality_grants:
-                session.delete(grant)
+        if grant_ids:
+            count = len(grant_ids)
+            for start in range(0, count, IN_CLAUSE_CHUNK):
+                chunk = grant_ids[start:start + IN_CLAUSE_CHUNK]
+                remove_from_index(session.connection(), chunk)
+                session.execute(delete(GrantTag).where(GrantTag.grant_id.in_(chunk)))
+                session.execute(delete(Grant).where(Grant.id.in_(chunk)))
             
             session.commit()
+            mark_written()
             logging.info(f"Removed {count} low-quality grants from database")
             
         session.close()
@@ -287,6 +1340,41 @@ def clean_low_quality_grants():
         return False
 
 
+def update_relevance_scores(grant_ids, scores):
+    """
+    Overwrite stored relevance scores in bulk, e.g. after the relevance model is refit.
+    
+    Args:
+        grant_ids (list): Grant IDs
+        scores (list): New scores, aligned with grant_ids
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if engine is None:
+        logging.error("Cannot update relevance scores: database engine not initialized")
+        return False
+    
+    try:
+        grants = Grant.__table__
+        statement = grants.update().where(grants.c.grant_id == bindparam("b_grant_id")).values(
+            relevance_score=bindparam("b_score")
+        )
+        rows = [{"b_grant_id": grant_id, "b_score": score} for grant_id, score in zip(grant_ids, scores)]
+        with engine.begin() as connection:
+            for start in range(0, len(rows), SWEEP_BATCH_SIZE):
+                connection.execute(statement, rows[start:start + SWEEP_BATCH_SIZE])
+        mark_written()
+        
+        logging.info(f"Updated relevance scores of {len(rows)} grants")
+        write_snapshot(load_grants_from_db(primary=True))
+        return True
+        
+    except Exception as e:
+        logging.error(f"Error updating relevance scores: {str(e)}")
+        return False
+
+
 def check_db_connection():
     """Check if database connection is working."""
     if engine is None:
@@ -0,0 +1,63 @@
+import logging
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class DeadlineIndex:
+    """
+    Grants sorted by deadline for fast "closing in the next N days" lookups.
+
+    The deadlines are held as a sorted datetime64 array alongside the row positions
+    they came from, so a range query is two binary searches and one take instead of
+    a scan and sort of the whole frame. Grants without a deadline are left out.
+    """
+
+    def __init__(self, grants_df):
+        self.grants = grants_df
+        if grants_df.empty or "Deadline" not in grants_df.columns:
+            self.deadlines = np.array([], dtype="datetime64[ns]")
+            self.positions = np.array([], dtype=np.intp)
+            return
+
+        deadlines = pd.to_datetime(grants_df["Deadline"], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        present = np.flatnonzero(~np.isnat(deadlines))
+        order = np.argsort(deadlines[present], kind="stable")
+        self.positions = present[order]
+        self.deadlines = deadlines[self.positions]
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def _bounds(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.deadlines, np.datetime64(start, "ns"), side="left")
+        hi = len(self.deadlines) if end is None else np.searchsorted(self.deadlines, np.datetime64(end, "ns"), side="right")
+        return lo, max(lo, hi)
+
+    def range(self, start=None, end=None):
+        """
+        Grants with a deadline between start and end (inclusive), soonest first.
+
+        Args:
+            start (datetime): Earliest deadline (unbounded if None)
+            end (datetime): Latest deadline (unbounded if None)
+
+        Returns:
+            pandas.DataFrame: Matching rows of the indexed frame in deadline order
+        """
+        lo, hi = self._bounds(start, end)
+        return self.grants.iloc[self.positions[lo:hi]]
+
+    def upcoming(self, days, now=None):
+        """Grants closing within the next `days` days, soonest first."""
+        now = now or datetime.datetime.now()
+        return self.range(now, now + datetime.timedelta(days=days))
+
+    def count_expired(self, now=None):
+        """Number of grants whose deadline has already passed."""
+        now = now or datetime.datetime.now()
+        return int(np.searchsorted(self.deadlines, np.datetime64(now, "ns"), side="left"))
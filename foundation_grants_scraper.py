@@ -7,6 +7,8 @@ import time
 import re
 import random
 from urllib.parse import urljoin
+from instrumentation import timed
+from connectors import GrantConnector, register_connector, dataframe_records
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -62,12 +64,25 @@ FOUNDATION_GRANT_URLS = (
 )
 
 # Dummy scraper for now
+@timed()
 def fetch_foundation_grants():
     # This returns a sample DataFrame — replace with real scraping logic later
     return pd.DataFrame([
         {"Funder": "Example Foundation", "Title": "Example Grant", "Deadline": "2025-12-31", "Link": "https://example.org"}
     ])
 
+@register_connector
+class FoundationGrantsConnector(GrantConnector):
+    """Opportunities scraped from foundation websites."""
+
+    name = "foundations"
+    interval = 24 * 3600
+    jitter = 60 * 60
+    timeout = 30 * 60
+
+    def fetch_records(self):
+        return dataframe_records(fetch_foundation_grants())
+
 if __name__ == "__main__":
     df = fetch_foundation_grants()
     print(f"\nTotal grants found: {len(df)}\n")
@@ -3,6 +3,7 @@ import numpy as np
 import re
 from funder_data import FUNDER_CATEGORIES
 import logging
+from instrumentation import timed
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,6 +25,56 @@ AUDIENCE_KEYWORDS = {
     "Low-income": ["low-income", "disadvantaged", "underserved", "poverty", "low income", "poor", "vulnerable", "equity", "equality", "marginalized"]
 }
 
+# Multi-valued tag dimensions: (column, keyword groups, default tag, also match eligibility)
+TAG_DIMENSIONS = [
+    ("Geography", GEOGRAPHY_KEYWORDS, "National", True),
+    ("Topic", TOPIC_KEYWORDS, "Other", False),
+    ("Audience", AUDIENCE_KEYWORDS, "Other", True)
+]
+
+# Separates the "Dimension:tag" entries of the "Tags" column
+TAG_SEPARATOR = "|"
+
+# Low-cardinality columns carried as pandas categoricals through the pipeline
+CATEGORICAL_COLUMNS = ["Source", "Funder", "Funder Type", "Geography", "Topic", "Audience"]
+
+
+def to_categoricals(grants_df):
+    """Convert the repeated-value columns of a grants DataFrame to categoricals in place."""
+    for col in CATEGORICAL_COLUMNS:
+        if col in grants_df.columns and not isinstance(grants_df[col].dtype, pd.CategoricalDtype):
+            grants_df[col] = grants_df[col].astype("category")
+    return grants_df
+
+
+def split_tags(tags):
+    """
+    Parse a "Tags" value into (dimension, tag) pairs.
+    
+    Args:
+        tags (str): Pipe-delimited tags such as "Geography:NY|Topic:Tech|Topic:Workforce"
+        
+    Returns:
+        list: (dimension, tag) tuples, empty if the value is missing
+    """
+    if not isinstance(tags, str) or not tags:
+        return []
+    return [tuple(entry.split(":", 1)) for entry in tags.split(TAG_SEPARATOR) if ":" in entry]
+
+
+def has_tag(grants_df, dimension, tag):
+    """
+    Boolean mask of the grants carrying a tag in any position of their "Tags" column.
+    
+    Falls back to the single-value dimension column for frames without "Tags".
+    """
+    if "Tags" not in grants_df.columns:
+        return grants_df[dimension] == tag
+    wrapped = TAG_SEPARATOR + grants_df["Tags"].fillna("") + TAG_SEPARATOR
+    return wrapped.str.contains(f"{TAG_SEPARATOR}{dimension}:{tag}{TAG_SEPARATOR}", regex=False)
+
+
+@timed()
 def process_grants(grants_df):
     """
     Process the raw grants DataFrame to standardize columns and formats.
@@ -76,6 +127,9 @@ def process_grants(grants_df):
             mask = df["Grant ID"].isna() if "Grant ID" in df.columns else pd.Series(True, index=df.index)
             df.loc[mask, "Grant ID"] = [f"GRANT-{i}" for i in range(sum(mask))]
         
+        # Repeated values such as Source and Funder are stored once per category
+        to_categoricals(df)
+        
         logging.info(f"Processed {len(df)} grants successfully")
         return df
         
@@ -84,6 +138,7 @@ def process_grants(grants_df):
         return pd.DataFrame()  # Return empty DataFrame on error
 
 
+@timed()
 def tag_grants(grants_df):
     """
     Tag grants with geography, topic, audience, and funder type.
@@ -99,42 +154,49 @@ def tag_grants(grants_df):
         df = grants_df.copy()
         
         # Initialize tag columns
-        df["Geography"] = "National"  # Default
-        df["Topic"] = "Other"
-        df["Audience"] = "Other"
         df["Funder Type"] = "Other"
         
-        # Tag by geography
-        for geo, keywords in GEOGRAPHY_KEYWORDS.items():
-            pattern = "|".join(keywords)
-            mask = df["Description"].str.lower().str.contains(pattern, na=False, regex=True)
-            mask |= df["Title"].str.lower().str.contains(pattern, na=False, regex=True)
-            if "Eligibility" in df.columns:
-                mask |= df["Eligibility"].str.lower().str.contains(pattern, na=False, regex=True)
-            df.loc[mask, "Geography"] = geo
-        
-        # Tag by topic
-        for topic, keywords in TOPIC_KEYWORDS.items():
-            pattern = "|".join(keywords)
-            mask = df["Description"].str.lower().str.contains(pattern, na=False, regex=True)
-            mask |= df["Title"].str.lower().str.contains(pattern, na=False, regex=True)
-            df.loc[mask, "Topic"] = topic
-        
-        # Tag by audience
-        for audience, keywords in AUDIENCE_KEYWORDS.items():
-            pattern = "|".join(keywords)
-            mask = df["Description"].str.lower().str.contains(pattern, na=False, regex=True)
-            mask |= df["Title"].str.lower().str.contains(pattern, na=False, regex=True)
-            if "Eligibility" in df.columns:
-                mask |= df["Eligibility"].str.lower().str.contains(pattern, na=False, regex=True)
-            df.loc[mask, "Audience"] = audience
-        
-        # Tag by funder type
-        df["Funder Type"] = df["Funder"].apply(determine_funder_type)
+        # Lowercase each text column once rather than once per keyword group
+        lowered = {
+            col: df[col].str.lower()
+            for col in ["Title", "Description", "Eligibility"] if col in df.columns
+        }
+        
+        # Tag by geography, topic and audience. Every matching tag is kept in the
+        # multi-valued "Tags" column; the single-value column keeps the last match.
+        tags = np.full(len(df), "", dtype=object)
+        for dimension, keyword_groups, default, use_eligibility in TAG_DIMENSIONS:
+            primary = np.full(len(df), default, dtype=object)
+            matched = np.zeros(len(df), dtype=bool)
+            for tag, keywords in keyword_groups.items():
+                pattern = "|".join(keywords)
+                mask = lowered["Description"].str.contains(pattern, na=False, regex=True)
+                mask |= lowered["Title"].str.contains(pattern, na=False, regex=True)
+                if use_eligibility and "Eligibility" in lowered:
+                    mask |= lowered["Eligibility"].str.contains(pattern, na=False, regex=True)
+                mask = mask.to_numpy()
+                primary[mask] = tag
+                tags[mask] += f"{TAG_SEPARATOR}{dimension}:{tag}"
+                matched |= mask
+            # Grants with no match in a dimension carry its default as their only tag
+            tags[~matched] += f"{TAG_SEPARATOR}{dimension}:{default}"
+            df[dimension] = primary
+        df["Tags"] = [value[1:] for value in tags]
+        
+        # Tag by funder type, classifying each distinct funder once instead of every row
+        funders = df["Funder"].astype("category")
+        funder_types = np.array(
+            [determine_funder_type(funder) for funder in funders.cat.categories] + ["Other"], dtype=object
+        )
+        # Missing funders have code -1, which picks the trailing "Other"
+        funder_type = funder_types[funders.cat.codes.to_numpy()]
         
         # For government sources, we can directly assign
         gov_sources = ["Grants.gov", "NY Grants Gateway"]
-        df.loc[df["Source"].isin(gov_sources), "Funder Type"] = "Government"
+        funder_type[df["Source"].isin(gov_sources).to_numpy()] = "Government"
+        df["Funder Type"] = funder_type
+        
+        to_categoricals(df)
         
         logging.info(f"Successfully tagged {len(df)} grants")
         return df
@@ -144,6 +206,7 @@ def tag_grants(grants_df):
         return pd.DataFrame()  # Return empty DataFrame on error
 
 
+@timed(rows=None)
 def determine_funder_type(funder_name):
     """
     Determine the type of funder based on the funder name.
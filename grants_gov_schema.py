@@ -0,0 +1,333 @@
+import re
+import logging
+import datetime
+import threading
+import functools
+from typing import Any, Optional, Union
+
+from json_codec import loads, decode_typed, msgspec
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Keys known to hold the list of opportunities in a search response
+HITS_KEYS = ["oppHits", "opportunities", "searchHits"]
+
+# Source fields for each output column, in priority order
+FIELD_CANDIDATES = {
+    "Grant ID": ["oppNum", "opportunityNumber"],
+    "Title": ["title", "opportunityTitle"],
+    "Funder": ["agency", "agencyName"],
+    "Description": ["description", "opportunityDescription"],
+    "Start Date": ["openDate", "postDate"],
+    "Deadline": ["closeDate", "dueDate"],
+    "Award Amount": ["awardCeiling", "awardAmount"],
+    "Category": ["opportunityCategory"],
+    "Eligibility": ["eligibleApplicants", "eligibility"],
+    "Activity Category": ["fundingActivityCategory"],
+    "Status": ["oppStatus", "status"]
+}
+
+# Name patterns used to map fields when none of the known names are present
+FALLBACK_PATTERNS = [
+    ("Grant ID", re.compile(r"id|num")),
+    ("Title", re.compile(r"title|name")),
+    ("Funder", re.compile(r"agency|funder")),
+    ("Description", re.compile(r"desc|summary")),
+    ("Start Date", re.compile(r"date.*(open|start|post)|(open|start|post).*date")),
+    ("Deadline", re.compile(r"date.*(close|end|due)|(close|end|due).*date")),
+    ("Award Amount", re.compile(r"award|amount|funding")),
+    ("Eligibility", re.compile(r"elig"))
+]
+
+# Output columns an extractor must be able to fill for the response to be usable
+REQUIRED_COLUMNS = ["Title"]
+
+# Every source field name the known mappings can use; a shape's fingerprint is the subset present
+KNOWN_FIELDS = frozenset(name for candidates in FIELD_CANDIDATES.values() for name in candidates)
+
+DATE_FORMATS = ["%m/%d/%Y", "%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%b %d, %Y"]
+
+
+class SchemaDriftError(ValueError):
+    """Raised when a response shape can no longer be mapped to the grant columns."""
+
+
+def parse_date(value):
+    """Parse a Grants.gov date value, returning None if it cannot be parsed."""
+    if not value or not isinstance(value, str):
+        return None
+    return _parse_date_string(value.strip())
+
+
+# Open/close dates repeat heavily across a result set, so parsed values are cached
+@functools.lru_cache(maxsize=8192)
+def _parse_date_string(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(value):
+    """Parse an award amount into a float, returning None if it cannot be parsed."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    cleaned = re.sub(r"[^\d.]", "", str(value))
+    try:
+        return float(cleaned) if cleaned else None
+    except ValueError:
+        return None
+
+
+def parse_text(value):
+    """Normalize a text field; lists (e.g. eligible applicant codes) are joined."""
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return ", ".join(str(item.get("description", item)) if isinstance(item, dict) else str(item) for item in value)
+    if isinstance(value, dict):
+        return str(value.get("description") or value.get("name") or value)
+    return str(value)
+
+
+CONVERTERS = {
+    "Start Date": parse_date,
+    "Deadline": parse_date,
+    "Award Amount": parse_amount
+}
+
+
+def find_hits_key(data):
+    """Return the key holding the list of opportunity records, or None."""
+    if not isinstance(data, dict):
+        return None
+    for key in HITS_KEYS:
+        if key in data:
+            return key
+    # Fall back to any list of objects in the response
+    for key, value in data.items():
+        if isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
+            return key
+    return None
+
+
+def fingerprint(data):
+    """
+    Identify a response shape.
+
+    Only field names the mapping can use count, taken from every record, so unrelated
+    fields and optional fields missing from the first records do not make a new shape.
+    When no known name is present the names matching FALLBACK_PATTERNS are used instead.
+
+    Returns:
+        tuple: (hits key, frozenset of mappable field names), or None if no records were found
+
+    Raises:
+        SchemaDriftError: The hits key holds something other than a list of records
+    """
+    hits_key = find_hits_key(data)
+    if hits_key is None:
+        return None
+    if not isinstance(data[hits_key], list):
+        raise SchemaDriftError(f"Grants.gov response '{hits_key}' is a {type(data[hits_key]).__name__}, not a list")
+    records = [record for record in data[hits_key] if isinstance(record, dict)]
+
+    present = set()
+    for record in records:
+        present.update(KNOWN_FIELDS.intersection(record))
+        if len(present) == len(KNOWN_FIELDS):
+            break
+    if present:
+        return hits_key, frozenset(present)
+
+    return hits_key, frozenset(
+        key for key in frozenset().union(*records)
+        if any(pattern.search(key.lower()) for _, pattern in FALLBACK_PATTERNS)
+    )
+
+
+class CompiledExtractor:
+    """
+    Direct extractor for one response shape.
+
+    The field mapping and converters are resolved once, at compile time, so extraction is a
+    single pass over the records with no per-record schema inspection.
+    """
+
+    def __init__(self, shape, field_map):
+        self.shape = shape
+        self.hits_key = shape[0]
+        self.field_map = field_map
+        self.plan = [
+            (column, source, CONVERTERS.get(column, parse_text))
+            for column, source in field_map.items()
+        ]
+
+    def extract(self, data):
+        """Turn a response into typed grant records keyed by output column."""
+        plan = self.plan
+        return [
+            {column: convert(record.get(source)) for column, source, convert in plan}
+            for record in data[self.hits_key]
+            if isinstance(record, dict)
+        ]
+
+
+def compile_extractor(shape):
+    """Build the field mapping for a response shape."""
+    hits_key, record_keys = shape
+    field_map = {}
+
+    for column, candidates in FIELD_CANDIDATES.items():
+        for candidate in candidates:
+            if candidate in record_keys:
+                field_map[column] = candidate
+                break
+
+    if not field_map:
+        logging.warning("No standard field names found in Grants.gov response. Auto-detecting fields.")
+        for key in sorted(record_keys):
+            lowered = key.lower()
+            for column, pattern in FALLBACK_PATTERNS:
+                if column not in field_map and pattern.search(lowered):
+                    field_map[column] = key
+                    break
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in field_map]
+    if missing:
+        raise SchemaDriftError(
+            f"Grants.gov response in '{hits_key}' has no field for {', '.join(missing)}; "
+            f"fields seen: {', '.join(sorted(record_keys))}"
+        )
+
+    return CompiledExtractor(shape, field_map)
+
+
+_extractors = {}
+_last_mapping = None
+_lock = threading.Lock()
+
+
+def get_extractor(data):
+    """
+    Return the compiled extractor for a response, compiling it on first sight of its shape.
+
+    A field mapping that differs from the previously used one is logged as schema drift.
+
+    Returns:
+        CompiledExtractor: Extractor for the response, or None if it holds no records
+
+    Raises:
+        SchemaDriftError: The new shape cannot be mapped to the required grant columns
+    """
+    global _last_mapping
+
+    shape = fingerprint(data)
+    if shape is None:
+        return None
+
+    with _lock:
+        extractor = _extractors.get(shape)
+        if extractor is None:
+            extractor = compile_extractor(shape)
+            _extractors[shape] = extractor
+            logging.info(f"Compiled Grants.gov extractor for '{shape[0]}' mapping {extractor.field_map}")
+
+        mapping = (extractor.hits_key, extractor.field_map)
+        if _last_mapping is not None and mapping != _last_mapping:
+            previous_key, previous_map = _last_mapping
+            changed = sorted(
+                column for column in set(previous_map) | set(extractor.field_map)
+                if previous_map.get(column) != extractor.field_map.get(column)
+            )
+            logging.warning(
+                f"Grants.gov schema drift: hits under '{extractor.hits_key}' (was '{previous_key}'), "
+                f"mapping changed for {changed}: " + ", ".join(
+                    f"{column} {previous_map.get(column)} -> {extractor.field_map.get(column)}" for column in changed
+                )
+            )
+        _last_mapping = mapping
+
+    return extractor
+
+
+def extract_opportunities(data):
+    """
+    Parse a Grants.gov search response into typed grant records.
+
+    Returns:
+        list: Grant records (possibly empty), or None if the response holds no opportunity list
+    """
+    hits_key = find_hits_key(data)
+    if hits_key is None:
+        return None
+    if not data[hits_key]:
+        return []
+    return get_extractor(data).extract(data)
+
+
+if msgspec is not None:
+    class OpportunityHit(msgspec.Struct):
+        """Typed form of a record in the standard `oppHits` response shape."""
+
+        oppNum: str
+        title: str
+        agency: Any = None
+        description: Optional[str] = None
+        openDate: Optional[str] = None
+        closeDate: Optional[str] = None
+        awardCeiling: Union[float, str, None] = None
+        opportunityCategory: Any = None
+        eligibleApplicants: Any = None
+        fundingActivityCategory: Any = None
+        oppStatus: Any = None
+
+    class SearchResponse(msgspec.Struct):
+        """Typed form of the standard search response; unknown fields are ignored."""
+
+        oppHits: list[OpportunityHit]
+else:
+    SearchResponse = None
+
+
+def hit_to_record(hit):
+    """Convert a typed OpportunityHit into a grant record."""
+    return {
+        "Grant ID": hit.oppNum,
+        "Title": hit.title,
+        "Funder": parse_text(hit.agency),
+        "Description": hit.description,
+        "Start Date": parse_date(hit.openDate),
+        "Deadline": parse_date(hit.closeDate),
+        "Award Amount": parse_amount(hit.awardCeiling),
+        "Category": parse_text(hit.opportunityCategory),
+        "Eligibility": parse_text(hit.eligibleApplicants),
+        "Activity Category": parse_text(hit.fundingActivityCategory),
+        "Status": parse_text(hit.oppStatus)
+    }
+
+
+def decode_search_response(content):
+    """
+    Decode raw Grants.gov response bytes into typed grant records.
+
+    When msgspec is installed, responses in the standard `oppHits` shape are decoded
+    straight into OpportunityHit structs. Anything else falls back to the fastest generic
+    JSON decoder plus the compiled schema extractors.
+
+    Returns:
+        list: Grant records (possibly empty), or None if the response holds no opportunity list
+
+    Raises:
+        ValueError: The content is not valid JSON
+        SchemaDriftError: The response shape cannot be mapped to the grant columns
+    """
+    typed = decode_typed(content, SearchResponse)
+    if typed is not None:
+        return [hit_to_record(hit) for hit in typed.oppHits]
+    return extract_opportunities(loads(content))
@@ -0,0 +1,295 @@
+import os
+import time
+import random
+import logging
+import threading
+import contextlib
+import contextvars
+import email.utils
+from urllib.parse import urlsplit
+
+import requests
+
+import instrumentation
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Per-attempt timeout when the caller does not pass one
+DEFAULT_TIMEOUT = 10
+
+# Retry policy for transient failures
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Longest Retry-After honoured, in seconds; a response asking for a longer wait is returned as-is
+RETRY_AFTER_MAX = 120.0
+
+# Methods safe to resend after a timeout or 5xx, when the first attempt may already have
+# taken effect. Other methods (POST, PATCH) only retry failures that prove the server never
+# handled the request, unless the caller passes idempotent=True.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"}
+
+# Circuit breaker policy, applied per host
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 60.0
+
+# Absolute time.monotonic() deadline shared by every call made inside a deadline() block
+_deadline = contextvars.ContextVar("http_deadline", default=None)
+
+# requests.Session is not guaranteed thread-safe, so each thread gets its own pooled session
+_sessions = threading.local()
+
+# Optional function mapping each outgoing URL to the one actually requested (e.g. a local
+# replay server); GRANT_HTTP_REPLAY_URL installs http_replay's rewriter at import time
+_url_rewriter = None
+
+# Callbacks run with (method, url, response) after every response, e.g. a cassette recorder
+_response_hooks = []
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised without touching the network when a host's circuit breaker is open."""
+
+
+class DeadlineExceeded(requests.Timeout):
+    """Raised when the enclosing deadline() leaves no time for another attempt."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for a single host.
+
+    After BREAKER_FAILURE_THRESHOLD failures in a row the circuit opens and calls fail fast.
+    Once BREAKER_RESET_TIMEOUT has passed one trial call is let through (half-open); its
+    outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, host, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logging.warning(f"Circuit opened for {self.host} after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(host):
+    """Return the shared circuit breaker for a host."""
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(host)
+        return _breakers[host]
+
+
+def reset_breakers():
+    """Forget all circuit breaker state (e.g. between scheduler runs or in benchmarks)."""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    """
+    Bound the total time spent on HTTP calls inside the block.
+
+    Nested deadlines can only tighten the outer one. Passing None leaves the current
+    deadline unchanged.
+    """
+    if seconds is None:
+        yield
+        return
+
+    new_deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(new_deadline if current is None else min(current, new_deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time():
+    """Seconds left before the current deadline, or None if there is no deadline."""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+def get_session():
+    """Return this thread's pooled requests session."""
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = requests.Session()
+        _sessions.session = session
+    return session
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def set_url_rewriter(rewriter):
+    """
+    Route every request through `rewriter(url) -> url`, or pass None to stop rewriting.
+
+    Circuit breakers stay keyed on the original host.
+    """
+    global _url_rewriter
+    _url_rewriter = rewriter
+
+
+def add_response_hook(hook):
+    """Call `hook(method, url, response)` after every response, with the original URL."""
+    _response_hooks.append(hook)
+
+
+def remove_response_hook(hook):
+    if hook in _response_hooks:
+        _response_hooks.remove(hook)
+
+
+def request(method, url, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES, idempotent=None, **kwargs):
+    """
+    Make an HTTP request with retries, backoff, per-host circuit breaking and deadline propagation.
+
+    Connection errors, timeouts, 429 and 5xx responses are retried with exponential backoff
+    and jitter, honouring Retry-After up to RETRY_AFTER_MAX. Other responses are returned as-is for the caller to
+    inspect. Non-idempotent requests only retry connect timeouts and 429s, where the server
+    cannot have acted on the request, so a slow POST is never sent twice.
+
+    Args:
+        method (str): HTTP method
+        url (str): Request URL
+        timeout (float): Per-attempt timeout, further capped by the enclosing deadline()
+        retries (int): Maximum number of retries after the first attempt
+        idempotent (bool): Whether resending is safe (by default, true for IDEMPOTENT_METHODS)
+        **kwargs: Passed through to requests
+
+    Returns:
+        requests.Response: The final response (possibly a 429/5xx once retries run out)
+
+    Raises:
+        CircuitOpenError: The host's circuit is open
+        DeadlineExceeded: The enclosing deadline expired
+        requests.RequestException: The last network error once retries run out
+    """
+    host = urlsplit(url).netloc
+    breaker = get_breaker(host)
+    session = get_session()
+    target_url = _url_rewriter(url) if _url_rewriter else url
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+    for attempt in range(retries + 1):
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        remaining = remaining_time()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"Deadline exceeded before requesting {url}")
+        attempt_timeout = timeout if remaining is None else min(timeout, remaining)
+
+        retry_after = None
+        try:
+            response = session.request(method, target_url, timeout=attempt_timeout, **kwargs)
+            if not kwargs.get("stream"):
+                instrumentation.record_bytes(len(response.content))
+            for hook in list(_response_hooks):
+                hook(method, url, response)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            breaker.record_failure()
+            if attempt == retries or not (idempotent or isinstance(e, requests.ConnectTimeout)):
+                raise
+            logging.warning(f"{method} {url} failed ({str(e)}), retrying")
+        except Exception:
+            # Anything else (redirect loops, broken encodings, a failing hook) still ends a
+            # half-open trial, or the circuit would never close again
+            breaker.record_failure()
+            raise
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                return response
+
+            # A 429 means the host is up but throttling us; only 5xx count against the breaker
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if attempt == retries or not (idempotent or response.status_code == 429):
+                return response
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None and retry_after > RETRY_AFTER_MAX:
+                logging.warning(f"{method} {url} returned {response.status_code} with Retry-After {retry_after:.0f}s, not retrying")
+                return response
+            logging.warning(f"{method} {url} returned {response.status_code}, retrying")
+
+        delay = retry_after if retry_after is not None else backoff_delay(attempt)
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            raise DeadlineExceeded(f"Deadline leaves no time to retry {url}")
+        time.sleep(delay)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+# Send all traffic to a local http_replay stand-in server when one is configured
+REPLAY_URL = os.getenv("GRANT_HTTP_REPLAY_URL", "")
+if REPLAY_URL:
+    from http_replay import rewrite_to
+    set_url_rewriter(rewrite_to(REPLAY_URL))
+    logging.info(f"Routing HTTP requests through replay server {REPLAY_URL}")
@@ -0,0 +1,394 @@
+"""
+Record and replay HTTP traffic so the scrapers can be tested and tuned offline.
+
+Record real exchanges into a gzip-compressed cassette:
+
+    python http_replay.py record --cassette cassettes/grants.jsonl.gz --sources grants_gov,ny_grants_gateway
+
+Replay them from a local stand-in server with latency, errors and throttling:
+
+    python http_replay.py serve --cassette cassettes/grants.jsonl.gz --port 8765 --latency 0.2 --error-rate 0.05
+    GRANT_HTTP_REPLAY_URL=http://127.0.0.1:8765 python refresh_scheduler.py --once
+
+Or load-test the fetchers against it in one process:
+
+    python http_replay.py loadtest --cassette cassettes/grants.jsonl.gz --runs 20 --concurrency 4 --rate-limit 5
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import base64
+import random
+import hashlib
+import logging
+import argparse
+import threading
+import contextlib
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+import http_client
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Response headers worth keeping; transfer-level headers no longer match the decoded body
+RECORDED_HEADERS = {"content-type", "retry-after", "etag", "last-modified", "cache-control", "location"}
+
+
+def _body_bytes(body):
+    if body is None:
+        return b""
+    return body if isinstance(body, bytes) else str(body).encode()
+
+
+def _normalize_url(url):
+    """Give bare-host URLs a "/" path so recorded and replayed forms compare equal."""
+    parts = urlsplit(url)
+    return url if parts.path else parts._replace(path="/").geturl()
+
+
+def _body_hash(body):
+    return hashlib.sha256(_body_bytes(body)).hexdigest()[:16]
+
+
+class Cassette:
+    """
+    HTTP exchanges keyed by method, URL and request body hash, stored as gzip JSON lines.
+
+    Lookups fall back to the last exchange recorded for the same method and URL when the
+    body differs, so small changes to request payloads do not break replay.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.by_url = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def key(method, url, body):
+        return f"{method.upper()} {_normalize_url(url)} {_body_hash(body)}"
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self._add(json.loads(line))
+        logging.info(f"Loaded {len(self.entries)} exchanges from {self.path}")
+
+    def _add(self, entry):
+        key = self.key(entry["method"], entry["url"], base64.b64decode(entry["request_body"]))
+        self.entries[key] = entry
+        self.by_url[(entry["method"], _normalize_url(entry["url"]))] = entry
+
+    def record(self, method, url, body, status, headers, content):
+        entry = {
+            "method": method.upper(),
+            "url": url,
+            "request_body": base64.b64encode(_body_bytes(body)).decode(),
+            "status": status,
+            "headers": {name: value for name, value in headers.items() if name.lower() in RECORDED_HEADERS},
+            "content": base64.b64encode(content).decode()
+        }
+        with self.lock:
+            self._add(entry)
+
+    def lookup(self, method, url, body):
+        """Return the recorded exchange for a request, or None if there is none."""
+        with self.lock:
+            entry = self.entries.get(self.key(method, url, body))
+            return entry or self.by_url.get((method.upper(), _normalize_url(url)))
+
+    def save(self):
+        """Write the cassette atomically; output is byte-identical for identical contents."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self.lock:
+            lines = [json.dumps(self.entries[key], sort_keys=True) for key in sorted(self.entries)]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(gzip.compress(("\n".join(lines) + "\n").encode(), mtime=0))
+        os.replace(tmp_path, self.path)
+        logging.info(f"Saved {len(lines)} exchanges to {self.path}")
+
+    def __len__(self):
+        return len(self.entries)
+
+
+@contextlib.contextmanager
+def recording(path):
+    """
+    Record every http_client response made inside the block into a cassette.
+
+    Yields:
+        Cassette: The cassette, saved when the block exits
+    """
+    cassette = Cassette(path)
+
+    def hook(method, url, response):
+        cassette.record(method, url, response.request.body, response.status_code, response.headers, response.content)
+
+    http_client.add_response_hook(hook)
+    try:
+        yield cassette
+    finally:
+        http_client.remove_response_hook(hook)
+        cassette.save()
+
+
+def replay_url(base_url, url):
+    """Map an upstream URL onto the stand-in server: https://host/p?q -> <base>/https/host/p?q."""
+    parts = urlsplit(url)
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{base_url.rstrip('/')}/{parts.scheme}/{parts.netloc}{parts.path or '/'}{query}"
+
+
+def original_url(path):
+    """Inverse of replay_url for the request path seen by the stand-in server."""
+    scheme, _, rest = path.lstrip("/").partition("/")
+    netloc, _, remainder = rest.partition("/")
+    return f"{scheme}://{netloc}/{remainder}"
+
+
+def rewrite_to(base_url):
+    """URL rewriter for http_client.set_url_rewriter that sends everything to a stand-in server."""
+    return lambda url: replay_url(base_url, url)
+
+
+class TokenBucket:
+    """Requests-per-second limiter used to simulate upstream throttling."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Consume a token; returns 0 if allowed, otherwise the seconds until one is free."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class ReplayServer:
+    """
+    Local stand-in for the upstream sites, serving recorded exchanges.
+
+    Args:
+        cassette (Cassette): Recorded exchanges
+        latency (float): Base seconds added to every response
+        jitter (float): Extra uniform random seconds on top of latency
+        error_rate (float): Fraction of requests answered with a 503 instead of the recording
+        rate_limit (float): Requests per second before answering 429 with Retry-After (None = unlimited)
+        seed (int): Seed for latency jitter and injected errors, for repeatable runs
+        host (str), port (int): Address to bind; port 0 picks a free one
+    """
+
+    def __init__(self, cassette, latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None, seed=0,
+                 host="127.0.0.1", port=0):
+        self.cassette = cassette
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate_limit) if rate_limit else None
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.stats = collections.Counter()
+        self.stats_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, outcome):
+        with self.stats_lock:
+            self.stats[outcome] += 1
+
+    def _draw(self):
+        with self.random_lock:
+            return self.random.random(), self.random.random()
+
+    def respond(self, method, path, body):
+        """Decide the (status, headers, content) for one request."""
+        error_draw, jitter_draw = self._draw()
+        delay = self.latency + self.jitter * jitter_draw
+        if delay:
+            time.sleep(delay)
+
+        if self.bucket is not None:
+            wait = self.bucket.take()
+            if wait:
+                self.count("throttled")
+                return 429, {"Retry-After": str(max(1, round(wait)))}, b"rate limited"
+
+        if error_draw < self.error_rate:
+            self.count("injected_error")
+            return 503, {}, b"injected error"
+
+        entry = self.cassette.lookup(method, original_url(path), body)
+        if entry is None:
+            self.count("miss")
+            return 404, {"X-Replay-Miss": "1"}, b"no recorded exchange"
+
+        self.count("replayed")
+        return entry["status"], entry["headers"], base64.b64decode(entry["content"])
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, headers, content = server.respond(self.command, self.path, body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="replay-server", daemon=True)
+        self.thread.start()
+        logging.info(f"Replay server on {self.url} with {len(self.cassette)} exchanges")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@contextlib.contextmanager
+def replaying(path, **server_options):
+    """
+    Serve a cassette from a local stand-in server and route http_client to it for the block.
+
+    Yields:
+        ReplayServer: The running server (see its stats counter)
+    """
+    server = ReplayServer(Cassette(path), **server_options).start()
+    http_client.set_url_rewriter(rewrite_to(server.url))
+    try:
+        yield server
+    finally:
+        http_client.set_url_rewriter(None)
+        server.stop()
+
+
+def _fetch(source_name):
+    from connectors import get_connectors
+
+    connector = get_connectors([source_name])[source_name]
+    start = time.perf_counter()
+    try:
+        with http_client.deadline(connector.timeout):
+            rows = len(connector.fetch_dataframe())
+        status = "ok" if rows else "empty"
+    except Exception as e:
+        logging.error(f"Load-test fetch of {source_name} failed: {str(e)}")
+        rows, status = 0, "failed"
+    return {"source": source_name, "status": status, "rows": rows, "seconds": time.perf_counter() - start}
+
+
+def load_test(path, sources, runs=10, concurrency=4, **server_options):
+    """
+    Run the source fetchers repeatedly and concurrently against a replayed cassette.
+
+    Returns:
+        dict: Per-source latency percentiles and outcome counts, plus the server's stats
+    """
+    http_client.reset_breakers()
+    with replaying(path, **server_options) as server:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(_fetch, [name for _ in range(runs) for name in sources]))
+        server_stats = dict(server.stats)
+
+    summary = {}
+    for name in sources:
+        runs_for_source = [result for result in results if result["source"] == name]
+        seconds = sorted(result["seconds"] for result in runs_for_source)
+        summary[name] = {
+            "runs": len(runs_for_source),
+            "statuses": dict(collections.Counter(result["status"] for result in runs_for_source)),
+            "rows": sum(result["rows"] for result in runs_for_source),
+            "p50_seconds": round(seconds[len(seconds) // 2], 3),
+            "p95_seconds": round(seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))], 3),
+            "max_seconds": round(seconds[-1], 3)
+        }
+    return {"sources": summary, "server": server_stats}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["record", "serve", "loadtest"])
+    parser.add_argument("--cassette", required=True, help="gzip JSON-lines cassette file")
+    parser.add_argument("--sources", default="grants_gov,ny_grants_gateway", help="comma-separated connector names")
+    parser.add_argument("--port", type=int, default=8765, help="serve: port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--rate-limit", type=float, help="requests per second before answering 429")
+    parser.add_argument("--seed", type=int, default=0, help="seed for jitter and injected errors")
+    parser.add_argument("--runs", type=int, default=10, help="loadtest: fetches per source")
+    parser.add_argument("--concurrency", type=int, default=4, help="loadtest: concurrent fetches")
+    args = parser.parse_args(argv)
+
+    sources = [name for name in args.sources.split(",") if name]
+    server_options = {
+        "latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+        "rate_limit": args.rate_limit, "seed": args.seed
+    }
+
+    if args.command == "record":
+        with recording(args.cassette) as cassette:
+            for name in sources:
+                result = _fetch(name)
+                print(f"{name:<20} {result['status']:<8} {result['rows']:>6} rows {result['seconds']:>8.1f}s")
+        print(f"Recorded {len(cassette)} exchanges to {args.cassette}")
+        return 0
+
+    if args.command == "serve":
+        server = ReplayServer(Cassette(args.cassette), port=args.port, **server_options).start()
+        print(f"Replaying {args.cassette} on {server.url}; set GRANT_HTTP_REPLAY_URL={server.url}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.stop()
+        print(json.dumps(dict(server.stats)))
+        return 0
+
+    report = load_test(args.cassette, sources, runs=args.runs, concurrency=args.concurrency, **server_options)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
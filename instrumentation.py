@@ -0,0 +1,328 @@
+import os
+import sys
+import json
+import time
+import logging
+import datetime
+import threading
+import functools
+import contextlib
+import contextvars
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then reported as 0
+    resource = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Opt-in per-run profiling: "cprofile" or "pyinstrument"
+PROFILER = os.getenv("GRANT_PROFILE", "").strip().lower()
+PROFILE_DIR = os.getenv("GRANT_PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+
+# Opt-in per-stage peak Python allocations via tracemalloc (slows allocation-heavy code)
+TRACE_MEMORY = os.getenv("GRANT_TRACE_MEMORY", "").strip().lower() in ("1", "true", "yes")
+
+METRIC_PREFIX = "grant_tracker_stage"
+
+if TRACE_MEMORY and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+class StageStats:
+    """Cumulative measurements for one named stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.db_round_trips = 0
+        self.peak_rss_bytes = 0
+        self.peak_traced_bytes = 0
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 6),
+            "max_seconds": round(self.max_seconds, 6),
+            "rows": self.rows,
+            "rows_per_second": round(self.rows / self.seconds, 1) if self.seconds and self.rows else None,
+            "bytes": self.bytes,
+            "db_round_trips": self.db_round_trips,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "peak_traced_bytes": self.peak_traced_bytes
+        }
+
+
+class StageTimer:
+    """Measurements for one run of a stage; counters are merged into its StageStats on exit."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.bytes = 0
+        self.db_round_trips = 0
+
+    def add_rows(self, count):
+        self.rows += count
+
+    def add_bytes(self, count):
+        self.bytes += count
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+_run_started_at = datetime.datetime.now()
+
+# Stages open in the current thread/task; byte and round-trip counts go to all of them,
+# so an outer stage includes the work of its nested stages
+_active = contextvars.ContextVar("grant_tracker_active_stages", default=())
+
+
+def _peak_rss_bytes():
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    Time a block of work as a named stage.
+
+    Yields:
+        StageTimer: Call add_rows/add_bytes on it to record throughput
+    """
+    timer = StageTimer(name)
+    outer = _active.get()
+    token = _active.set(outer + (timer,))
+    traced = TRACE_MEMORY and tracemalloc.is_tracing()
+    # The tracemalloc peak is process-wide, so only the outermost stage resets it;
+    # nested stages then report the peak since their outer stage began
+    if traced and not outer:
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield timer
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _active.reset(token)
+        traced_peak = tracemalloc.get_traced_memory()[1] if traced else 0
+
+        with _stats_lock:
+            stats = _stats.get(name)
+            if stats is None:
+                stats = _stats[name] = StageStats(name)
+            stats.calls += 1
+            stats.errors += failed
+            stats.seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            stats.rows += timer.rows
+            stats.bytes += timer.bytes
+            stats.db_round_trips += timer.db_round_trips
+            stats.peak_rss_bytes = max(stats.peak_rss_bytes, _peak_rss_bytes())
+            stats.peak_traced_bytes = max(stats.peak_traced_bytes, traced_peak)
+
+
+def _count_rows(result):
+    """Rows in a stage's return value: DataFrames, lists and (DataFrame, ...) tuples are counted."""
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if hasattr(result, "shape") or isinstance(result, (list, dict)):
+        try:
+            return len(result)
+        except TypeError:
+            return 0
+    return 0
+
+
+def _count_input_rows(args):
+    """Rows in a stage's first argument, for stages that return a flag rather than data."""
+    return _count_rows(args[0]) if args else 0
+
+
+def timed(name=None, rows="result"):
+    """
+    Decorator timing every call of a function as a stage.
+
+    Args:
+        name (str): Stage name (defaults to the function name)
+        rows (str): Where to count rows: "result" (return value), "input" (first
+            argument) or None to record time only
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name) as timer:
+                result = func(*args, **kwargs)
+                if rows == "result":
+                    timer.add_rows(_count_rows(result))
+                elif rows == "input":
+                    timer.add_rows(_count_input_rows(args))
+                return result
+
+        return wrapper
+
+    return decorator
+
+
+def record_bytes(count):
+    """Add fetched bytes to every stage open in the current context."""
+    for timer in _active.get():
+        timer.add_bytes(count)
+
+
+def record_db_round_trip():
+    """Count one database statement against every stage open in the current context."""
+    for timer in _active.get():
+        timer.db_round_trips += 1
+
+
+def instrument_engine(engine):
+    """Count every statement executed through a SQLAlchemy engine as a DB round trip."""
+    if engine is None:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_statement(conn, cursor, statement, parameters, context, executemany):
+        record_db_round_trip()
+
+
+def reset():
+    """Clear all recorded stages and start a new run."""
+    global _run_started_at
+    with _stats_lock:
+        _stats.clear()
+        _run_started_at = datetime.datetime.now()
+
+
+def run_report():
+    """
+    Summarize the stages recorded in this run.
+
+    Returns:
+        dict: started_at, generated_at, process peak RSS and per-stage measurements
+    """
+    with _stats_lock:
+        stages = {name: stats.to_dict() for name, stats in sorted(_stats.items())}
+    return {
+        "started_at": _run_started_at.isoformat(timespec="seconds"),
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "peak_rss_bytes": _peak_rss_bytes(),
+        "stages": stages
+    }
+
+
+def prometheus_text():
+    """Render the recorded stages in the Prometheus text exposition format."""
+    metrics = [
+        ("calls_total", "counter", "Completed runs of the stage", "calls"),
+        ("errors_total", "counter", "Runs of the stage that raised", "errors"),
+        ("seconds_total", "counter", "Wall-clock seconds spent in the stage", "seconds"),
+        ("rows_total", "counter", "Grant rows handled by the stage", "rows"),
+        ("bytes_total", "counter", "Bytes fetched over HTTP during the stage", "bytes"),
+        ("db_round_trips_total", "counter", "Database statements executed during the stage", "db_round_trips"),
+        ("peak_rss_bytes", "gauge", "Process peak resident memory at the end of the stage", "peak_rss_bytes")
+    ]
+    if TRACE_MEMORY:
+        metrics.append(("peak_traced_bytes", "gauge", "Peak Python allocations during the stage", "peak_traced_bytes"))
+
+    with _stats_lock:
+        stages = sorted(_stats.items())
+        lines = []
+        for suffix, kind, help_text, attribute in metrics:
+            metric = f"{METRIC_PREFIX}_{suffix}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, stats in stages:
+                lines.append(f'{metric}{{stage="{name}"}} {getattr(stats, attribute)}')
+    return "\n".join(lines) + "\n"
+
+
+def write_report(path):
+    """
+    Write the run report to a file: Prometheus text for *.prom paths, JSON otherwise.
+
+    Returns:
+        bool: True if written, False on error
+    """
+    try:
+        content = prometheus_text() if path.endswith(".prom") else json.dumps(run_report(), indent=2)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        logging.info(f"Wrote instrumentation report to {path}")
+        return True
+    except Exception as e:
+        logging.error(f"Error writing instrumentation report: {str(e)}")
+        return False
+
+
+# Only one profiler can run at a time in a process
+_profile_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def profile_run(name, profiler=None):
+    """
+    Profile a block with cProfile or pyinstrument when profiling is enabled.
+
+    The profile is written to PROFILE_DIR as <name>-<timestamp>.prof (cProfile, for
+    pstats/snakeviz) or .html (pyinstrument). Does nothing unless GRANT_PROFILE or
+    `profiler` selects a profiler, or while another run is already being profiled.
+    """
+    profiler = (profiler or PROFILER).lower()
+    if profiler not in ("cprofile", "pyinstrument") or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+
+    try:
+        if profiler == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                logging.warning("pyinstrument not installed; falling back to cProfile")
+                profiler = "cprofile"
+
+        if profiler == "pyinstrument":
+            active = Profiler()
+            active.start()
+        else:
+            import cProfile
+            active = cProfile.Profile()
+            active.enable()
+
+        try:
+            yield
+        finally:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+            if profiler == "pyinstrument":
+                active.stop()
+                path = os.path.join(PROFILE_DIR, f"{name}-{timestamp}.html")
+                with open(path, "w") as f:
+                    f.write(active.output_html())
+            else:
+                active.disable()
+                path = os.path.join(PROFILE_DIR, f"{name}-{timestamp}.prof")
+                active.dump_stats(path)
+            logging.info(f"Wrote {profiler} profile to {path}")
+    finally:
+        _profile_lock.release()
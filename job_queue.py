@@ -0,0 +1,526 @@
+"""
+Ingestion job queue shared by every instance through the grants database.
+
+One job is queued per source, or per partition of a paged source, and any number of
+worker processes on any number of nodes claim them, so a refresh runs exactly once
+however many instances are up:
+
+- On Postgres a job is claimed with `SELECT ... FOR UPDATE SKIP LOCKED`, so concurrent
+  workers never wait on each other's rows.
+- On SQLite, where writes are serialized, a job is claimed with a conditional
+  `UPDATE ... WHERE status = 'queued'`; whichever worker's update changes the row owns it.
+- A claimed job is leased for JOB_LEASE_SECONDS and the worker renews the lease with a
+  heartbeat while it runs. A job whose lease runs out (its worker crashed or hung) is
+  queued again, up to its max_attempts.
+- At most one job per source partition is queued or running at a time, enforced by a
+  partial unique index, and a source is only queued again once its interval has passed
+  since its last job finished, whether that job succeeded or failed.
+
+Lease times are compared across nodes, so their clocks are expected to be in sync to
+well within the lease.
+
+    python job_queue.py work            # enqueue due sources and run jobs until stopped
+    python job_queue.py enqueue         # queue every source now
+    python job_queue.py status
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import logging
+import argparse
+import datetime
+import threading
+import contextlib
+
+from sqlalchemy import select, update, func, and_
+from sqlalchemy.exc import IntegrityError
+
+import database
+import http_client
+import instrumentation
+from database import IngestJob
+from connectors import get_connectors
+from notifications import shutdown_dispatcher
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# How long a claimed job stays with its worker without a heartbeat, in seconds
+JOB_LEASE_SECONDS = int(os.getenv("GRANT_JOB_LEASE", "300"))
+
+# Leases are renewed this often, so two heartbeats can be missed before a job is requeued
+HEARTBEAT_INTERVAL = JOB_LEASE_SECONDS / 3
+
+# Runs of a job before it is marked failed
+JOB_MAX_ATTEMPTS = 3
+
+# Delay before retrying a failed job: 1 min, 2 min, 4 min, ...
+JOB_RETRY_BACKOFF = 60
+
+# Seconds an idle worker waits before looking for work again
+POLL_INTERVAL = 10
+
+# Queued jobs a SQLite worker tries to claim in one pass before polling again
+CLAIM_CANDIDATES = 5
+
+# Finished jobs older than this are deleted by prune_jobs, in days
+JOB_HISTORY_DAYS = 30
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def worker_name():
+    """Lease owner name of this process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def job_key(source, partition=None):
+    """Identity of a source partition; one job per key can be active at a time."""
+    if partition is None:
+        return source
+    return f"{source}:{json.dumps(partition, sort_keys=True, separators=(',', ':'))}"
+
+
+def _job_dict(row):
+    return {
+        "id": row.id,
+        "source": row.source,
+        "partition": json.loads(row.payload) if row.payload else None,
+        "attempts": row.attempts,
+        "max_attempts": row.max_attempts,
+        "lease_token": row.lease_token
+    }
+
+
+def enqueue_jobs(source_names=None, due_only=False, now=None):
+    """
+    Queue one job per partition of each source.
+
+    Keys that already have a queued or running job are skipped, so every instance can
+    call this on its own schedule without creating duplicates.
+
+    Args:
+        source_names (list): Connectors to queue (all if None)
+        due_only (bool): Skip partitions whose last job finished, done or failed, less
+            than their connector's interval ago; a source that keeps failing is retried
+            once per interval rather than by every worker loop
+        now (datetime): Current time (defaults to now)
+
+    Returns:
+        int: Number of jobs queued
+    """
+    if database.engine is None:
+        return 0
+
+    now = now or datetime.datetime.now()
+    connectors = get_connectors(source_names)
+    queued = 0
+
+    try:
+        with database.engine.begin() as connection:
+            last_finished = dict(connection.execute(
+                select(IngestJob.job_key, func.max(IngestJob.finished_at))
+                .where(IngestJob.status.notin_(ACTIVE_STATUSES))
+                .group_by(IngestJob.job_key)
+            ).all()) if due_only else {}
+
+            for name, connector in connectors.items():
+                for partition in connector.partitions():
+                    key = job_key(name, partition)
+                    finished_at = last_finished.get(key)
+                    if finished_at is not None and finished_at > now - datetime.timedelta(seconds=connector.interval):
+                        continue
+                    try:
+                        # Savepoint, so a job already active elsewhere does not abort the others
+                        with connection.begin_nested():
+                            connection.execute(IngestJob.__table__.insert().values(
+                                job_key=key,
+                                source=name,
+                                payload=json.dumps(partition) if partition is not None else None,
+                                status="queued",
+                                attempts=0,
+                                max_attempts=JOB_MAX_ATTEMPTS,
+                                run_after=now,
+                                created_at=now
+                            ))
+                        queued += 1
+                    except IntegrityError:
+                        continue
+
+        if queued:
+            logging.info(f"Queued {queued} ingest jobs")
+        return queued
+
+    except Exception as e:
+        logging.error(f"Error queueing ingest jobs: {str(e)}")
+        return 0
+
+
+def requeue_expired(now=None):
+    """
+    Return jobs whose lease ran out to the queue, or fail them once out of attempts.
+
+    Returns:
+        int: Number of jobs requeued or failed
+    """
+    now = now or datetime.datetime.now()
+    expired = and_(IngestJob.status == "running", IngestJob.lease_expires_at < now)
+    lease_cleared = {"lease_owner": None, "lease_token": None, "lease_expires_at": None}
+
+    with database.engine.begin() as connection:
+        requeued = connection.execute(
+            update(IngestJob)
+            .where(expired, IngestJob.attempts < IngestJob.max_attempts)
+            .values(status="queued", run_after=now, error="lease expired", **lease_cleared)
+        ).rowcount
+        failed = connection.execute(
+            update(IngestJob)
+            .where(expired, IngestJob.attempts >= IngestJob.max_attempts)
+            .values(status="failed", finished_at=now, error="lease expired", **lease_cleared)
+        ).rowcount
+
+    if requeued or failed:
+        logging.warning(f"Leases expired: requeued {requeued} jobs, failed {failed}")
+    return requeued + failed
+
+
+def _claim_values(owner, token, now):
+    return {
+        "status": "running",
+        "attempts": IngestJob.attempts + 1,
+        "lease_owner": owner,
+        "lease_token": token,
+        "lease_expires_at": now + datetime.timedelta(seconds=JOB_LEASE_SECONDS),
+        "heartbeat_at": now,
+        "started_at": now,
+        "error": None
+    }
+
+
+def _ready(now):
+    return select(IngestJob.id).where(IngestJob.status == "queued", IngestJob.run_after <= now) \
+        .order_by(IngestJob.run_after, IngestJob.id)
+
+
+def claim_job(owner=None, now=None):
+    """
+    Claim the next runnable job for this worker.
+
+    Expired leases are requeued first, so a crashed worker's job is picked up by the
+    next claim anywhere.
+
+    Args:
+        owner (str): Lease owner name (defaults to worker_name())
+        now (datetime): Current time (defaults to now)
+
+    Returns:
+        dict: id, source, partition, attempts, max_attempts and lease_token of the job,
+        or None if nothing is runnable
+    """
+    if database.engine is None:
+        return None
+
+    owner = owner or worker_name()
+    now = now or datetime.datetime.now()
+    token = uuid.uuid4().hex
+
+    try:
+        requeue_expired(now)
+
+        with database.engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                # Rows locked by another worker's claim are skipped rather than waited for
+                job_id = connection.execute(_ready(now).limit(1).with_for_update(skip_locked=True)).scalar()
+                if job_id is None:
+                    return None
+                connection.execute(update(IngestJob).where(IngestJob.id == job_id).values(**_claim_values(owner, token, now)))
+            else:
+                # Writes are serialized, so only one worker's conditional update can match a queued row
+                job_id = None
+                for candidate in connection.execute(_ready(now).limit(CLAIM_CANDIDATES)).scalars().all():
+                    claimed = connection.execute(
+                        update(IngestJob)
+                        .where(IngestJob.id == candidate, IngestJob.status == "queued")
+                        .values(**_claim_values(owner, token, now))
+                    ).rowcount
+                    if claimed:
+                        job_id = candidate
+                        break
+                if job_id is None:
+                    return None
+
+            row = connection.execute(select(IngestJob).where(IngestJob.id == job_id)).first()
+
+        job = _job_dict(row)
+        logging.info(f"{owner} claimed job {job['id']} ({row.job_key}, attempt {job['attempts']})")
+        return job
+
+    except Exception as e:
+        logging.error(f"Error claiming an ingest job: {str(e)}")
+        return None
+
+
+def _owned(job):
+    return and_(IngestJob.id == job["id"], IngestJob.lease_token == job["lease_token"], IngestJob.status == "running")
+
+
+def heartbeat(job, now=None):
+    """
+    Extend the lease of a running job.
+
+    Returns:
+        bool: False if the lease was lost (the job expired and was requeued or claimed elsewhere)
+    """
+    now = now or datetime.datetime.now()
+    try:
+        with database.engine.begin() as connection:
+            renewed = connection.execute(
+                update(IngestJob).where(_owned(job)).values(
+                    lease_expires_at=now + datetime.timedelta(seconds=JOB_LEASE_SECONDS), heartbeat_at=now
+                )
+            ).rowcount
+        return bool(renewed)
+    except Exception as e:
+        # Keep running; the next heartbeat may get through before the lease runs out
+        logging.warning(f"Heartbeat failed for job {job['id']}: {str(e)}")
+        return True
+
+
+@contextlib.contextmanager
+def keep_lease(job):
+    """Renew the job's lease from a background thread for as long as the block runs."""
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            if not heartbeat(job):
+                logging.warning(f"Lost the lease on job {job['id']}; another worker may run it again")
+                return
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job['id']}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def complete_job(job, report, now=None):
+    """Mark a job done with its run report. Returns False if the lease had been lost."""
+    now = now or datetime.datetime.now()
+    with database.engine.begin() as connection:
+        done = connection.execute(
+            update(IngestJob).where(_owned(job)).values(
+                status="done", finished_at=now, result=json.dumps(report),
+                lease_owner=None, lease_token=None, lease_expires_at=None
+            )
+        ).rowcount
+    return bool(done)
+
+
+def fail_job(job, error, now=None):
+    """
+    Record a failed run: requeue the job after a backoff, or mark it failed once out of attempts.
+
+    Returns:
+        bool: False if the lease had been lost
+    """
+    now = now or datetime.datetime.now()
+    lease_cleared = {"lease_owner": None, "lease_token": None, "lease_expires_at": None}
+    if job["attempts"] < job["max_attempts"]:
+        retry_at = now + datetime.timedelta(seconds=JOB_RETRY_BACKOFF * 2 ** (job["attempts"] - 1))
+        values = {"status": "queued", "run_after": retry_at, "error": str(error), **lease_cleared}
+    else:
+        values = {"status": "failed", "finished_at": now, "error": str(error), **lease_cleared}
+
+    with database.engine.begin() as connection:
+        failed = connection.execute(update(IngestJob).where(_owned(job)).values(**values)).rowcount
+    return bool(failed)
+
+
+def run_job(job):
+    """
+    Fetch and ingest one job's source partition.
+
+    Returns:
+        dict: Run report with status ("ok", "empty" or "failed"), duration and record counts
+    """
+    # Imported here: the pipeline loads the full processing stack, which enqueueing and status do not need
+    from pipeline import ingest_grants
+
+    source_name = job["source"]
+    report = {"source": source_name, "partition": job["partition"], "status": "failed", "fetched": 0, "saved": 0}
+    start = time.perf_counter()
+
+    connector = get_connectors([source_name])[source_name]
+    with instrumentation.profile_run(f"job-{source_name}"):
+        with instrumentation.stage(f"fetch_{source_name}") as timer:
+            with http_client.deadline(connector.timeout):
+                raw_df = connector.fetch_partition(job["partition"])
+            timer.add_rows(len(raw_df))
+        report["fetched"] = len(raw_df)
+
+        if raw_df.empty:
+            report["status"] = "empty"
+        else:
+            saved = ingest_grants(raw_df)
+            report["saved"] = saved or 0
+            report["status"] = "failed" if saved is None else "ok"
+
+    report["duration"] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def process_next_job(owner=None):
+    """
+    Claim one job, run it under a renewed lease and record the outcome.
+
+    Returns:
+        dict: The run report, or None if there was no runnable job
+    """
+    job = claim_job(owner)
+    if job is None:
+        return None
+
+    try:
+        with keep_lease(job):
+            report = run_job(job)
+    except Exception as e:
+        logging.error(f"Job {job['id']} ({job['source']}) raised: {str(e)}")
+        report = {"source": job["source"], "partition": job["partition"], "status": "failed", "error": str(e)}
+
+    try:
+        if report["status"] == "failed":
+            recorded = fail_job(job, report.get("error", "ingest failed"))
+        else:
+            recorded = complete_job(job, report)
+        if not recorded:
+            logging.warning(f"Job {job['id']} finished after its lease was lost; outcome not recorded")
+    except Exception as e:
+        # The lease will run out and the job will be retried
+        logging.error(f"Error recording the outcome of job {job['id']}: {str(e)}")
+
+    logging.info(f"Job {job['id']} ({job['source']}): {report['status']}")
+    return report
+
+
+def work(owner=None, once=False, enqueue_due=True, poll_interval=POLL_INTERVAL, stop_event=None):
+    """
+    Worker loop: queue sources that are due, then run jobs until stopped.
+
+    Args:
+        owner (str): Lease owner name (defaults to worker_name())
+        once (bool): Return when no job is runnable instead of polling
+        enqueue_due (bool): Queue due sources before looking for work
+        poll_interval (float): Seconds to wait when idle
+        stop_event (threading.Event): Set to stop after the current job
+
+    Returns:
+        int: Number of jobs run
+    """
+    owner = owner or worker_name()
+    stop_event = stop_event or threading.Event()
+    jobs_run = 0
+
+    while not stop_event.is_set():
+        if enqueue_due:
+            enqueue_jobs(due_only=True)
+        report = process_next_job(owner)
+        if report is not None:
+            jobs_run += 1
+            continue
+        if once:
+            break
+        stop_event.wait(poll_interval)
+
+    return jobs_run
+
+
+def queue_status():
+    """
+    Jobs per status, plus the jobs currently running.
+
+    Returns:
+        dict: {"counts": {status: count}, "running": [job dicts with owner and lease expiry]}
+    """
+    if database.engine is None:
+        return {"counts": {}, "running": []}
+
+    with database.engine.connect() as connection:
+        counts = dict(connection.execute(
+            select(IngestJob.status, func.count()).group_by(IngestJob.status)
+        ).all())
+        running = [
+            {"id": row.id, "job": row.job_key, "owner": row.lease_owner, "attempts": row.attempts,
+             "lease_expires_at": row.lease_expires_at.isoformat(timespec="seconds")}
+            for row in connection.execute(select(IngestJob).where(IngestJob.status == "running").order_by(IngestJob.id))
+        ]
+    return {"counts": counts, "running": running}
+
+
+def prune_jobs(days=JOB_HISTORY_DAYS, now=None):
+    """Delete finished jobs older than `days`. Returns the number deleted."""
+    now = now or datetime.datetime.now()
+    with database.engine.begin() as connection:
+        return connection.execute(
+            IngestJob.__table__.delete().where(
+                IngestJob.status.notin_(ACTIVE_STATUSES),
+                IngestJob.finished_at < now - datetime.timedelta(days=days)
+            )
+        ).rowcount
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    work_parser = commands.add_parser("work", help="run jobs, queueing sources as they fall due")
+    work_parser.add_argument("--once", action="store_true", help="exit when no job is runnable")
+    work_parser.add_argument("--no-enqueue", action="store_true", help="only run jobs other instances queued")
+
+    enqueue_parser = commands.add_parser("enqueue", help="queue a refresh of every selected source now")
+    enqueue_parser.add_argument("--sources", help="comma-separated connector names (all if omitted)")
+
+    commands.add_parser("status", help="show job counts and running jobs")
+    commands.add_parser("prune", help=f"delete finished jobs older than {JOB_HISTORY_DAYS} days")
+    args = parser.parse_args(argv)
+
+    if database.engine is None:
+        print("DATABASE_URL is not set")
+        return 1
+
+    if args.command == "work":
+        from alerts import enable_alerts
+
+        database.create_tables()
+        # Saved-search alerts run on the new or changed grants of every ingest
+        enable_alerts()
+        try:
+            jobs_run = work(once=args.once, enqueue_due=not args.no_enqueue)
+        except KeyboardInterrupt:
+            logging.info("Stopping job worker...")
+            return 0
+        finally:
+            # Deliver the alert digests these jobs queued before the process exits
+            shutdown_dispatcher()
+        print(f"Ran {jobs_run} jobs")
+    elif args.command == "enqueue":
+        database.create_tables()
+        print(f"Queued {enqueue_jobs(args.sources.split(',') if args.sources else None)} jobs")
+    elif args.command == "status":
+        database.create_tables()
+        status = queue_status()
+        print("  ".join(f"{name}: {count}" for name, count in sorted(status["counts"].items())) or "No jobs")
+        for job in status["running"]:
+            print(f"  #{job['id']} {job['job']} on {job['owner']} (attempt {job['attempts']}, lease until {job['lease_expires_at']})")
+    elif args.command == "prune":
+        print(f"Deleted {prune_jobs()} finished jobs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
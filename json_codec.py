@@ -0,0 +1,89 @@
+import os
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:  # optional fast decoder
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # optional fast decoder with typed structs
+    msgspec = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Decoder backends in order of preference; GRANT_JSON_BACKEND forces one ("orjson", "msgspec" or "stdlib")
+AVAILABLE_BACKENDS = [name for name, module in [("orjson", orjson), ("msgspec", msgspec)] if module] + ["stdlib"]
+
+
+def _select_backend():
+    requested = os.getenv("GRANT_JSON_BACKEND", "").strip().lower()
+    if requested:
+        if requested in AVAILABLE_BACKENDS:
+            return requested
+        logging.warning(f"JSON backend '{requested}' not available, using {AVAILABLE_BACKENDS[0]}")
+    return AVAILABLE_BACKENDS[0]
+
+
+BACKEND = _select_backend()
+
+
+def loads(content, backend=None):
+    """
+    Decode a JSON document into Python objects using the fastest available backend.
+
+    Args:
+        content (bytes or str): JSON text, ideally the raw response bytes
+        backend (str): Force a backend (defaults to the module-level BACKEND)
+
+    Returns:
+        object: Decoded value
+
+    Raises:
+        ValueError: The content is not valid JSON (every backend's error subclasses ValueError)
+    """
+    backend = backend or BACKEND
+    if backend == "orjson":
+        return orjson.loads(content)
+    if backend == "msgspec":
+        return msgspec.json.decode(content)
+    return json.loads(content)
+
+
+def decode_typed(content, struct_type):
+    """
+    Decode JSON straight into a msgspec Struct type, validating it along the way.
+
+    Returns:
+        object: Instance of struct_type, or None if msgspec is not installed or the
+        document does not match the type (callers then fall back to `loads`)
+    """
+    if msgspec is None or struct_type is None:
+        return None
+    try:
+        return msgspec.json.decode(content, type=struct_type)
+    except msgspec.ValidationError as e:
+        logging.debug(f"Typed JSON decode skipped: {str(e)}")
+        return None
+
+
+def dumps(value, backend=None):
+    """
+    Encode a value as compact UTF-8 JSON bytes using the fastest available backend.
+
+    Args:
+        value (object): JSON-compatible value (dicts, lists, strings, numbers, None)
+        backend (str): Force a backend (defaults to the module-level BACKEND)
+
+    Returns:
+        bytes: Encoded document
+    """
+    backend = backend or BACKEND
+    if backend == "orjson":
+        return orjson.dumps(value)
+    if backend == "msgspec":
+        return msgspec.json.encode(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
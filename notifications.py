@@ -0,0 +1,308 @@
+import os
+import json
+import time
+import uuid
+import random
+import socket
+import sqlite3
+import logging
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import send_emails, send_slack
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Persistent queue of pending notifications, so nothing is lost if the process restarts
+NOTIFY_QUEUE_PATH = os.getenv(
+    "GRANT_NOTIFY_QUEUE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".notifications.db")
+)
+
+# Concurrent deliveries (SMTP sessions or Slack posts)
+NOTIFY_WORKERS = int(os.getenv("GRANT_NOTIFY_WORKERS", "4"))
+
+# Emails sent over one SMTP connection
+EMAIL_BATCH_SIZE = 50
+
+# Retry policy for failed deliveries: 1 min, 2 min, 4 min, ... with jitter
+MAX_ATTEMPTS = 5
+RETRY_BASE = 60
+RETRY_MAX = 3600
+
+# How often the dispatcher looks for due retries when it has not been woken
+POLL_INTERVAL = 5
+
+# Seconds after which a claimed notification still in flight is presumed lost with its
+# process and handed out again; well above the time one SMTP batch can take
+CLAIM_TIMEOUT = int(os.getenv("GRANT_NOTIFY_CLAIM_TIMEOUT", "900"))
+
+# Longest a command-line run waits on exit for queued notifications to be delivered
+EXIT_FLUSH_TIMEOUT = int(os.getenv("GRANT_NOTIFY_EXIT_TIMEOUT", "60"))
+
+
+class NotificationDispatcher:
+    """
+    Asynchronous email and Slack delivery backed by a persistent SQLite queue.
+
+    Callers enqueue and return immediately. A dispatcher thread claims due notifications
+    and hands them to a bounded worker pool: emails go out in batches over one SMTP
+    connection each, Slack messages through http_client's pooled sessions. Failures are
+    retried with exponential backoff up to MAX_ATTEMPTS.
+
+    The queue file is shared by every process on the host (scheduler, job queue
+    workers, one-off runs), so each claim records its owner and time. A claim is only
+    taken over once it is CLAIM_TIMEOUT old, which is how notifications left in flight
+    by a process that died get delivered.
+    """
+
+    def __init__(self, queue_path=NOTIFY_QUEUE_PATH, workers=NOTIFY_WORKERS, batch_size=EMAIL_BATCH_SIZE):
+        self.queue_path = queue_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.slots = threading.BoundedSemaphore(workers)
+        self.executor = None
+        self.thread = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        os.makedirs(os.path.dirname(os.path.abspath(queue_path)), exist_ok=True)
+        self.connection = sqlite3.connect(queue_path, timeout=30, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS notifications (
+                    id INTEGER PRIMARY KEY,
+                    channel TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    last_error TEXT,
+                    created_at TEXT NOT NULL,
+                    claimed_by TEXT,
+                    claimed_at REAL
+                )
+            """)
+            columns = {row[1] for row in self.connection.execute("PRAGMA table_info(notifications)")}
+            for column, column_type in (("claimed_by", "TEXT"), ("claimed_at", "REAL")):
+                if column not in columns:
+                    self.connection.execute(f"ALTER TABLE notifications ADD COLUMN {column} {column_type}")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_notifications_due ON notifications (status, next_attempt_at)"
+            )
+
+    def _enqueue(self, channel, payloads):
+        now = time.time()
+        created_at = datetime.datetime.now().isoformat(timespec="seconds")
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO notifications (channel, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+                [(channel, json.dumps(payload), now, created_at) for payload in payloads]
+            )
+        self.wakeup.set()
+        return len(payloads)
+
+    def enqueue_email(self, recipient, subject, body, attachment=None, attachment_name=None):
+        """Queue one email for delivery."""
+        return self._enqueue("email", [{
+            "recipient": recipient, "subject": subject, "body": body,
+            "attachment": attachment, "attachment_name": attachment_name
+        }])
+
+    def enqueue_digest(self, recipients, subject, body, attachment=None, attachment_name=None):
+        """Queue the same email to every recipient of a distribution list."""
+        return self._enqueue("email", [{
+            "recipient": recipient, "subject": subject, "body": body,
+            "attachment": attachment, "attachment_name": attachment_name
+        } for recipient in recipients])
+
+    def enqueue_slack(self, channel, message, file_content=None, file_name=None):
+        """Queue one Slack message for delivery."""
+        return self._enqueue("slack", [{
+            "channel": channel, "message": message, "file_content": file_content, "file_name": file_name
+        }])
+
+    def _claim(self, channel, limit):
+        """Mark up to `limit` due notifications of a channel as in flight and return them."""
+        now = time.time()
+        with self.lock, self.connection:
+            # Claims that outlived CLAIM_TIMEOUT belonged to a process that is gone
+            self.connection.execute(
+                "UPDATE notifications SET status = 'pending', claimed_by = NULL, claimed_at = NULL "
+                "WHERE status = 'in_flight' AND (claimed_at IS NULL OR claimed_at < ?)", (now - CLAIM_TIMEOUT,)
+            )
+            rows = self.connection.execute(
+                "SELECT id, payload, attempts FROM notifications "
+                "WHERE status = 'pending' AND channel = ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, id LIMIT ?",
+                (channel, now, limit)
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE notifications SET status = 'in_flight', claimed_by = ?, claimed_at = ? WHERE id = ?",
+                [(self.owner, now, row[0]) for row in rows]
+            )
+        return [(row_id, json.loads(payload), attempts) for row_id, payload, attempts in rows]
+
+    def _finish(self, results):
+        """
+        Record delivery outcomes: (id, attempts, error or None) per notification.
+
+        Only this dispatcher's own claims are updated; a notification another process
+        reclaimed after CLAIM_TIMEOUT belongs to that process now.
+        """
+        now = time.time()
+        updates = []
+        for row_id, attempts, error in results:
+            attempts += 1
+            if error is None:
+                updates.append(("sent", attempts, now, None, row_id, self.owner))
+            elif attempts >= MAX_ATTEMPTS:
+                logging.error(f"Giving up on notification {row_id} after {attempts} attempts: {error}")
+                updates.append(("failed", attempts, now, error, row_id, self.owner))
+            else:
+                delay = min(RETRY_MAX, RETRY_BASE * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+                updates.append(("pending", attempts, now + delay, error, row_id, self.owner))
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "UPDATE notifications SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                "claimed_by = NULL, claimed_at = NULL WHERE id = ? AND claimed_by = ? AND status = 'in_flight'",
+                updates
+            )
+
+    def _deliver_emails(self, claimed):
+        try:
+            errors = send_emails([payload for _, payload, _ in claimed])
+        except Exception as e:
+            errors = [str(e)] * len(claimed)
+        self._finish([(row_id, attempts, error) for (row_id, _, attempts), error in zip(claimed, errors)])
+
+    def _deliver_slack(self, claimed):
+        results = []
+        for row_id, payload, attempts in claimed:
+            try:
+                ok = send_slack(payload["channel"], payload["message"], payload.get("file_content"), payload.get("file_name"))
+            except Exception as e:
+                ok = False
+                logging.error(f"Error delivering Slack notification {row_id}: {str(e)}")
+            results.append((row_id, attempts, None if ok else "Slack delivery failed"))
+        self._finish(results)
+
+    def _run_job(self, deliver, claimed):
+        try:
+            deliver(claimed)
+        except Exception as e:
+            logging.error(f"Notification delivery failed: {str(e)}")
+            self._finish([(row_id, attempts, str(e)) for row_id, _, attempts in claimed])
+        finally:
+            self.slots.release()
+            self.wakeup.set()
+
+    def dispatch_once(self):
+        """Hand due notifications to free workers; returns the number claimed."""
+        claimed_total = 0
+        for channel, deliver, limit in [
+            ("email", self._deliver_emails, self.batch_size),
+            ("slack", self._deliver_slack, 1)
+        ]:
+            while self.slots.acquire(blocking=False):
+                claimed = self._claim(channel, limit)
+                if not claimed:
+                    self.slots.release()
+                    break
+                claimed_total += len(claimed)
+                self.executor.submit(self._run_job, deliver, claimed)
+        return claimed_total
+
+    def _loop(self):
+        while not self.stopping.is_set():
+            self.wakeup.clear()
+            try:
+                self.dispatch_once()
+            except Exception as e:
+                logging.error(f"Error dispatching notifications: {str(e)}")
+            self.wakeup.wait(POLL_INTERVAL)
+
+    def start(self):
+        """Start the dispatcher thread and worker pool."""
+        if self.thread is not None:
+            return self
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="notify")
+        self.thread = threading.Thread(target=self._loop, name="notify-dispatcher", daemon=True)
+        self.thread.start()
+        return self
+
+    def counts(self):
+        """Number of notifications per status."""
+        with self.lock:
+            return dict(self.connection.execute("SELECT status, COUNT(*) FROM notifications GROUP BY status"))
+
+    def flush(self, timeout=60):
+        """
+        Wait until nothing is due or in flight with this dispatcher.
+
+        Returns:
+            bool: True if the queue drained (retries scheduled for later and other
+            processes' deliveries do not count), False on timeout
+        """
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            with self.lock:
+                busy = self.connection.execute(
+                    "SELECT COUNT(*) FROM notifications WHERE (status = 'in_flight' AND claimed_by = ?) "
+                    "OR (status = 'pending' AND next_attempt_at <= ?)", (self.owner, time.time())
+                ).fetchone()[0]
+            if not busy:
+                return True
+            self.wakeup.set()
+            time.sleep(0.05)
+        return False
+
+    def stop(self, timeout=30):
+        """Finish in-flight deliveries and stop; pending notifications stay queued."""
+        if self.thread is None:
+            return
+        self.stopping.set()
+        self.wakeup.set()
+        self.thread.join(timeout)
+        self.executor.shutdown(wait=True)
+        self.thread = None
+        self.executor = None
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Return the process-wide dispatcher, starting it on first use."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher().start()
+        return _dispatcher
+
+
+def shutdown_dispatcher(timeout=EXIT_FLUSH_TIMEOUT):
+    """
+    Deliver whatever is due and stop the process-wide dispatcher, if it was started.
+
+    Its thread is a daemon, so a short-lived run (refresh_scheduler --once, job_queue
+    work --once) must call this before exiting or its digests wait for the next run.
+
+    Returns:
+        bool: True if nothing due was left undelivered
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is None:
+        return True
+    drained = dispatcher.flush(timeout)
+    if not drained:
+        logging.warning(f"Notifications still due after {timeout}s; they stay queued for the next run")
+    dispatcher.stop()
+    return drained
@@ -5,6 +5,17 @@ import datetime
 import logging
 import time
 import re
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import http_client
+from instrumentation import timed
+from connectors import GrantConnector, register_connector, dataframe_records
+from quality_rules import is_low_quality_title, is_low_quality_link
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -18,6 +29,26 @@ NY_GRANTS_GATEWAY_URLS = [
     "https://regional-institute.buffalo.edu/nys-funding-opportunities/"
 ]
 
+# Placeholder text a listing gets when its row carries no description or eligibility
+PLACEHOLDER_DESCRIPTION = "No description available."
+PLACEHOLDER_ELIGIBILITY = "Contact New York State Grants Gateway for eligibility information."
+
+# Detail pages fetched concurrently, overall and per host
+DETAIL_WORKERS = int(os.getenv("GRANT_NY_DETAIL_WORKERS", "8"))
+DETAIL_PER_HOST = int(os.getenv("GRANT_NY_DETAIL_PER_HOST", "2"))
+DETAIL_TIMEOUT = 15
+
+# Parsed detail pages are cached by URL; an entry is reused while the listing row is
+# unchanged and the entry is younger than DETAIL_CACHE_TTL seconds
+DETAIL_CACHE_PATH = os.getenv(
+    "GRANT_NY_DETAIL_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ny_detail_cache.db")
+)
+DETAIL_CACHE_TTL = 7 * 24 * 3600
+
+# Longest description kept from a detail page
+MAX_DESCRIPTION_LENGTH = 2000
+
+@timed()
 def fetch_ny_grants_gateway_opportunities():
     """
     Scrape grant opportunities from the New York State Grants Gateway website.
@@ -42,7 +73,7 @@ def fetch_ny_grants_gateway_opportunities():
         for url in NY_GRANTS_GATEWAY_URLS:
             try:
                 logging.info(f"Trying NY Grants URL: {url}")
-                temp_response = requests.get(url, headers=headers, timeout=15)
+                temp_response = http_client.get(url, headers=headers, timeout=15)
                 
                 if temp_response.status_code == 200:
                     logging.info(f"Successfully connected to {url}")
@@ -64,6 +95,7 @@ def fetch_ny_grants_gateway_opportunities():
         soup = BeautifulSoup(response.text, 'html.parser')
         
         # Find the table containing grant opportunities
+        listings = []
         opportunities = []
         grant_elements = []
         
@@ -142,13 +174,7 @@ def fetch_ny_grants_gateway_opportunities():
                     continue
                     
                 # Skip entries with generic or helper-text titles
-                skip_titles = [
-                    "click here", "page help", "tutorial", "help", "nysggportal", 
-                    "goportal", "login", "register", "pdf", "manual", "grantopportunities", 
-                    "mygrants", "learn more", "home", "back", "next"
-                ]
-                
-                if any(skip_word in title.lower() for skip_word in skip_titles):
+                if is_low_quality_title(title):
                     continue
                     
                 # Skip entries that are too short to be meaningful
@@ -178,7 +204,7 @@ def fetch_ny_grants_gateway_opportunities():
                             link = f"{base_url.rstrip('/')}/{link.lstrip('/')}"
                 
                 # Skip entries with links to manuals, tutorials, help pages or PDFs
-                if any(skip_item in link.lower() for skip_item in ['help', 'tutorial', 'manual', '.pdf']):
+                if is_low_quality_link(link):
                     continue
                     
                 # If no valid link, skip this entry
@@ -193,8 +219,8 @@ def fetch_ny_grants_gateway_opportunities():
                     "Link": link,
                     "Funder": "New York State",
                     "Source": "NY Grants Gateway",
-                    "Description": "No description available.",
-                    "Eligibility": "Contact New York State Grants Gateway for eligibility information."
+                    "Description": PLACEHOLDER_DESCRIPTION,
+                    "Eligibility": PLACEHOLDER_ELIGIBILITY
                 }
                 
                 for info in info_elements:
@@ -205,34 +231,24 @@ def fetch_ny_grants_gateway_opportunities():
                     label_text = label.get_text(strip=True).replace(":", "")
                     value_element = info.find("div", class_="field-content") or info.find("span") or info
                     value = value_element.get_text(strip=True).replace(label_text, "") if value_element else ""
-                    
-                    if "Funding" in label_text or "Award" in label_text or "Amount" in label_text:
-                        grant_info["Award Amount"] = parse_amount(value)
-                    elif "Deadline" in label_text or "Due Date" in label_text or "Close" in label_text:
-                        grant_info["Deadline"] = parse_date(value)
-                    elif "Description" in label_text or "Summary" in label_text or "Overview" in label_text:
-                        grant_info["Description"] = value
-                    elif "Eligible" in label_text or "Eligibility" in label_text:
-                        grant_info["Eligibility"] = value
-                    elif "Issued" in label_text or "Posted" in label_text or "Start" in label_text or "Open" in label_text:
-                        grant_info["Start Date"] = parse_date(value)
-                    elif "Agency" in label_text or "Department" in label_text or "Issuer" in label_text:
-                        grant_info["Funder"] = value
-                
-                # Check if we have enough quality data to include this grant
-                found_data = False
-                
-                # Consider a grant valid if it has at least deadline or award amount and a meaningful description
-                if grant_info["Deadline"] or grant_info["Award Amount"]:
-                    found_data = True
+                    apply_labelled_field(grant_info, label_text, value)
                 
-                # Skip grants with default/placeholder values only
-                if found_data and len(grant_info["Description"]) > 25:
-                    opportunities.append(grant_info)
+                listings.append(grant_info)
                 
             except Exception as e:
                 logging.warning(f"Error parsing grant element: {str(e)}")
         
+        # Most listing rows only carry a title and link; fill in the rest from each detail page
+        enrich_from_detail_pages(listings, headers)
+        
+        for grant_info in listings:
+            # Consider a grant valid if it has at least deadline or award amount and a meaningful description
+            found_data = bool(grant_info.get("Deadline") or grant_info.get("Award Amount"))
+            
+            # Skip grants with default/placeholder values only
+            if found_data and len(grant_info["Description"]) > 25:
+                opportunities.append(grant_info)
+        
         # Convert to DataFrame
         if not opportunities:
             logging.warning("No grant opportunities found on NY Grants Gateway")
@@ -301,3 +317,333 @@ def parse_amount(amount_str):
         return float(amount_str) if amount_str else None
     except:
         return None
+
+
+
+def apply_labelled_field(grant_info, label_text, value):
+    """
+    Store a labelled value from a listing row or detail page under the matching grant field.
+    
+    Returns:
+        bool: True if the label was recognized
+    """
+    if "Funding" in label_text or "Award" in label_text or "Amount" in label_text:
+        grant_info["Award Amount"] = parse_amount(value)
+    elif "Deadline" in label_text or "Due Date" in label_text or "Close" in label_text:
+        grant_info["Deadline"] = parse_date(value)
+    elif "Description" in label_text or "Summary" in label_text or "Overview" in label_text:
+        grant_info["Description"] = value
+    elif "Eligible" in label_text or "Eligibility" in label_text:
+        grant_info["Eligibility"] = value
+    elif "Issued" in label_text or "Posted" in label_text or "Start" in label_text or "Open" in label_text:
+        grant_info["Start Date"] = parse_date(value)
+    elif "Agency" in label_text or "Department" in label_text or "Issuer" in label_text:
+        grant_info["Funder"] = value
+    else:
+        return False
+    return True
+
+
+# Free-text fallbacks for detail pages that state the deadline or award in a sentence
+DEADLINE_PATTERN = re.compile(
+    r"(?:deadline|due date|due by|applications? (?:are )?due|closing date)\W{0,3}(?:is\s+)?"
+    r"([A-Z][a-z]+\.? \d{1,2},? \d{4}|\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2}-\d{2})",
+    re.IGNORECASE
+)
+AMOUNT_PATTERN = re.compile(
+    r"(?:award|funding|amount|grants? of|up to)[^$.]{0,60}\$\s?([\d,]+(?:\.\d+)?)\s*(million)?",
+    re.IGNORECASE
+)
+
+
+def _labelled_pairs(soup):
+    """(label, value) text pairs from definition lists, two-column tables and labelled fields."""
+    for term in soup.find_all("dt"):
+        definition = term.find_next_sibling("dd")
+        if definition:
+            yield term.get_text(" ", strip=True), definition.get_text(" ", strip=True)
+    
+    for row in soup.find_all("tr"):
+        header, cell = row.find("th"), row.find("td")
+        if header and cell:
+            yield header.get_text(" ", strip=True), cell.get_text(" ", strip=True)
+    
+    for label in soup.find_all(["label", "strong", "b"]) + soup.find_all("div", class_=["views-label", "field-label", "field__label"]):
+        parent = label.parent
+        if parent is None or parent.name not in ("div", "p", "li", "span", "section"):
+            continue
+        label_text = label.get_text(" ", strip=True)
+        yield label_text, parent.get_text(" ", strip=True).replace(label_text, "", 1)
+
+
+def parse_detail_page(html):
+    """
+    Extract grant fields from an opportunity's detail page.
+    
+    Labelled fields (definition lists, tables, "Label:" prefixes) are read with the same
+    rules as listing rows. A description falls back to the main content paragraphs and
+    then the page's meta description; deadline and award fall back to free-text patterns.
+    
+    Args:
+        html (str): Detail page HTML
+        
+    Returns:
+        dict: The fields found, among Description, Eligibility, Award Amount, Deadline, Start Date and Funder
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    for element in soup(["script", "style", "nav", "header", "footer"]):
+        element.decompose()
+    
+    fields = {}
+    for label_text, value in _labelled_pairs(soup):
+        label_text = label_text.replace(":", "").strip()
+        value = value.strip(" :")
+        if not label_text or len(label_text) > 60 or not value or len(value) > MAX_DESCRIPTION_LENGTH:
+            continue
+        found = {}
+        if apply_labelled_field(found, label_text, value):
+            for key, found_value in found.items():
+                if found_value and key not in fields:
+                    fields[key] = found_value
+    
+    if len(fields.get("Description", "")) <= 25:
+        content = soup.find("main") or soup.find("article") or soup.body or soup
+        paragraphs = [p.get_text(" ", strip=True) for p in content.find_all("p")]
+        description = " ".join(text for text in paragraphs if len(text) > 40)
+        if not description:
+            meta = soup.find("meta", attrs={"property": "og:description"}) or soup.find("meta", attrs={"name": "description"})
+            description = meta.get("content", "").strip() if meta else ""
+        if len(description) > 25:
+            fields["Description"] = description
+    if "Description" in fields:
+        fields["Description"] = fields["Description"][:MAX_DESCRIPTION_LENGTH]
+    
+    text = soup.get_text(" ", strip=True)
+    if not fields.get("Deadline"):
+        match = DEADLINE_PATTERN.search(text)
+        deadline = parse_date(match.group(1).replace(".", "")) if match else None
+        if deadline:
+            fields["Deadline"] = deadline
+    if not fields.get("Award Amount"):
+        match = AMOUNT_PATTERN.search(text)
+        amount = parse_amount(match.group(1)) if match else None
+        if amount:
+            fields["Award Amount"] = amount * 1_000_000 if match.group(2) else amount
+    
+    return fields
+
+
+def listing_fingerprint(grant_info):
+    """Hash of what the listing row itself says, so a changed row invalidates its cached detail page."""
+    values = [str(grant_info.get(key)) for key in ("Title", "Funder", "Description", "Eligibility", "Deadline", "Award Amount", "Start Date")]
+    return hashlib.sha1(json.dumps(values).encode()).hexdigest()
+
+
+class DetailPageCache:
+    """
+    Parsed NY detail pages keyed by URL, persisted in SQLite between runs.
+    
+    Each entry keeps the listing fingerprint it was fetched for, the extracted fields and
+    the page's ETag/Last-Modified, so stale entries can be revalidated with a conditional GET.
+    """
+    
+    def __init__(self, path=DETAIL_CACHE_PATH):
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("""
+                CREATE TABLE IF NOT EXISTS detail_pages (
+                    url TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    fields TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+    
+    def get(self, url):
+        """Return the cached entry for a URL as a dict, or None."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT fingerprint, fields, etag, last_modified, fetched_at FROM detail_pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        fields = json.loads(row[1])
+        for key in ("Deadline", "Start Date"):
+            if fields.get(key):
+                fields[key] = datetime.datetime.fromisoformat(fields[key])
+        return {"fingerprint": row[0], "fields": fields, "etag": row[2], "last_modified": row[3], "fetched_at": row[4]}
+    
+    def put(self, url, fingerprint, fields, etag=None, last_modified=None):
+        """Store the parsed fields of a detail page."""
+        stored = {key: value.isoformat() if isinstance(value, datetime.datetime) else value for key, value in fields.items()}
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO detail_pages (url, fingerprint, fields, etag, last_modified, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, fingerprint, json.dumps(stored), etag, last_modified, time.time())
+            )
+    
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+def _needs_detail(grant_info):
+    link = grant_info.get("Link") or ""
+    return link.startswith("http") and (
+        grant_info.get("Description") == PLACEHOLDER_DESCRIPTION
+        or grant_info.get("Eligibility") == PLACEHOLDER_ELIGIBILITY
+        or not grant_info.get("Deadline")
+        or not grant_info.get("Award Amount")
+    )
+
+
+def _merge_detail(grant_info, fields):
+    """
+    Fill placeholder or missing listing fields from a detail page; real listing values win,
+    except that a longer detail description replaces the listing's shortened summary.
+    """
+    if fields.get("Description") and (
+        grant_info.get("Description") == PLACEHOLDER_DESCRIPTION
+        or len(fields["Description"]) > len(grant_info.get("Description") or "")
+    ):
+        grant_info["Description"] = fields["Description"]
+    if fields.get("Eligibility") and grant_info.get("Eligibility") == PLACEHOLDER_ELIGIBILITY:
+        grant_info["Eligibility"] = fields["Eligibility"]
+    if fields.get("Funder") and grant_info.get("Funder") == "New York State":
+        grant_info["Funder"] = fields["Funder"]
+    for key in ("Award Amount", "Deadline", "Start Date"):
+        if fields.get(key) and not grant_info.get(key):
+            grant_info[key] = fields[key]
+
+
+def _fetch_detail(url, fingerprint, entry, headers, host_slots, cache):
+    """
+    Fetch and parse one detail page, revalidating a stale cache entry; returns its fields or None.
+    
+    Any failure is logged and confined to this page, so one bad page or a cache error
+    never costs the rest of the listing.
+    """
+    request_headers = dict(headers)
+    if entry and entry["etag"]:
+        request_headers["If-None-Match"] = entry["etag"]
+    if entry and entry["last_modified"]:
+        request_headers["If-Modified-Since"] = entry["last_modified"]
+    
+    try:
+        with host_slots[urlsplit(url).netloc]:
+            response = http_client.get(url, headers=request_headers, timeout=DETAIL_TIMEOUT)
+    except (requests.exceptions.RequestException, http_client.CircuitOpenError) as e:
+        logging.warning(f"Could not fetch NY detail page {url}: {str(e)}")
+        return None
+    
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if response.status_code == 304 and entry:
+        fields = entry["fields"]
+        # A 304 need not repeat the validators; keep the stored ones
+        etag = etag or entry["etag"]
+        last_modified = last_modified or entry["last_modified"]
+    elif response.status_code == 200:
+        try:
+            fields = parse_detail_page(response.text)
+        except Exception as e:
+            logging.error(f"Error parsing NY detail page {url}: {str(e)}")
+            return None
+    else:
+        logging.warning(f"NY detail page {url} returned {response.status_code}")
+        return None
+    
+    try:
+        cache.put(url, fingerprint, fields, etag, last_modified)
+    except Exception as e:
+        # The fields are still good for this run; the page is fetched again next time
+        logging.error(f"Error caching NY detail page {url}: {str(e)}")
+    return fields
+
+
+@timed()
+def enrich_from_detail_pages(listings, headers=None, cache=None):
+    """
+    Fill in missing listing fields from each grant's detail page.
+    
+    Only listings that still carry placeholders or lack a deadline or award are
+    followed. Pages are fetched on a pool of DETAIL_WORKERS threads with at most
+    DETAIL_PER_HOST requests in flight per host, and parsed results are cached by URL:
+    a listing whose row has not changed reuses its cached fields without a request
+    until the entry is DETAIL_CACHE_TTL old, after which it is revalidated.
+    
+    Args:
+        listings (list): Grant dicts from the listing page, updated in place
+        headers (dict): Request headers to send
+        cache (DetailPageCache): Detail page cache (opened at DETAIL_CACHE_PATH if None)
+        
+    Returns:
+        list: The same listings
+    """
+    pending = [grant_info for grant_info in listings if _needs_detail(grant_info)]
+    if not pending:
+        return listings
+    
+    own_cache = cache is None
+    cache = cache or DetailPageCache()
+    try:
+        cached, to_fetch, by_host = 0, 0, {}
+        fingerprints = {}
+        now = time.time()
+        for grant_info in pending:
+            url = grant_info["Link"]
+            fingerprint = fingerprints[id(grant_info)] = listing_fingerprint(grant_info)
+            entry = cache.get(url)
+            if entry and entry["fingerprint"] == fingerprint and now - entry["fetched_at"] < DETAIL_CACHE_TTL:
+                _merge_detail(grant_info, entry["fields"])
+                cached += 1
+            else:
+                by_host.setdefault(urlsplit(url).netloc, []).append((grant_info, entry))
+                to_fetch += 1
+        
+        # Interleave hosts so workers are not all queued behind one host's limit
+        queue = []
+        for position in range(max((len(items) for items in by_host.values()), default=0)):
+            queue.extend(items[position] for items in by_host.values() if position < len(items))
+        
+        enriched = 0
+        if queue:
+            host_slots = {host: threading.BoundedSemaphore(DETAIL_PER_HOST) for host in by_host}
+            with ThreadPoolExecutor(max_workers=min(DETAIL_WORKERS, len(queue))) as pool:
+                futures = [
+                    (grant_info, pool.submit(
+                        _fetch_detail, grant_info["Link"], fingerprints[id(grant_info)], entry, headers or {}, host_slots, cache
+                    ))
+                    for grant_info, entry in queue
+                ]
+                for grant_info, future in futures:
+                    fields = future.result()
+                    if fields:
+                        _merge_detail(grant_info, fields)
+                        enriched += 1
+        
+        logging.info(
+            f"NY detail pages: {cached} from cache, {enriched} of {to_fetch} fetched, for {len(pending)} incomplete listings"
+        )
+        return listings
+    finally:
+        if own_cache:
+            cache.close()
+
+@register_connector
+class NYGrantsGatewayConnector(GrantConnector):
+    """New York State opportunities scraped from the NY Grants Gateway."""
+    
+    name = "ny_grants_gateway"
+    interval = 12 * 3600
+    jitter = 30 * 60
+    timeout = 5 * 60
+    
+    def fetch_records(self):
+        return dataframe_records(fetch_ny_grants_gateway_opportunities())
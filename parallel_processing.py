@@ -0,0 +1,177 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import pandas as pd
+
+from grant_processor import process_grants, tag_grants, to_categoricals
+from quality_rules import filter_low_quality
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # without pyarrow the parallel mode falls back to a single process
+    pa = None
+    pa_ipc = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Rows per shard sent to a worker process
+DEFAULT_CHUNK_SIZE = 50000
+
+# Below this many rows the process start-up cost outweighs the gain
+MIN_PARALLEL_ROWS = 20000
+
+
+def _write_shared(df):
+    """Serialize a DataFrame as an Arrow IPC stream directly into a new shared memory block."""
+    table = pa.Table.from_pandas(df, preserve_index=True)
+
+    # Measure the stream first so the block can be sized exactly
+    counter = pa.MockOutputStream()
+    with pa_ipc.new_stream(counter, table.schema) as writer:
+        writer.write_table(table)
+    size = counter.size()
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        target = pa.py_buffer(shm.buf)
+        sink = pa.FixedSizeBufferWriter(target)
+        writer = pa_ipc.new_stream(sink, table.schema)
+        writer.write_table(table)
+        writer.close()
+        sink.close()
+        # Drop every view of the block before closing it
+        del writer, sink, target
+    except Exception:
+        shm.close()
+        shm.unlink()
+        raise
+
+    name = shm.name
+    shm.close()
+    return name, size
+
+
+def _read_shared(name, size, unlink=False):
+    """Read a DataFrame back from a shared memory block written by _write_shared."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # One memcpy out of the block so no Arrow buffer keeps the mapping alive
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+        if unlink:
+            shm.unlink()
+
+    return pa_ipc.open_stream(pa.py_buffer(data)).read_all().to_pandas()
+
+
+def _process_and_tag(grants_df, filter_quality):
+    """Normalize, optionally quality-filter, then tag: the same steps in a worker or in-process."""
+    processed = process_grants(grants_df)
+    if processed.empty:
+        return None
+    if filter_quality:
+        processed = filter_low_quality(processed)
+        if processed.empty:
+            return processed
+    return tag_grants(processed)
+
+
+def _process_shard(name, size, filter_quality=False):
+    """Worker entry point: normalize and tag one shard, returning it through shared memory."""
+    shard = _read_shared(name, size)
+    result = _process_and_tag(shard, filter_quality)
+    if result is None or (result.empty and not filter_quality):
+        raise RuntimeError(f"Processing failed for shard of {len(shard)} rows")
+    return _write_shared(result)
+
+
+def _arrow_safe(df):
+    """
+    Make raw scraped columns representable in Arrow.
+
+    Object columns can mix strings, numbers and datetimes; they are carried as pandas
+    strings, which process_grants parses back into dates and numbers.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype("string")
+    return df
+
+
+def process_and_tag_parallel(grants_df, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, min_rows=MIN_PARALLEL_ROWS,
+                             filter_quality=False):
+    """
+    Run process_grants and tag_grants over a large DataFrame on several cores.
+
+    The frame is split into contiguous shards which are handed to a process pool as Arrow
+    IPC streams in shared memory rather than pickled. Results come back the same way and
+    are reassembled in the original row order.
+
+    Args:
+        grants_df (pandas.DataFrame): Raw grants
+        workers (int): Worker processes (defaults to the CPU count)
+        chunk_size (int): Rows per shard
+        min_rows (int): Smaller frames are processed in this process
+        filter_quality (bool): Run filter_low_quality between processing and tagging, as ingest does
+
+    Returns:
+        pandas.DataFrame: Processed and tagged grants (empty if every row was filtered out),
+        or None on error
+    """
+    if grants_df.empty:
+        logging.warning("Empty grants DataFrame provided to process_and_tag_parallel")
+        return pd.DataFrame()
+
+    workers = workers or os.cpu_count() or 1
+    if pa is None or workers < 2 or len(grants_df) < min_rows:
+        return _process_and_tag(grants_df, filter_quality)
+
+    logging.info(f"Processing {len(grants_df)} grants in parallel with {workers} workers...")
+
+    df = _arrow_safe(grants_df)
+
+    # Assign missing Grant IDs up front; shards would otherwise each restart the numbering
+    if "Grant ID" not in df.columns:
+        df["Grant ID"] = pd.NA
+    mask = df["Grant ID"].isna()
+    df.loc[mask, "Grant ID"] = [f"GRANT-{i}" for i in range(int(mask.sum()))]
+
+    inputs = []
+    outputs = []
+    try:
+        for start in range(0, len(df), chunk_size):
+            inputs.append(_write_shared(df.iloc[start:start + chunk_size]))
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_process_shard, name, size, filter_quality) for name, size in inputs]
+            # Collect in submission order, which is the original row order
+            for future in futures:
+                outputs.append(future.result())
+
+        shards = [_read_shared(name, size, unlink=True) for name, size in outputs]
+
+    except Exception as e:
+        logging.error(f"Error in process_and_tag_parallel: {str(e)}")
+        return None
+
+    finally:
+        for name, _ in inputs + outputs:
+            try:
+                block = shared_memory.SharedMemory(name=name)
+                block.close()
+                block.unlink()
+            except FileNotFoundError:
+                pass
+
+    # Shards carry their own category sets, which concat widens back to objects. Shards the
+    # quality rules emptied were never tagged, so they are left out.
+    shards = [shard for shard in shards if not shard.empty] or shards[:1]
+    result = to_categoricals(pd.concat(shards))
+    logging.info(f"Processed and tagged {len(result)} grants in {len(shards)} shards")
+    return result
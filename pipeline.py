@@ -0,0 +1,76 @@
+import os
+import logging
+
+from grant_processor import process_grants, tag_grants
+from parallel_processing import process_and_tag_parallel, MIN_PARALLEL_ROWS
+from quality_rules import filter_low_quality
+from relevance import score_relevance
+from database import save_grants_to_db, sweep_expired_grants
+from connectors import fetch_all_sources
+from instrumentation import profile_run
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Raw batches at least this large are processed and tagged on several cores
+PARALLEL_INGEST_MIN_ROWS = int(os.getenv("GRANT_PARALLEL_INGEST_ROWS", str(MIN_PARALLEL_ROWS)))
+
+# Worker processes for parallel ingest (0 = one per CPU)
+INGEST_WORKERS = int(os.getenv("GRANT_INGEST_WORKERS", "0"))
+
+
+def ingest_grants(raw_df):
+    """
+    Run raw scraped grants through processing, quality filtering, tagging, relevance scoring
+    and the database upsert.
+
+    Args:
+        raw_df (pandas.DataFrame): Grants as returned by one of the fetch_* functions
+
+    Returns:
+        int: Number of grants saved (0 if nothing was left to save), or None if the save failed
+    """
+    if raw_df is None or raw_df.empty:
+        logging.warning("No grants to ingest")
+        return 0
+
+    # Low-quality rows are quarantined before they cost any tagging or database work
+    tagged = None
+    if len(raw_df) >= PARALLEL_INGEST_MIN_ROWS:
+        # Tagging dominates large batches, so it is spread over processes, each shard
+        # filtered before it is tagged
+        tagged = process_and_tag_parallel(raw_df, workers=INGEST_WORKERS or None, min_rows=PARALLEL_INGEST_MIN_ROWS,
+                                          filter_quality=True)
+        if tagged is None:
+            logging.warning("Parallel processing failed, processing grants in this process")
+    if tagged is None:
+        tagged = tag_grants(filter_low_quality(process_grants(raw_df)))
+    if tagged.empty:
+        return 0
+    tagged = score_relevance(tagged)
+
+    if not save_grants_to_db(tagged):
+        return None
+
+    return len(tagged)
+
+
+def refresh_all_sources(names=None):
+    """
+    Fetch every registered source concurrently and ingest the merged results.
+
+    Grants whose deadline has passed are then swept into the archive.
+
+    Args:
+        names (list): Connector names to refresh (all if None)
+
+    Returns:
+        dict: Per-source fetch reports, the total number of grants saved under "saved" and
+        the number of expired grants archived under "archived"
+    """
+    with profile_run("refresh-all"):
+        merged_df, reports = fetch_all_sources(names)
+        saved = ingest_grants(merged_df) or 0
+        archived = sweep_expired_grants()
+    logging.info(f"Refreshed {len(reports)} sources, saved {saved} grants, archived {archived} expired grants")
+    return {"sources": reports, "saved": saved, "archived": archived}
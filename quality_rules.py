@@ -0,0 +1,202 @@
+import os
+import re
+import json
+import fcntl
+import logging
+import datetime
+
+import pandas as pd
+
+from instrumentation import timed
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Words and phrases that mark a title as help text or a portal link wherever they appear
+LOW_QUALITY_TITLE_KEYWORDS = [
+    "click here", "page help", "tutorial", "nysggportal", "goportal", "login",
+    "pdf", "grantopportunities", "mygrants", "learn more"
+]
+
+# Navigation links scrapers pick up; real titles use these words too ("Help America
+# Vote Act", "Back to Work Initiative"), so they only reject a title that is nothing else
+NAVIGATION_TITLES = ["help", "home", "back", "next", "register", "manual"]
+
+# Links to documents and help pages rather than opportunities
+LOW_QUALITY_LINK_KEYWORDS = ["pdf", "tutorial", "help", "manual"]
+
+# Descriptions shorter than this are boilerplate rather than a real summary
+MIN_DESCRIPTION_LENGTH = 30
+
+# Fill-ins used when a source gave no description
+PLACEHOLDER_DESCRIPTIONS = ["No description provided.", "No description available.", ""]
+
+# Keywords match whole words; navigation words must be the whole title, give or take
+# punctuation, so "Home" and "Next »" are rejected but "Healthy Home Production Program" is not
+TITLE_REGEX = (
+    r"\b(?:" + "|".join(re.escape(keyword) for keyword in LOW_QUALITY_TITLE_KEYWORDS) + r")\b"
+    + r"|^\W*(?:" + "|".join(re.escape(title) for title in NAVIGATION_TITLES) + r")\W*$"
+)
+LINK_REGEX = "|".join(re.escape(keyword) for keyword in LOW_QUALITY_LINK_KEYWORDS)
+TITLE_PATTERN = re.compile(TITLE_REGEX, re.IGNORECASE)
+LINK_PATTERN = re.compile(LINK_REGEX, re.IGNORECASE)
+
+# Rules applied before tagging and upsert. Grants.gov search hits rarely carry a
+# description, so a missing one is only counted against a grant by database cleanup.
+INGEST_RULES = ["title_keyword", "link_pattern", "short_description"]
+CLEANUP_RULES = INGEST_RULES + ["missing_description"]
+
+# Rejected rows are appended here as JSON lines, with running per-rule totals alongside
+QUARANTINE_PATH = os.getenv(
+    "GRANT_QUARANTINE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "quarantine", "rejected.jsonl")
+)
+QUARANTINE_MAX_BYTES = 50 * 1024 * 1024
+
+# Columns kept for each quarantined row
+QUARANTINE_COLUMNS = ["Grant ID", "Title", "Funder", "Link", "Source", "Description"]
+
+
+def is_low_quality_title(title):
+    """True if a scraped title looks like navigation or help text rather than a grant."""
+    return not isinstance(title, str) or TITLE_PATTERN.search(title) is not None
+
+
+def is_low_quality_link(link):
+    """True if a link points at a document or help page rather than an opportunity."""
+    return isinstance(link, str) and LINK_PATTERN.search(link) is not None
+
+
+def _text(grants_df, column):
+    if column not in grants_df.columns:
+        return pd.Series(None, index=grants_df.index, dtype=object)
+    series = grants_df[column]
+    return series.astype(str).where(series.notna()) if isinstance(series.dtype, pd.CategoricalDtype) else series
+
+
+def score_quality(grants_df, rules=None):
+    """
+    Evaluate quality rules over a whole batch of grants.
+
+    Each rule is one vectorized string operation over a column, using a single
+    alternation regex per rule instead of a Python loop per row and keyword.
+
+    Args:
+        grants_df (pandas.DataFrame): Grants with Title, Link and Description columns
+        rules (list): Rule names to evaluate (all of CLEANUP_RULES if None)
+
+    Returns:
+        pandas.DataFrame: One boolean column per rule, True where the grant fails it
+    """
+    rules = CLEANUP_RULES if rules is None else rules
+    flags = pd.DataFrame(index=grants_df.index)
+
+    description = _text(grants_df, "Description")
+    missing = description.isna() | description.isin(PLACEHOLDER_DESCRIPTIONS)
+
+    for rule in rules:
+        if rule == "title_keyword":
+            flags[rule] = _text(grants_df, "Title").str.contains(TITLE_REGEX, case=False, regex=True, na=False)
+        elif rule == "link_pattern":
+            flags[rule] = _text(grants_df, "Link").str.contains(LINK_REGEX, case=False, regex=True, na=False)
+        elif rule == "short_description":
+            flags[rule] = ~missing & (description.str.len() < MIN_DESCRIPTION_LENGTH)
+        elif rule == "missing_description":
+            flags[rule] = missing
+        else:
+            raise ValueError(f"Unknown quality rule: {rule}")
+        flags[rule] = flags[rule].fillna(False).astype(bool)
+
+    return flags
+
+
+def quarantine_counts_path(path=QUARANTINE_PATH):
+    return os.path.splitext(path)[0] + ".counts.json"
+
+
+def quarantine_counts(path=QUARANTINE_PATH):
+    """Running totals of rejected grants per rule, plus the number of batches scored."""
+    try:
+        with open(quarantine_counts_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_quarantine(rejected_df, flags, path=QUARANTINE_PATH):
+    """
+    Append rejected grants to the quarantine file and add to the per-rule counters.
+
+    Args:
+        rejected_df (pandas.DataFrame): Rejected grants
+        flags (pandas.DataFrame): Their rule flags from score_quality
+        path (str): Quarantine JSONL file
+
+    Returns:
+        bool: True if the rows were written
+    """
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        rejected_at = datetime.datetime.now().isoformat(timespec="seconds")
+
+        columns = [col for col in QUARANTINE_COLUMNS if col in rejected_df.columns]
+        records = rejected_df[columns].astype(object).where(rejected_df[columns].notna(), None).to_dict("records")
+        rule_names = flags.columns.to_numpy()
+        failed = [rule_names[row].tolist() for row in flags.to_numpy(dtype=bool)]
+        lines = [
+            json.dumps({"rejected_at": rejected_at, "rules": rules, "grant": record}, default=str)
+            for record, rules in zip(records, failed)
+        ]
+
+        with open(quarantine_counts_path(path) + ".lock", "w") as lockfile:
+            fcntl.flock(lockfile, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(path) and os.path.getsize(path) > QUARANTINE_MAX_BYTES:
+                    os.replace(path, path + ".1")
+                with open(path, "a") as f:
+                    f.write("\n".join(lines) + "\n")
+
+                counts = quarantine_counts(path)
+                counts["rejected"] = counts.get("rejected", 0) + len(rejected_df)
+                for rule, count in flags.sum().items():
+                    counts.setdefault("rules", {})[rule] = counts.get("rules", {}).get(rule, 0) + int(count)
+                counts["updated_at"] = rejected_at
+                tmp_path = quarantine_counts_path(path) + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(counts, f, indent=2)
+                os.replace(tmp_path, quarantine_counts_path(path))
+            finally:
+                fcntl.flock(lockfile, fcntl.LOCK_UN)
+        return True
+
+    except Exception as e:
+        logging.error(f"Error writing quality quarantine: {str(e)}")
+        return False
+
+
+@timed()
+def filter_low_quality(grants_df, rules=INGEST_RULES, quarantine_path=QUARANTINE_PATH):
+    """
+    Drop grants that fail any quality rule, quarantining them instead of ingesting.
+
+    Args:
+        grants_df (pandas.DataFrame): Processed grants, ideally before tagging
+        rules (list): Rule names to apply
+        quarantine_path (str): Where rejected rows go (None to skip the quarantine file)
+
+    Returns:
+        pandas.DataFrame: The grants that passed every rule
+    """
+    if grants_df is None or grants_df.empty:
+        return grants_df
+
+    flags = score_quality(grants_df, rules)
+    rejected = flags.any(axis=1).to_numpy()
+    if not rejected.any():
+        return grants_df
+
+    if quarantine_path:
+        write_quarantine(grants_df[rejected], flags[rejected], quarantine_path)
+
+    per_rule = ", ".join(f"{rule}={int(count)}" for rule, count in flags[rejected].sum().items() if count)
+    logging.info(f"Quarantined {int(rejected.sum())} of {len(grants_df)} low-quality grants ({per_rule})")
+    return grants_df[~rejected]
@@ -0,0 +1,328 @@
+"""
+Coalesced keyword searches for Grants.gov.
+
+Searching each of PURSUIT_KEYWORDS on its own costs one request per keyword, and the
+results overlap heavily. The planner packs keywords into boolean OR queries instead,
+as few as the query length limit and the per-query row cap allow:
+
+- Per-keyword hit counts and pairwise overlaps are learned from every run and
+  persisted, so keywords that fill a page on their own are searched alone and
+  keywords that share most of their hits are grouped together.
+- A merged query that comes back full, unexpectedly empty, or with a keyword far below
+  its usual hits (OR only partly honoured) may have lost results, so it is split in
+  half and both halves are searched again, down to single keywords.
+  Every keyword therefore ends up in a query that returned all of its hits, and the
+  result set is the same as searching keyword by keyword.
+
+Each run's request count and the requests saved against one query per keyword are
+kept with the statistics:
+
+    python query_planner.py
+"""
+import os
+import re
+import json
+import logging
+import argparse
+import datetime
+import itertools
+
+from instrumentation import timed
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Where the learned keyword statistics and run reports are kept
+QUERY_STATS_PATH = os.getenv(
+    "GRANT_QUERY_STATS", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".grants_gov_query_stats.json")
+)
+
+# Longest keyword query sent in one search
+QUERY_MAX_LENGTH = 200
+
+# Groups are planned to fill at most this share of a page, leaving room for new hits
+FILL_FACTOR = 0.8
+
+# Weight of the latest run in the moving averages of hits and overlaps
+STATS_DECAY = 0.5
+
+# Run reports kept in the statistics file
+REPORT_HISTORY = 50
+
+# Record fields searched for keywords when attributing a merged query's hits
+ATTRIBUTION_FIELDS = ["Title", "Description", "Eligibility", "Category", "Activity Category"]
+
+# A merged query is split when a keyword is attributed less than this share of its expected hits
+MIN_ATTRIBUTED_SHARE = 0.25
+
+
+def keyword_query(keywords):
+    """The boolean query for a group of keywords, with multi-word keywords as phrases."""
+    return " OR ".join(f'"{keyword}"' if " " in keyword else keyword for keyword in keywords)
+
+
+def _pair_key(first, second):
+    return "|".join(sorted((first, second)))
+
+
+def load_query_stats(path=QUERY_STATS_PATH):
+    """Learned keyword statistics: {"keywords": {...}, "overlaps": {...}, "runs": [...]}; empty if path is None."""
+    stats = {}
+    if path:
+        try:
+            with open(path) as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            stats = {}
+    stats.setdefault("keywords", {})
+    stats.setdefault("overlaps", {})
+    stats.setdefault("runs", [])
+    return stats
+
+
+def save_query_stats(stats, path=QUERY_STATS_PATH):
+    """Write the statistics atomically. Returns True if they were saved."""
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(stats, f, indent=2)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logging.error(f"Error saving query planner statistics: {str(e)}")
+        return False
+
+
+def expected_hits(keywords, stats, row_limit):
+    """
+    Estimate how many distinct hits an OR query over keywords returns.
+
+    Sums the expected hits of each keyword and subtracts the learned pairwise overlaps,
+    never going below the largest single keyword. A keyword without statistics is
+    expected to fill a page, so its first search is a single-keyword query whose hit
+    count is exact.
+    """
+    hits = [stats["keywords"].get(keyword, {}).get("hits", row_limit) for keyword in keywords]
+    if not hits:
+        return 0
+    shared = sum(stats["overlaps"].get(_pair_key(first, second), 0) for first, second in itertools.combinations(keywords, 2))
+    return max(sum(hits) - shared, max(hits))
+
+
+def plan_queries(keywords, stats, row_limit, max_length=QUERY_MAX_LENGTH):
+    """
+    Pack keywords into OR groups.
+
+    Keywords are placed largest first; each joins the group it overlaps most with among
+    those that stay under FILL_FACTOR of a page and max_length characters, or starts a
+    new group. A keyword expected to fill a page by itself is always searched alone.
+
+    Args:
+        keywords (list): Keywords to search
+        stats (dict): Statistics from load_query_stats
+        row_limit (int): Hits returned per query at most
+        max_length (int): Longest query string allowed
+
+    Returns:
+        list: Keyword groups, each a list of keywords
+    """
+    capacity = row_limit * FILL_FACTOR
+    order = sorted(keywords, key=lambda keyword: -expected_hits([keyword], stats, row_limit))
+
+    groups = []
+    for keyword in order:
+        best = None
+        best_cost = None
+        for group in groups:
+            candidate = group + [keyword]
+            if len(keyword_query(candidate)) > max_length:
+                continue
+            estimate = expected_hits(candidate, stats, row_limit)
+            if estimate > capacity:
+                continue
+            # Prefer the group this keyword adds the fewest new hits to
+            cost = estimate - expected_hits(group, stats, row_limit)
+            if best is None or cost < best_cost:
+                best, best_cost = group, cost
+        if best is None:
+            groups.append([keyword])
+        else:
+            best.append(keyword)
+    return groups
+
+
+def attribute_hits(records, keywords):
+    """
+    Work out which keywords of a merged query each hit matched.
+
+    Grants.gov does not say which OR branch matched, so keywords are looked for in the
+    record's text fields. The result only steers planning; hits that match no keyword
+    this way are simply not counted.
+
+    Returns:
+        dict: {keyword: set of Grant IDs}
+    """
+    if len(keywords) == 1:
+        return {keywords[0]: {record.get("Grant ID") for record in records if record.get("Grant ID")}}
+
+    patterns = {keyword: re.compile(r"\b" + re.escape(keyword) + r"\b", re.IGNORECASE) for keyword in keywords}
+    matched = {keyword: set() for keyword in keywords}
+    for record in records:
+        grant_id = record.get("Grant ID")
+        if not grant_id:
+            continue
+        text = " ".join(str(record[field]) for field in ATTRIBUTION_FIELDS if record.get(field))
+        for keyword, pattern in patterns.items():
+            if pattern.search(text):
+                matched[keyword].add(grant_id)
+    return matched
+
+
+def update_query_stats(stats, keyword_hits):
+    """Fold one run's per-keyword hit sets into the moving averages."""
+    def blend(old, new):
+        return new if old is None else round((1 - STATS_DECAY) * old + STATS_DECAY * new, 2)
+
+    for keyword, hits in keyword_hits.items():
+        entry = stats["keywords"].setdefault(keyword, {"runs": 0})
+        entry["hits"] = blend(entry.get("hits"), len(hits))
+        entry["runs"] += 1
+
+    for first, second in itertools.combinations(sorted(keyword_hits), 2):
+        key = _pair_key(first, second)
+        shared = len(keyword_hits[first] & keyword_hits[second])
+        old = stats["overlaps"].get(key)
+        if shared or old:
+            stats["overlaps"][key] = blend(old, shared)
+    return stats
+
+
+def under_represented(attributed, stats):
+    """Keywords with learned statistics whose attributed hits fall below MIN_ATTRIBUTED_SHARE of them."""
+    return [
+        keyword for keyword, hits in attributed.items()
+        if keyword in stats["keywords"] and len(hits) < MIN_ATTRIBUTED_SHARE * stats["keywords"][keyword]["hits"]
+    ]
+
+
+def execute_plan(groups, search, row_limit, stats):
+    """
+    Run the planned queries, splitting any that may have been cut short.
+
+    Args:
+        groups (list): Keyword groups from plan_queries
+        search (callable): search(query) -> list of records, or None if the source is unavailable
+        row_limit (int): Hits returned per query at most
+        stats (dict): Statistics used to tell an unexpectedly empty or lopsided merged query
+
+    Returns:
+        tuple: (records, {keyword: set of Grant IDs}, requests made); records is None
+        if the source became unavailable before anything was found
+    """
+    records = []
+    keyword_hits = {}
+    requests_made = 0
+    pending = list(groups)
+
+    while pending:
+        group = pending.pop(0)
+        results = search(keyword_query(group))
+        requests_made += 1
+        if results is None:
+            logging.error("Keyword search unavailable, stopping planned queries")
+            return (records or None), keyword_hits, requests_made
+
+        full = len(results) >= row_limit
+        # An empty merged query where hits were expected may mean OR was not understood
+        suspicious = not results and expected_hits(group, stats, row_limit) >= 1
+        attributed = attribute_hits(results, group)
+        # A keyword far below its usual hits suggests the source dropped some OR branches
+        missing = under_represented(attributed, stats) if len(group) > 1 else []
+        if len(group) > 1 and (full or suspicious or missing):
+            middle = len(group) // 2
+            reason = f", too few hits for {', '.join(missing)}" if missing else ""
+            logging.info(f"Splitting query for {len(group)} keywords ({len(results)} hits{reason})")
+            pending[:0] = [group[:middle], group[middle:]]
+            continue
+
+        records.extend(results)
+        keyword_hits.update(attributed)
+
+    return records, keyword_hits, requests_made
+
+
+@timed()
+def run_planned_search(keywords, search, row_limit, stats_path=QUERY_STATS_PATH):
+    """
+    Search for every keyword with as few coalesced queries as possible.
+
+    Args:
+        keywords (list): Keywords to search
+        search (callable): search(query) -> list of records, or None if the source is unavailable
+        row_limit (int): Hits returned per query at most
+        stats_path (str): Statistics file (None to neither read nor persist statistics)
+
+    Returns:
+        list: Every record found, possibly with duplicates across queries; None if the
+        source was unavailable
+    """
+    stats = load_query_stats(stats_path)
+    groups = plan_queries(keywords, stats, row_limit)
+    logging.info(f"Planned {len(groups)} queries for {len(keywords)} keywords")
+
+    records, keyword_hits, requests_made = execute_plan(groups, search, row_limit, stats)
+    # Splits can cost more requests than one query per keyword would have
+    saved = max(0, len(keywords) - requests_made)
+    logging.info(f"Keyword search made {requests_made} requests for {len(keywords)} keywords ({saved} saved)")
+
+    if stats_path and records is not None:
+        update_query_stats(stats, keyword_hits)
+        stats["runs"].append({
+            "at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "keywords": len(keywords),
+            "planned": len(groups),
+            "requests": requests_made,
+            "saved": saved,
+            "records": len(records)
+        })
+        stats["runs"] = stats["runs"][-REPORT_HISTORY:]
+        save_query_stats(stats, stats_path)
+
+    return records
+
+
+def requests_saved_report(path=QUERY_STATS_PATH):
+    """
+    Summarize the recorded runs.
+
+    Returns:
+        dict: runs, requests, saved and the requests one query per keyword would have made
+    """
+    runs = load_query_stats(path)["runs"]
+    return {
+        "runs": len(runs),
+        "requests": sum(run["requests"] for run in runs),
+        "saved": sum(run["saved"] for run in runs),
+        "baseline": sum(run["keywords"] for run in runs)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stats", default=QUERY_STATS_PATH, help="statistics file")
+    args = parser.parse_args(argv)
+
+    stats = load_query_stats(args.stats)
+    report = requests_saved_report(args.stats)
+    print(f"{report['runs']} runs: {report['requests']} requests instead of {report['baseline']} ({report['saved']} saved)")
+    for run in stats["runs"][-10:]:
+        print(f"  {run['at']}  {run['requests']:3d} requests for {run['keywords']} keywords, {run['saved']} saved, {run['records']} hits")
+    if stats["keywords"]:
+        print("Expected hits per keyword:")
+        for keyword, entry in sorted(stats["keywords"].items(), key=lambda item: -item[1]["hits"]):
+            print(f"  {entry['hits']:7.1f}  {keyword}")
+
+
+if __name__ == "__main__":
+    main()
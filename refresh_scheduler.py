@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import logging
+import argparse
+import threading
+import contextlib
+import datetime
+
+from sqlalchemy import text
+
+from concurrent.futures import ThreadPoolExecutor
+
+from connectors import get_connectors
+from pipeline import ingest_grants
+import http_client
+import database
+import instrumentation
+from notifications import shutdown_dispatcher
+from alerts import enable_alerts
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Backoff after failed runs: 5 min, 10 min, 20 min, ... capped at the source interval
+FAILURE_BACKOFF_BASE = 5 * 60
+
+# Directory for per-source lockfiles when the database cannot provide advisory locks
+LOCK_DIR = os.getenv("GRANT_LOCK_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".locks"))
+
+
+@contextlib.contextmanager
+def source_lock(source_name):
+    """
+    Hold an exclusive, non-blocking lock for one source's refresh.
+
+    Uses a Postgres advisory lock when the grants database is Postgres (so the lock spans
+    every instance sharing the database), and a local lockfile otherwise.
+
+    Yields:
+        bool: True if the lock was acquired, False if another run holds it
+    """
+    engine = database.engine
+    if engine is not None and engine.dialect.name == "postgresql":
+        key = zlib.crc32(f"grant-refresh:{source_name}".encode())
+        # Autocommit, so the connection holding the session-level lock does not sit idle in a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": key}).scalar()
+            try:
+                yield bool(acquired)
+            finally:
+                if acquired:
+                    connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": key})
+        return
+
+    import fcntl
+
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    with open(os.path.join(LOCK_DIR, f"{source_name}.lock"), "w") as lockfile:
+        try:
+            fcntl.flock(lockfile, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+
+def refresh_source(source_name):
+    """
+    Fetch one source and ingest the results.
+
+    Args:
+        source_name (str): Name of a registered connector
+
+    Returns:
+        dict: Run report with status ("ok", "empty", "failed" or "locked"), duration and record counts
+    """
+    report = {
+        "source": source_name,
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "status": "failed",
+        "duration": 0.0,
+        "fetched": 0,
+        "saved": 0
+    }
+    start = time.perf_counter()
+
+    try:
+        with source_lock(source_name) as acquired:
+            if not acquired:
+                logging.info(f"Skipping {source_name}: a refresh is already running elsewhere")
+                report["status"] = "locked"
+                return report
+
+            connector = get_connectors([source_name])[source_name]
+            with instrumentation.profile_run(f"refresh-{source_name}"):
+                with instrumentation.stage(f"fetch_{source_name}") as timer:
+                    with http_client.deadline(connector.timeout):
+                        raw_df = connector.fetch_dataframe()
+                    timer.add_rows(len(raw_df))
+                report["fetched"] = len(raw_df)
+
+                if raw_df.empty:
+                    report["status"] = "empty"
+                else:
+                    saved = ingest_grants(raw_df)
+                    report["saved"] = saved or 0
+                    # Only a failed save fails the run; a batch the quality rules emptied is still ok
+                    report["status"] = "failed" if saved is None else "ok"
+
+    except Exception as e:
+        logging.error(f"Error refreshing {source_name}: {str(e)}")
+
+    finally:
+        report["duration"] = round(time.perf_counter() - start, 3)
+
+    logging.info(
+        f"Refreshed {source_name}: {report['status']}, {report['fetched']} fetched, "
+        f"{report['saved']} saved in {report['duration']:.1f}s"
+    )
+    return report
+
+
+def next_delay(source_name, consecutive_failures):
+    """Seconds to wait before the next run of a source, including jitter and failure backoff."""
+    connector = get_connectors([source_name])[source_name]
+    if consecutive_failures:
+        delay = min(connector.interval, FAILURE_BACKOFF_BASE * 2 ** (consecutive_failures - 1))
+    else:
+        delay = connector.interval
+    return delay + random.uniform(0, connector.jitter)
+
+
+class RefreshScheduler:
+    """
+    Long-running refresh loop with one worker thread per source.
+
+    Each source runs on its own cadence, so a slow or failing source never delays the others.
+    """
+
+    def __init__(self, source_names=None, report_file=None, metrics_file=None):
+        self.source_names = source_names or list(get_connectors())
+        self.report_file = report_file
+        self.metrics_file = metrics_file
+        self.stop_event = threading.Event()
+        self.report_lock = threading.Lock()
+        self.threads = []
+
+    def record(self, report):
+        """Append a run report to the JSON-lines report file and refresh the metrics file, if configured."""
+        with self.report_lock:
+            if self.report_file:
+                with open(self.report_file, "a") as f:
+                    f.write(json.dumps(report) + "\n")
+            if self.metrics_file:
+                instrumentation.write_report(self.metrics_file)
+
+    def run_source_loop(self, source_name):
+        failures = 0
+        # Stagger the first run across the jitter window
+        if self.stop_event.wait(random.uniform(0, get_connectors([source_name])[source_name].jitter)):
+            return
+
+        while not self.stop_event.is_set():
+            report = refresh_source(source_name)
+            self.record(report)
+
+            if report["status"] in ("ok", "locked"):
+                failures = 0
+            else:
+                failures += 1
+
+            delay = next_delay(source_name, failures)
+            logging.info(f"Next {source_name} refresh in {delay / 60:.0f} minutes")
+            self.stop_event.wait(delay)
+
+    def start(self):
+        for source_name in self.source_names:
+            thread = threading.Thread(
+                target=self.run_source_loop, args=(source_name,), name=f"refresh-{source_name}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+
+    def run_forever(self):
+        self.start()
+        try:
+            while any(thread.is_alive() for thread in self.threads):
+                time.sleep(1)
+        except KeyboardInterrupt:
+            logging.info("Stopping refresh scheduler...")
+            self.stop()
+
+
+def main(argv=None):
+    connectors = get_connectors()
+
+    parser = argparse.ArgumentParser(description="Scheduled background refresh of grant sources")
+    parser.add_argument("--once", action="store_true", help="refresh every selected source once and exit")
+    parser.add_argument("--sources", help=f"comma-separated subset of: {', '.join(connectors)}")
+    parser.add_argument("--report-file", help="append one JSON run report per line to this file")
+    parser.add_argument("--metrics-file",
+                        help="write per-stage timings here after each refresh (Prometheus text if *.prom, else JSON)")
+    parser.add_argument("--profile", choices=["cprofile", "pyinstrument"],
+                        help="write a profile of each refresh to GRANT_PROFILE_DIR")
+    args = parser.parse_args(argv)
+
+    source_names = args.sources.split(",") if args.sources else list(connectors)
+    unknown = [name for name in source_names if name not in connectors]
+    if unknown:
+        parser.error(f"unknown sources: {', '.join(unknown)}")
+
+    if args.profile:
+        instrumentation.PROFILER = args.profile
+
+    # Saved-search alerts run on the new or changed grants of every ingest
+    enable_alerts()
+    scheduler = RefreshScheduler(source_names, report_file=args.report_file, metrics_file=args.metrics_file)
+
+    if args.once:
+        # Run sources side by side so the batch takes as long as the slowest one
+        with ThreadPoolExecutor(max_workers=len(source_names)) as executor:
+            reports = list(executor.map(refresh_source, source_names))
+        # Deliver the alert digests these refreshes queued before the process exits
+        shutdown_dispatcher()
+        for report in reports:
+            scheduler.record(report)
+            print(f"{report['source']:<20} {report['status']:<8} {report['fetched']:>6} fetched "
+                  f"{report['saved']:>6} saved {report['duration']:>8.1f}s")
+        return 0 if all(report["status"] in ("ok", "locked") for report in reports) else 1
+
+    try:
+        scheduler.run_forever()
+    finally:
+        shutdown_dispatcher()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
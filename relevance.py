@@ -0,0 +1,236 @@
+"""
+Relevance of grants to Pursuit's mission.
+
+Each grant's title, description and eligibility are turned into a TF-IDF vector and
+compared with a mission profile built from PURSUIT_KEYWORDS and the tagging keyword
+dictionaries. The cosine similarity (0 to 1) is stored as "Relevance Score" so the app
+and API can sort by it without recomputing.
+
+The vectorizer is fit once and persisted; new grants are scored against the saved model
+in batched sparse matrix products. Refit after the corpus has shifted:
+
+    python relevance.py --refit
+"""
+import os
+import time
+import logging
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+from grant_processor import TOPIC_KEYWORDS, AUDIENCE_KEYWORDS, GEOGRAPHY_KEYWORDS
+from grants_gov_api import PURSUIT_KEYWORDS
+from instrumentation import timed
+
+try:
+    import joblib
+    from sklearn.feature_extraction.text import TfidfVectorizer
+except ImportError:  # scikit-learn is optional; grants are left unscored without it
+    joblib = None
+    TfidfVectorizer = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Where the fitted model is kept
+RELEVANCE_MODEL_PATH = os.getenv(
+    "GRANT_RELEVANCE_MODEL", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "relevance.joblib")
+)
+
+# Grants transformed per sparse matrix product
+RELEVANCE_BATCH_SIZE = 10000
+
+# Vocabulary cap; rare terms beyond it add little to a similarity score
+MAX_FEATURES = 50000
+
+# Mission keywords count more than the broader tagging vocabulary
+PURSUIT_KEYWORD_WEIGHT = 3
+
+# The title is repeated so it weighs more than the longer text fields
+TITLE_WEIGHT = 2
+
+
+def profile_text():
+    """The mission profile as one weighted pseudo-document."""
+    terms = list(PURSUIT_KEYWORDS) * PURSUIT_KEYWORD_WEIGHT
+    for keyword_groups in (TOPIC_KEYWORDS, AUDIENCE_KEYWORDS):
+        for keywords in keyword_groups.values():
+            terms.extend(keywords)
+    terms.extend(GEOGRAPHY_KEYWORDS["NY"])
+    return " ".join(terms)
+
+
+def grant_documents(grants_df):
+    """One text per grant: title (repeated), description and eligibility."""
+    def text(column):
+        if column not in grants_df.columns:
+            return pd.Series("", index=grants_df.index)
+        return grants_df[column].astype(object).where(grants_df[column].notna(), "").astype(str)
+
+    title = text("Title")
+    documents = title
+    for _ in range(TITLE_WEIGHT - 1):
+        documents = documents + " " + title
+    return (documents + " " + text("Description") + " " + text("Eligibility")).tolist()
+
+
+def fit_relevance_model(grants_df, path=RELEVANCE_MODEL_PATH):
+    """
+    Fit the TF-IDF vocabulary and weights on a grant corpus and persist them with the profile vector.
+
+    Args:
+        grants_df (pandas.DataFrame): Corpus to learn term weights from
+        path (str): Where to save the model
+
+    Returns:
+        dict: The fitted model, or None if scikit-learn is not installed or fitting failed
+    """
+    if TfidfVectorizer is None:
+        logging.warning("scikit-learn not installed; relevance scoring is disabled")
+        return None
+
+    try:
+        vectorizer = TfidfVectorizer(
+            ngram_range=(1, 2), sublinear_tf=True, stop_words="english",
+            max_features=MAX_FEATURES, dtype=np.float32
+        )
+        # The profile is part of the corpus so its bigrams are always in the vocabulary
+        vectorizer.fit(grant_documents(grants_df) + [profile_text()])
+        model = {
+            "vectorizer": vectorizer,
+            "profile": vectorizer.transform([profile_text()]).T.tocsc(),
+            "documents": len(grants_df),
+            "fitted_at": time.time()
+        }
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Per-process temporary file: several workers may fit a first model at the same time
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
+
+        _cache.update(path=path, mtime=os.path.getmtime(path), model=model)
+        logging.info(f"Fitted relevance model on {len(grants_df)} grants ({len(vectorizer.vocabulary_)} terms)")
+        return model
+
+    except Exception as e:
+        logging.error(f"Error fitting relevance model: {str(e)}")
+        return None
+
+
+# The loaded model, reloaded when the file on disk changes
+_cache = {"path": None, "mtime": None, "model": None}
+_cache_lock = threading.Lock()
+
+
+def load_relevance_model(path=RELEVANCE_MODEL_PATH):
+    """Return the persisted model (None if there is none or scikit-learn is not installed)."""
+    if joblib is None:
+        return None
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    with _cache_lock:
+        if _cache["path"] != path or _cache["mtime"] != mtime:
+            try:
+                _cache.update(path=path, mtime=mtime, model=joblib.load(path))
+            except Exception as e:
+                logging.error(f"Error loading relevance model: {str(e)}")
+                return None
+        return _cache["model"]
+
+
+def relevance_scores(grants_df, model, batch_size=RELEVANCE_BATCH_SIZE):
+    """
+    Cosine similarity of each grant to the mission profile.
+
+    TF-IDF rows are L2-normalized, so one sparse matrix-vector product per batch gives
+    the cosine for every grant in it.
+
+    Returns:
+        numpy.ndarray: Scores between 0 and 1, aligned with grants_df
+    """
+    documents = grant_documents(grants_df)
+    scores = np.zeros(len(documents), dtype=np.float32)
+    for start in range(0, len(documents), batch_size):
+        matrix = model["vectorizer"].transform(documents[start:start + batch_size])
+        scores[start:start + batch_size] = (matrix @ model["profile"]).toarray().ravel()
+    return scores
+
+
+@timed()
+def score_relevance(grants_df, path=RELEVANCE_MODEL_PATH):
+    """
+    Add a "Relevance Score" column, fitting and saving a model on this batch if none exists yet.
+
+    Args:
+        grants_df (pandas.DataFrame): Grants to score
+        path (str): Model location
+
+    Returns:
+        pandas.DataFrame: The grants with "Relevance Score" (left as NaN without scikit-learn)
+    """
+    if grants_df is None or grants_df.empty:
+        return grants_df
+
+    df = grants_df.copy()
+    model = load_relevance_model(path) or fit_relevance_model(df, path)
+    if model is None:
+        df["Relevance Score"] = np.nan
+        return df
+
+    try:
+        # float64 before rounding, so the value read back from the database compares equal
+        df["Relevance Score"] = np.round(relevance_scores(df, model).astype(np.float64), 4)
+    except Exception as e:
+        logging.error(f"Error scoring grant relevance: {str(e)}")
+        df["Relevance Score"] = np.nan
+    return df
+
+
+def refit_and_rescore(path=RELEVANCE_MODEL_PATH):
+    """
+    Refit the model on every grant in the database and rewrite all stored scores.
+
+    Returns:
+        int: Number of grants rescored (0 on error)
+    """
+    from database import load_grants_from_db, update_relevance_scores
+
+    grants_df = load_grants_from_db(primary=True)
+    if grants_df.empty:
+        logging.warning("No grants to fit the relevance model on")
+        return 0
+
+    model = fit_relevance_model(grants_df, path)
+    if model is None:
+        return 0
+
+    scores = np.round(relevance_scores(grants_df, model).astype(np.float64), 4)
+    if not update_relevance_scores(grants_df["Grant ID"].tolist(), scores.tolist()):
+        return 0
+    return len(grants_df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--refit", action="store_true", help="refit on the database and rescore every grant")
+    args = parser.parse_args(argv)
+
+    if args.refit:
+        print(f"Rescored {refit_and_rescore()} grants")
+    else:
+        model = load_relevance_model()
+        if model is None:
+            print("No relevance model fitted yet")
+        else:
+            fitted = time.strftime("%Y-%m-%d %H:%M", time.localtime(model["fitted_at"]))
+            print(f"Model fitted {fitted} on {model['documents']} grants, {len(model['vectorizer'].vocabulary_)} terms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+import re
+import math
+import logging
+from collections import defaultdict
+
+# The database helpers import sqlalchemy when called: the Streamlit app only needs
+# search_dataframe and should not pay for loading sqlalchemy on a cold start
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Columns that are searchable, with the weight each one contributes to the score
+SEARCH_FIELD_WEIGHTS = {
+    "Title": 3.0,
+    "Eligibility": 1.5,
+    "Description": 1.0
+}
+
+# Markers wrapped around matched terms in snippets
+HIGHLIGHT_START = "**"
+HIGHLIGHT_END = "**"
+
+# Number of words shown around the first match in a snippet
+SNIPPET_WORDS = 30
+
+# Words too common to be worth indexing
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "that", "the", "to", "with"
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(value):
+    """Split a text value into lowercase index terms."""
+    if not isinstance(value, str):
+        return []
+    return [token for token in TOKEN_PATTERN.findall(value.lower()) if token not in STOPWORDS]
+
+
+def ensure_search_index(engine):
+    """
+    Create the full-text search structures for the grants table.
+
+    On Postgres this adds a generated, weighted `tsvector` column with a GIN index, so the
+    index is maintained by the database on every insert/update. On SQLite this creates an
+    FTS5 table that `index_grants` keeps in sync from the ingest path.
+
+    Args:
+        engine: SQLAlchemy engine for the grants database
+
+    Returns:
+        bool: True if a database-backed index is available, False otherwise
+    """
+    from sqlalchemy import text
+
+    if engine is None:
+        return False
+
+    dialect = engine.dialect.name
+
+    try:
+        with engine.begin() as connection:
+            if dialect == "postgresql":
+                connection.execute(text("""
+                    ALTER TABLE grants ADD COLUMN IF NOT EXISTS search_vector tsvector
+                    GENERATED ALWAYS AS (
+                        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                        setweight(to_tsvector('english', coalesce(eligibility, '')), 'B') ||
+                        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+                    ) STORED
+                """))
+                connection.execute(text(
+                    "CREATE INDEX IF NOT EXISTS ix_grants_search_vector ON grants USING GIN (search_vector)"
+                ))
+                return True
+
+            if dialect == "sqlite":
+                connection.execute(text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS grants_fts "
+                    "USING fts5(title, description, eligibility, tokenize='porter unicode61')"
+                ))
+                return True
+
+        logging.warning(f"Full-text search index not supported for dialect '{dialect}'")
+        return False
+
+    except Exception as e:
+        logging.error(f"Error creating search index: {str(e)}")
+        return False
+
+
+def index_grants(connection, grants):
+    """
+    Incrementally (re)index a batch of grants.
+
+    Only SQLite needs explicit indexing; on Postgres the generated `search_vector`
+    column is refreshed by the database as part of the same write.
+
+    Args:
+        connection: SQLAlchemy connection inside the ingest transaction
+        grants (list): Grant ORM objects that were inserted or updated (ids must be assigned)
+    """
+    from sqlalchemy import text
+
+    if not grants or connection.dialect.name != "sqlite":
+        return
+
+    rows = [
+        {
+            "rowid": grant.id,
+            "title": grant.title or "",
+            "description": grant.description or "",
+            "eligibility": grant.eligibility or ""
+        }
+        for grant in grants
+    ]
+
+    connection.execute(
+        text("DELETE FROM grants_fts WHERE rowid = :rowid"),
+        [{"rowid": row["rowid"]} for row in rows]
+    )
+    connection.execute(
+        text(
+            "INSERT INTO grants_fts (rowid, title, description, eligibility) "
+            "VALUES (:rowid, :title, :description, :eligibility)"
+        ),
+        rows
+    )
+
+
+def remove_from_index(connection, grant_ids):
+    """Drop deleted grants from the SQLite FTS table."""
+    from sqlalchemy import text
+
+    if not grant_ids or connection.dialect.name != "sqlite":
+        return
+
+    connection.execute(
+        text("DELETE FROM grants_fts WHERE rowid = :rowid"),
+        [{"rowid": grant_id} for grant_id in grant_ids]
+    )
+
+
+def query_search_index(connection, query, limit=20):
+    """
+    Run a ranked full-text query against the database index.
+
+    Args:
+        connection: SQLAlchemy connection
+        query (str): Free-text keyword query
+        limit (int): Maximum number of results
+
+    Returns:
+        list: (grant row id, score, snippet) tuples, best match first
+    """
+    from sqlalchemy import text
+
+    dialect = connection.dialect.name
+
+    if dialect == "postgresql":
+        # Rank and limit first so ts_headline only runs on the rows we return
+        result = connection.execute(text("""
+            SELECT hits.id, hits.rank,
+                   ts_headline('english', coalesce(g.description, g.title), hits.q,
+                               :headline_options) AS snippet
+            FROM (
+                SELECT id, q, ts_rank_cd(search_vector, q) AS rank
+                FROM grants, websearch_to_tsquery('english', :query) AS q
+                WHERE search_vector @@ q
+                ORDER BY rank DESC
+                LIMIT :limit
+            ) AS hits
+            JOIN grants g ON g.id = hits.id
+            ORDER BY hits.rank DESC
+        """), {
+            "query": query,
+            "limit": limit,
+            "headline_options": (
+                f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, "
+                f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"
+            )
+        })
+        return [(row.id, float(row.rank), row.snippet) for row in result]
+
+    if dialect == "sqlite":
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        # Quote every term so user input cannot inject FTS5 query syntax
+        match_expr = " ".join(f'"{term}"' for term in terms)
+        weights = ", ".join(str(SEARCH_FIELD_WEIGHTS[field]) for field in ["Title", "Description", "Eligibility"])
+        result = connection.execute(text(f"""
+            SELECT grants_fts.rowid AS id,
+                   bm25(grants_fts, {weights}) AS rank,
+                   snippet(grants_fts, -1, :start, :end, '...', :words) AS snippet
+            FROM grants_fts
+            JOIN grants g ON g.id = grants_fts.rowid
+            WHERE grants_fts MATCH :query
+            ORDER BY rank
+            LIMIT :limit
+        """), {
+            "query": match_expr,
+            "start": HIGHLIGHT_START,
+            "end": HIGHLIGHT_END,
+            "words": min(SNIPPET_WORDS, 64),
+            "limit": limit
+        })
+        # SQLite's bm25() is negative, lower meaning better
+        return [(row.id, -float(row.rank), row.snippet) for row in result]
+
+    raise ValueError(f"Full-text search not supported for dialect '{dialect}'")
+
+
+def make_snippet(value, terms, words=SNIPPET_WORDS):
+    """Build a highlighted snippet around the first occurrence of any query term."""
+    if not isinstance(value, str) or not value:
+        return ""
+
+    tokens = value.split()
+    term_set = set(terms)
+
+    def matches(word):
+        return any(term in term_set for term in TOKEN_PATTERN.findall(word.lower()))
+
+    first = next((i for i, word in enumerate(tokens) if matches(word)), 0)
+    start = max(0, first - words // 3)
+    window = tokens[start:start + words]
+
+    highlighted = [f"{HIGHLIGHT_START}{word}{HIGHLIGHT_END}" if matches(word) else word for word in window]
+    snippet = " ".join(highlighted)
+    if start > 0:
+        snippet = "..." + snippet
+    if start + words < len(tokens):
+        snippet += "..."
+    return snippet
+
+
+class BM25Index:
+    """
+    Pure-Python BM25 inverted index over grant text fields.
+
+    Used when no database is configured. Documents can be added or removed one at a time,
+    so the index can be maintained incrementally as grants arrive.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc_id: weighted term frequency}
+        self.doc_lengths = {}
+        self.doc_terms = {}
+        self.total_length = 0.0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, doc_id, fields):
+        """
+        Add or replace a document.
+
+        Args:
+            doc_id: Hashable document key (e.g. DataFrame index label)
+            fields (dict): Mapping of column name to text
+        """
+        if doc_id in self.doc_lengths:
+            self.remove(doc_id)
+
+        frequencies = defaultdict(float)
+        length = 0.0
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for term in tokenize(fields.get(field)):
+                frequencies[term] += weight
+                length += weight
+
+        for term, frequency in frequencies.items():
+            self.postings[term][doc_id] = frequency
+
+        self.doc_terms[doc_id] = list(frequencies)
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def remove(self, doc_id):
+        """Remove a document from the index if present."""
+        if doc_id not in self.doc_lengths:
+            return
+
+        for term in self.doc_terms.pop(doc_id):
+            postings = self.postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def search(self, query, limit=20, candidates=None):
+        """
+        Rank documents against a keyword query.
+
+        Args:
+            query (str): Free-text keyword query
+            limit (int): Maximum number of results (all matches if None)
+            candidates (container): Only these doc ids are scored (all if None)
+
+        Returns:
+            list: (doc_id, score) tuples, best match first
+        """
+        terms = tokenize(query)
+        if not terms or not self.doc_lengths:
+            return []
+
+        doc_count = len(self.doc_lengths)
+        average_length = self.total_length / doc_count or 1.0
+        scores = defaultdict(float)
+
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                if candidates is not None and doc_id not in candidates:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit] if limit else ranked
+
+    @classmethod
+    def from_dataframe(cls, grants_df):
+        """Build an index over every row of a grants DataFrame, keyed by index label."""
+        index = cls()
+        fields = [col for col in SEARCH_FIELD_WEIGHTS if col in grants_df.columns]
+        for doc_id, row in zip(grants_df.index, grants_df[fields].to_dict("records")):
+            index.add(doc_id, row)
+        return index
+
+
+def search_dataframe(grants_df, query, limit=None, index=None):
+    """
+    Keyword-search an in-memory grants DataFrame.
+
+    Args:
+        grants_df (pandas.DataFrame): Grants to search
+        query (str): Free-text keyword query
+        limit (int): Maximum number of results (all matches if None)
+        index (BM25Index): Prebuilt index over grants_df, built on the fly if omitted
+
+    Returns:
+        pandas.DataFrame: Matching grants ordered by relevance, with "Relevance" and "Snippet" columns
+    """
+    if grants_df.empty or not tokenize(query):
+        return grants_df.iloc[0:0]
+
+    if index is None:
+        index = BM25Index.from_dataframe(grants_df)
+
+    ranked = index.search(query, limit=limit)
+    if not ranked:
+        return grants_df.iloc[0:0]
+
+    doc_ids = [doc_id for doc_id, _ in ranked]
+    results = grants_df.loc[doc_ids].copy()
+    results["Relevance"] = [score for _, score in ranked]
+
+    terms = tokenize(query)
+    snippet_source = results["Description"] if "Description" in results.columns else results["Title"]
+    results["Snippet"] = [make_snippet(value, terms) for value in snippet_source]
+    return results
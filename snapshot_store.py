@@ -0,0 +1,220 @@
+import os
+import json
+import fcntl
+import logging
+import datetime
+import threading
+import contextlib
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except ImportError:  # pyarrow is optional; snapshots are simply disabled without it
+    pa = None
+    pa_ipc = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Where snapshots live and how many old generations to keep around
+SNAPSHOT_DIR = os.getenv("GRANT_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots"))
+SNAPSHOT_KEEP = int(os.getenv("GRANT_SNAPSHOT_KEEP", "3"))
+
+# Small JSON file pointing at the last good snapshot
+LATEST_POINTER = "LATEST.json"
+
+
+# Serializes snapshot writers within this process; the lockfile covers other processes
+_write_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _exclusive_write():
+    with _write_lock:
+        with open(os.path.join(SNAPSHOT_DIR, ".write.lock"), "w") as lockfile:
+            fcntl.flock(lockfile, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+
+def _pointer_path():
+    return os.path.join(SNAPSHOT_DIR, LATEST_POINTER)
+
+
+def _snapshot_path(generation):
+    return os.path.join(SNAPSHOT_DIR, f"grants-{generation:06d}.arrow")
+
+
+def snapshot_info():
+    """
+    Describe the last good snapshot.
+
+    Returns:
+        dict: generation, path, rows and created_at of the latest snapshot, or None if there is none
+    """
+    try:
+        with open(_pointer_path()) as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not os.path.exists(info.get("path", "")):
+        return None
+    return info
+
+
+def current_generation():
+    """Return the ingest generation of the latest snapshot (0 if none has been written)."""
+    info = snapshot_info()
+    return info["generation"] if info else 0
+
+
+def write_snapshot(grants_df):
+    """
+    Write the processed, tagged corpus to a new versioned snapshot.
+
+    Snapshots are uncompressed Arrow IPC files so they can be memory-mapped on load and
+    individual columns read without touching the rest. The file is written under a
+    temporary name and the LATEST pointer is swapped atomically, so readers never see a
+    partially written snapshot.
+
+    Args:
+        grants_df (pandas.DataFrame): Grants to snapshot
+
+    Returns:
+        str: Path of the new snapshot, or None if nothing was written
+    """
+    if pa is None:
+        logging.warning("pyarrow not installed; skipping grant snapshot")
+        return None
+
+    if grants_df is None or grants_df.empty:
+        logging.warning("Empty DataFrame provided to write_snapshot")
+        return None
+
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+
+        with _exclusive_write():
+            generation = current_generation() + 1
+            created_at = datetime.datetime.now().isoformat(timespec="seconds")
+            path = _snapshot_path(generation)
+
+            table = pa.Table.from_pandas(grants_df, preserve_index=False)
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                b"grant_tracker.generation": str(generation).encode(),
+                b"grant_tracker.created_at": created_at.encode()
+            })
+
+            tmp_path = path + ".tmp"
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa_ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+
+            info = {"generation": generation, "path": path, "rows": table.num_rows, "created_at": created_at}
+            tmp_pointer = _pointer_path() + ".tmp"
+            with open(tmp_pointer, "w") as f:
+                json.dump(info, f)
+            os.replace(tmp_pointer, _pointer_path())
+
+            prune_snapshots()
+
+        logging.info(f"Wrote snapshot generation {generation} with {table.num_rows} grants")
+        return path
+
+    except Exception as e:
+        logging.error(f"Error writing grant snapshot: {str(e)}")
+        return None
+
+
+def load_snapshot(columns=None):
+    """
+    Load the last good snapshot.
+
+    The file is memory-mapped and only the requested columns are converted to pandas,
+    so loading is close to free for narrow reads.
+
+    Args:
+        columns (list): Column names to load (all columns if None)
+
+    Returns:
+        pandas.DataFrame: Snapshot contents, or empty DataFrame if no snapshot is available
+    """
+    if pa is None:
+        return pd.DataFrame()
+
+    info = snapshot_info()
+    if info is None:
+        logging.info("No grant snapshot available")
+        return pd.DataFrame()
+
+    try:
+        with pa.memory_map(info["path"], "r") as source:
+            table = pa_ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select([col for col in columns if col in table.column_names])
+            df = table.to_pandas()
+
+        logging.info(f"Loaded {len(df)} grants from snapshot generation {info['generation']}")
+        return df
+
+    except Exception as e:
+        logging.error(f"Error loading grant snapshot: {str(e)}")
+        return pd.DataFrame()
+
+
+# Last snapshot loaded by shared_snapshot, reused until the LATEST pointer moves
+_shared = {"generation": None, "df": None}
+_shared_lock = threading.Lock()
+
+
+def shared_snapshot():
+    """
+    Load the last good snapshot once per generation and share it across the process.
+
+    Streamlit reruns the whole app script on every interaction and for every session;
+    they all get the same DataFrame until a new generation is written, so callers must
+    not modify it in place.
+
+    Returns:
+        pandas.DataFrame: Snapshot contents, or empty DataFrame if no snapshot is available
+    """
+    return shared_snapshot_with_generation()[1]
+
+
+def shared_snapshot_with_generation():
+    """
+    Like shared_snapshot, but also return the generation the DataFrame was loaded from,
+    so structures derived from it can be cached under the same key.
+
+    Returns:
+        tuple: (generation, pandas.DataFrame); generation is 0 if no snapshot is available
+    """
+    generation = current_generation()
+    with _shared_lock:
+        if _shared["generation"] != generation:
+            _shared.update(generation=generation, df=load_snapshot())
+        return _shared["generation"], _shared["df"]
+
+
+def prune_snapshots(keep=SNAPSHOT_KEEP):
+    """Delete all but the newest `keep` snapshot files."""
+    try:
+        snapshots = sorted(
+            name for name in os.listdir(SNAPSHOT_DIR)
+            if name.startswith("grants-") and name.endswith(".arrow")
+        )
+    except OSError:
+        return
+
+    for name in snapshots[:-keep] if keep > 0 else []:
+        try:
+            os.remove(os.path.join(SNAPSHOT_DIR, name))
+        except OSError as e:
+            logging.warning(f"Could not remove old snapshot {name}: {str(e)}")
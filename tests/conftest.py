@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+import pytest
+
+# database reads these at import time, so point it at a throwaway SQLite file first
+_TEST_DIR = tempfile.mkdtemp(prefix="grant-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DIR, 'grants.db')}")
+os.environ.setdefault("GRANT_SNAPSHOT_DIR", os.path.join(_TEST_DIR, "snapshots"))
+os.environ.setdefault("GRANT_RELEVANCE_MODEL", os.path.join(_TEST_DIR, "relevance.joblib"))
+os.environ.setdefault("GRANT_NOTIFY_QUEUE", os.path.join(_TEST_DIR, "notifications.db"))
+os.environ.setdefault("GRANT_QUARANTINE_FILE", os.path.join(_TEST_DIR, "quarantine", "rejected.jsonl"))
+os.environ.setdefault("GRANT_QUERY_STATS", os.path.join(_TEST_DIR, "query_stats.json"))
+
+from sqlalchemy import func, inspect, select, text  # noqa: E402
+
+import database  # noqa: E402
+from benchmarks.corpus import make_corpus  # noqa: E402
+from grant_processor import process_grants, tag_grants  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def tagged_corpus():
+    return tag_grants(process_grants(make_corpus(1000)))
+
+
+@pytest.fixture
+def clean_database():
+    """The test database with every table created and emptied."""
+    assert database.create_tables()
+    tables = set(inspect(database.engine).get_table_names())
+    with database.engine.begin() as connection:
+        if "grants_fts" in tables:
+            connection.execute(text("DELETE FROM grants_fts"))
+        for table in reversed(database.Base.metadata.sorted_tables):
+            connection.execute(table.delete())
+    return database.engine
+
+
+def make_grants(rows, deadline, prefix="G"):
+    """Tagged grants with distinct Grant IDs, all closing at deadline."""
+    grants_df = tag_grants(process_grants(make_corpus(rows))).copy()
+    grants_df["Grant ID"] = [f"{prefix}-{position}" for position in range(rows)]
+    grants_df["Deadline"] = deadline
+    return grants_df
+
+
+def count(model):
+    """Rows in a model's table."""
+    with database.engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(model)).scalar()
@@ -0,0 +1,107 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+import alerts
+import notifications
+from alerts import AlertIndex, AlertLog, add_saved_search, build_digest, load_saved_searches, process_ingest
+from tests.conftest import count
+
+NOW = datetime.datetime(2026, 3, 1)
+
+
+def grant(grant_id, tags="Geography:NY|Topic:Tech", amount=100000, days=30, title="Tech training grant"):
+    return {
+        "Grant ID": grant_id, "Title": title, "Funder": "NY State", "Description": "Workforce programs",
+        "Award Amount": amount, "Deadline": NOW + datetime.timedelta(days=days),
+        "Link": f"https://example.org/{grant_id}", "Tags": tags
+    }
+
+
+class RecordingDispatcher:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    def enqueue_email(self, recipient, subject, body):
+        if self.fail:
+            raise OSError("queue unavailable")
+        self.sent.append((recipient, subject, body))
+
+    def enqueue_slack(self, channel, message):
+        self.sent.append((channel, None, message))
+
+
+@pytest.fixture
+def dispatcher(clean_database, monkeypatch):
+    recording = RecordingDispatcher()
+    monkeypatch.setattr(notifications, "get_dispatcher", lambda: recording)
+    return recording
+
+
+def test_index_checks_every_condition():
+    searches = pd.DataFrame([
+        {"id": 1, "tags": "Geography:NY|Topic:Tech", "min_award": 50000, "max_award": None,
+         "deadline_within_days": 60, "keywords": "training"},
+        {"id": 2, "tags": None, "min_award": None, "max_award": 10000,
+         "deadline_within_days": None, "keywords": None},
+    ])
+    grants_df = pd.DataFrame([
+        grant("match"),
+        grant("other-tag", tags="Geography:NY|Topic:Health"),
+        grant("too-small", amount=1000),
+        grant("too-late", days=90),
+        grant("no-keyword", title="Tech equipment grant"),
+    ])
+
+    matches = AlertIndex(searches).match(grants_df, now=NOW)
+    assert [g["Grant ID"] for g in matches[1]] == ["match"]
+    # The untagged search is checked against every grant
+    assert [g["Grant ID"] for g in matches[2]] == ["too-small"]
+
+
+def test_grants_are_alerted_once(dispatcher):
+    add_saved_search("NY tech", "a@example.org", tags=["Geography:NY", "Topic:Tech"])
+    grants_df = pd.DataFrame([grant("G-1"), grant("G-2")])
+
+    assert process_ingest(grants_df) == 1
+    assert process_ingest(grants_df) == 0
+    assert process_ingest(pd.DataFrame([grant("G-2"), grant("G-3")])) == 1
+    assert count(AlertLog) == 3
+    assert "G-3" in dispatcher.sent[-1][2] and "G-2" not in dispatcher.sent[-1][2]
+
+
+def test_failed_enqueue_leaves_matches_unalerted(dispatcher):
+    add_saved_search("NY tech", "a@example.org", tags=["Geography:NY"])
+    grants_df = pd.DataFrame([grant("G-1")])
+
+    dispatcher.fail = True
+    with pytest.raises(OSError):
+        process_ingest(grants_df)
+    assert count(AlertLog) == 0
+
+    dispatcher.fail = False
+    assert process_ingest(grants_df) == 1
+    assert count(AlertLog) == 1
+
+
+def test_digest_groups_searches_per_subscriber(clean_database, monkeypatch):
+    monkeypatch.setattr(alerts, "DIGEST_MAX_GRANTS", 2)
+    first = add_saved_search("NY tech", "a@example.org", tags=["Geography:NY"])
+    second = add_saved_search("Big awards", "a@example.org", min_award=50000)
+    third = add_saved_search("Team", "#grants", channel="slack")
+    searches = AlertIndex(load_saved_searches()).searches
+
+    digests = build_digest(searches, {
+        first: [grant("G-1"), grant("G-2"), grant("G-3")],
+        second: [grant("G-1")],
+        third: [grant("G-4")],
+    })
+    assert set(digests) == {("email", "a@example.org"), ("slack", "#grants")}
+
+    subject, body = digests[("email", "a@example.org")]
+    assert subject == "Grant alerts: 4 new matching grants"
+    assert "NY tech (3 new)" in body and "Big awards (1 new)" in body
+    assert "... and 1 more" in body
+    assert "$100,000, due 2026-03-31" in body
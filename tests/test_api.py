@@ -0,0 +1,61 @@
+import asyncio
+
+import pandas as pd
+
+from api import GrantApi, GrantCatalog
+from tests.conftest import make_grants
+
+
+def call(app, path, query="", headers=()):
+    """Run one GET through the ASGI app; returns (status, headers, body)."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+        "headers": [(name.encode(), value.encode()) for name, value in headers]
+    }
+    asyncio.run(app(scope, receive, send))
+    return messages[0]["status"], dict(messages[0]["headers"]), messages[1]["body"]
+
+
+def test_search_total_is_the_same_on_every_page(tagged_corpus):
+    catalog = GrantCatalog(tagged_corpus, "test")
+    first = catalog.search("workforce training", {"tag": []}, limit=50)
+    assert first["next_cursor"]
+
+    second = catalog.search("workforce training", {"tag": []}, cursor=first["next_cursor"], limit=50)
+    assert second["total"] == first["total"]
+    assert not {grant["Grant ID"] for grant in first["grants"]} & {grant["Grant ID"] for grant in second["grants"]}
+
+
+def test_filtered_search_reaches_weak_matches():
+    grants_df = make_grants(1500, pd.Timestamp("2027-06-30"))
+    grants_df["Title"] = "Widget fund"
+    grants_df["Description"] = "Support"
+    grants_df["Award Amount"] = 100
+    # The only grants over the award filter are the weakest matches in a large result set
+    grants_df.loc[grants_df.index[-20:], "Description"] = "Support for community programs " * 30
+    grants_df.loc[grants_df.index[-20:], "Award Amount"] = 50000
+    catalog = GrantCatalog(grants_df, "test")
+
+    result = catalog.search("widget", {"tag": [], "min_award": 10000}, limit=100)
+    assert result["total"] == 20
+    assert {grant["Grant ID"] for grant in result["grants"]} == set(grants_df["Grant ID"].iloc[-20:])
+
+
+def test_not_modified_only_for_valid_requests(tagged_corpus):
+    app = GrantApi(GrantCatalog(tagged_corpus, "test"))
+    status, headers, _ = call(app, "/grants", "limit=5")
+    assert status == 200
+    etag = headers[b"etag"].decode()
+
+    assert call(app, "/grants", "limit=5", [("if-none-match", etag)])[0] == 304
+    assert call(app, "/nowhere", "", [("if-none-match", etag)])[0] == 404
+    assert call(app, "/grants", "min_award=lots", [("if-none-match", etag)])[0] == 400
+    assert call(app, "/search", "q=grant&tag=broken", [("if-none-match", "*")])[0] == 400
@@ -0,0 +1,96 @@
+import time
+import datetime
+
+from sqlalchemy import create_engine, select, update
+
+import database
+from database import ArchivedGrant, Grant
+from snapshot_store import load_snapshot
+from tests.conftest import count, make_grants
+
+
+def expire_all_grants():
+    """Move every deadline into the past, as if the grants had closed since they were saved."""
+    with database.engine.begin() as connection:
+        connection.execute(update(Grant).values(deadline=datetime.datetime.now() - datetime.timedelta(days=1)))
+
+
+def test_sweep_reingest_sweep(clean_database):
+    next_month = datetime.datetime.now() + datetime.timedelta(days=30)
+    first = make_grants(40, next_month, prefix="A")
+    assert database.save_grants_to_db(first)
+    expire_all_grants()
+    assert database.sweep_expired_grants() == 40
+
+    # The sources still list the closed grants; they must not come back or re-fire listeners
+    changed = []
+    database.register_ingest_listener(changed.append)
+    try:
+        stale = first.assign(Deadline=datetime.datetime.now() - datetime.timedelta(days=1))
+        assert database.save_grants_to_db(stale)
+    finally:
+        database.unregister_ingest_listener(changed.append)
+    assert changed == []
+    assert count(Grant) == 0
+
+    # New grants may reuse the archived grants' row ids; archiving them again must not collide
+    assert database.save_grants_to_db(make_grants(40, next_month, prefix="B"))
+    expire_all_grants()
+    assert database.sweep_expired_grants() == 40
+    assert count(ArchivedGrant) == 80
+    with database.engine.connect() as connection:
+        keys = connection.execute(select(ArchivedGrant.grant_id)).scalars().all()
+    assert len(set(keys)) == 80
+
+
+def test_sweep_snapshot_reads_the_primary(clean_database, tmp_path, monkeypatch):
+    next_month = datetime.datetime.now() + datetime.timedelta(days=30)
+    assert database.save_grants_to_db(make_grants(30, next_month))
+    with database.engine.begin() as connection:
+        connection.execute(
+            update(Grant).where(Grant.grant_id.in_([f"G-{position}" for position in range(10)]))
+            .values(deadline=datetime.datetime.now() - datetime.timedelta(days=1))
+        )
+
+    # A replica that has not caught up with the sweep yet: a copy of the primary taken before it
+    replica_path = tmp_path / "replica.db"
+    with database.engine.connect() as connection:
+        connection.exec_driver_sql(f"VACUUM INTO '{replica_path}'")
+    replica = create_engine(f"sqlite:///{replica_path}")
+    monkeypatch.setattr(database, "replica_engines", [replica])
+    monkeypatch.setitem(database._replica_health, id(replica), {"healthy": True, "checked_at": time.monotonic()})
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_WINDOW", 0)
+    assert database.read_engine() is replica
+
+    assert database.sweep_expired_grants() == 10
+    assert len(load_snapshot()) == 20
+
+
+def test_new_grant_does_not_continue_a_deleted_grants_revisions(clean_database):
+    next_month = datetime.datetime.now() + datetime.timedelta(days=30)
+    first = make_grants(1, next_month, prefix="A")
+    assert database.save_grants_to_db(first)
+    assert database.save_grants_to_db(first.assign(Title="Renamed"))
+    expire_all_grants()
+    assert database.sweep_expired_grants() == 1
+
+    assert database.save_grants_to_db(make_grants(1, next_month, prefix="B"))
+    history = database.grant_history("B-0")
+    assert history[["Revision", "Kind"]].values.tolist() == [[1, "insert"]]
+    assert database.grant_history("A-0")["Revision"].tolist() == [1, 2]
+
+
+def test_search_falls_back_to_the_primary_when_the_replica_is_down(clean_database, tmp_path, monkeypatch):
+    next_month = datetime.datetime.now() + datetime.timedelta(days=30)
+    assert database.save_grants_to_db(make_grants(30, next_month))
+
+    # A replica whose database cannot be opened
+    replica = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    monkeypatch.setattr(database, "replica_engines", [replica])
+    monkeypatch.setitem(database._replica_health, id(replica), {"healthy": True, "checked_at": time.monotonic()})
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_WINDOW", 0)
+    assert database.read_engine() is replica
+
+    results = database.search_grants("workforce training", limit=5)
+    assert len(results) == 5
+    assert database._replica_health[id(replica)]["healthy"] is False
@@ -0,0 +1,56 @@
+import json
+import logging
+
+import pytest
+
+import grants_gov_schema
+from grants_gov_schema import decode_search_response, extract_opportunities
+
+
+@pytest.fixture(autouse=True)
+def fresh_extractors(monkeypatch):
+    monkeypatch.setattr(grants_gov_schema, "_extractors", {})
+    monkeypatch.setattr(grants_gov_schema, "_last_mapping", None)
+
+
+def hits(count, **extra):
+    return [{"oppNum": f"OPP-{position}", "title": f"Opportunity {position}", **extra} for position in range(count)]
+
+
+def test_fields_first_seen_late_are_mapped():
+    records = hits(30)
+    records[25]["awardCeiling"] = "$50,000"
+    extracted = extract_opportunities({"oppHits": records})
+    assert extracted[25]["Award Amount"] == 50000.0
+    assert extracted[0]["Award Amount"] is None
+
+
+def test_unmapped_fields_do_not_make_new_shapes(caplog):
+    extract_opportunities({"oppHits": hits(5)})
+    with caplog.at_level(logging.WARNING):
+        for position in range(10):
+            extract_opportunities({"oppHits": hits(5, **{f"trackingField{position}": 1})})
+    assert len(grants_gov_schema._extractors) == 1
+    assert "schema drift" not in caplog.text
+
+
+def test_changed_mapping_is_reported_as_drift(caplog):
+    extract_opportunities({"oppHits": hits(5)})
+    renamed = [{"oppNum": record["oppNum"], "opportunityTitle": record["title"]} for record in hits(5)]
+    with caplog.at_level(logging.WARNING):
+        extracted = extract_opportunities({"oppHits": renamed})
+    assert extracted[0]["Title"] == "Opportunity 0"
+    assert "schema drift" in caplog.text and "title -> opportunityTitle" in caplog.text
+
+
+def test_typed_and_generic_decoding_agree():
+    records = hits(3, agency={"name": "Department of Energy"}, oppStatus="posted", awardCeiling=1000)
+    records[1]["agency"] = "NSF"
+    content = json.dumps({"oppHits": records}).encode()
+
+    generic = extract_opportunities(json.loads(content))
+    typed = decode_search_response(content)
+    # The generic path leaves out columns the response has no field for
+    assert [{column: record[column] for column in extracted} for record, extracted in zip(typed, generic)] == generic
+    assert generic[0]["Funder"] == "Department of Energy"
+    assert generic[1]["Funder"] == "NSF"
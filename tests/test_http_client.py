@@ -0,0 +1,99 @@
+import time
+
+import pytest
+import requests
+
+import http_client
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b""
+
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def session(monkeypatch):
+    http_client.reset_breakers()
+    sleeps = []
+    monkeypatch.setattr(http_client.time, "sleep", sleeps.append)
+
+    def install(*outcomes):
+        fake = FakeSession(outcomes)
+        fake.sleeps = sleeps
+        monkeypatch.setattr(http_client, "get_session", lambda: fake)
+        return fake
+
+    yield install
+    http_client.reset_breakers()
+
+
+def open_breaker(host):
+    breaker = http_client.get_breaker(host)
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+    breaker.failures = breaker.failure_threshold
+    return breaker
+
+
+def test_unexpected_error_ends_the_half_open_trial(session):
+    session(requests.TooManyRedirects("loop"), FakeResponse(200))
+    breaker = open_breaker("example.org")
+
+    with pytest.raises(requests.TooManyRedirects):
+        http_client.get("https://example.org/grants")
+    assert not breaker.trial_in_flight
+
+    # After the next reset timeout another trial is let through and closes the circuit
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout
+    assert http_client.get("https://example.org/grants").status_code == 200
+    assert breaker.opened_at is None
+
+
+def test_failing_response_hook_ends_the_half_open_trial(session):
+    session(FakeResponse(200))
+    breaker = open_breaker("example.org")
+
+    def broken_hook(method, url, response):
+        raise RuntimeError("hook failed")
+
+    http_client.add_response_hook(broken_hook)
+    try:
+        with pytest.raises(RuntimeError):
+            http_client.get("https://example.org/grants")
+    finally:
+        http_client.remove_response_hook(broken_hook)
+    assert not breaker.trial_in_flight
+
+
+def test_long_retry_after_is_not_slept_on(session):
+    fake = session(FakeResponse(503, {"Retry-After": "86400"}), FakeResponse(200))
+    response = http_client.get("https://example.org/grants")
+    assert response.status_code == 503
+    assert fake.calls == 1
+    assert fake.sleeps == []
+
+
+def test_short_retry_after_is_honoured(session):
+    fake = session(FakeResponse(429, {"Retry-After": "2"}), FakeResponse(200))
+    assert http_client.get("https://example.org/grants").status_code == 200
+    assert fake.sleeps == [2.0]
+
+
+def test_post_is_not_resent_after_a_server_error(session):
+    fake = session(FakeResponse(503), FakeResponse(200))
+    assert http_client.post("https://example.org/grants").status_code == 503
+    assert fake.calls == 1
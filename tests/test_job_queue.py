@@ -0,0 +1,103 @@
+import datetime
+
+import pytest
+
+import job_queue
+from connectors import GrantConnector, register_connector
+from database import IngestJob
+from tests.conftest import count
+
+
+@register_connector
+class QueueTestConnector(GrantConnector):
+    name = "queue-test"
+    interval = 3600
+
+    def fetch_records(self):
+        return []
+
+
+SOURCE = [QueueTestConnector.name]
+T0 = datetime.datetime(2026, 1, 1, 12, 0)
+
+
+def later(seconds):
+    return T0 + datetime.timedelta(seconds=seconds)
+
+
+@pytest.fixture
+def queue(clean_database):
+    return clean_database
+
+
+def test_enqueue_is_duplicate_free(queue):
+    assert job_queue.enqueue_jobs(SOURCE, now=T0) == 1
+    assert job_queue.enqueue_jobs(SOURCE, now=T0) == 0
+    job = job_queue.claim_job("worker-a", now=T0)
+    # Still running: no second job for the same key
+    assert job_queue.enqueue_jobs(SOURCE, now=T0) == 0
+    assert count(IngestJob) == 1
+    assert job["source"] == "queue-test"
+
+
+def test_a_job_is_claimed_once(queue):
+    job_queue.enqueue_jobs(SOURCE, now=T0)
+    job = job_queue.claim_job("worker-a", now=T0)
+    assert job is not None and job["attempts"] == 1
+    assert job_queue.claim_job("worker-b", now=T0) is None
+
+
+def test_expired_lease_is_requeued_and_the_stale_token_rejected(queue):
+    job_queue.enqueue_jobs(SOURCE, now=T0)
+    stale = job_queue.claim_job("worker-a", now=T0)
+
+    # Still leased: nobody else can take it
+    assert job_queue.claim_job("worker-b", now=later(job_queue.JOB_LEASE_SECONDS - 1)) is None
+
+    fresh = job_queue.claim_job("worker-b", now=later(job_queue.JOB_LEASE_SECONDS + 1))
+    assert fresh["id"] == stale["id"]
+    assert fresh["attempts"] == 2
+    assert fresh["lease_token"] != stale["lease_token"]
+
+    # The first worker woke up after losing its lease; nothing it does sticks
+    assert not job_queue.heartbeat(stale, now=later(job_queue.JOB_LEASE_SECONDS + 2))
+    assert not job_queue.complete_job(stale, {"status": "ok"}, now=later(job_queue.JOB_LEASE_SECONDS + 2))
+    assert not job_queue.fail_job(stale, "boom", now=later(job_queue.JOB_LEASE_SECONDS + 2))
+    assert job_queue.complete_job(fresh, {"status": "ok"}, now=later(job_queue.JOB_LEASE_SECONDS + 3))
+
+
+def test_lease_expiry_fails_the_job_once_out_of_attempts(queue):
+    job_queue.enqueue_jobs(SOURCE, now=T0)
+    now = T0
+    for _ in range(job_queue.JOB_MAX_ATTEMPTS):
+        assert job_queue.claim_job("worker-a", now=now) is not None
+        now += datetime.timedelta(seconds=job_queue.JOB_LEASE_SECONDS + 1)
+    assert job_queue.claim_job("worker-a", now=now) is None
+    assert job_queue.queue_status()["counts"] == {"failed": 1}
+
+
+def test_failed_run_is_retried_after_a_backoff(queue):
+    job_queue.enqueue_jobs(SOURCE, now=T0)
+    job = job_queue.claim_job("worker-a", now=T0)
+    assert job_queue.fail_job(job, "boom", now=T0)
+    assert job_queue.claim_job("worker-a", now=later(job_queue.JOB_RETRY_BACKOFF - 1)) is None
+    assert job_queue.claim_job("worker-a", now=later(job_queue.JOB_RETRY_BACKOFF))["attempts"] == 2
+
+
+def test_a_failed_source_waits_its_interval_before_a_new_job(queue):
+    job_queue.enqueue_jobs(SOURCE, now=T0)
+    job = job_queue.claim_job("worker-a", now=T0)
+    job["attempts"] = job["max_attempts"]
+    assert job_queue.fail_job(job, "boom", now=T0)
+    assert job_queue.queue_status()["counts"] == {"failed": 1}
+
+    assert job_queue.enqueue_jobs(SOURCE, due_only=True, now=later(60)) == 0
+    assert job_queue.enqueue_jobs(SOURCE, due_only=True, now=later(QueueTestConnector.interval + 1)) == 1
+
+
+def test_a_done_source_waits_its_interval(queue):
+    job_queue.enqueue_jobs(SOURCE, now=T0)
+    job = job_queue.claim_job("worker-a", now=T0)
+    assert job_queue.complete_job(job, {"status": "ok"}, now=T0)
+    assert job_queue.enqueue_jobs(SOURCE, due_only=True, now=later(60)) == 0
+    assert job_queue.enqueue_jobs(SOURCE, due_only=True, now=later(QueueTestConnector.interval + 1)) == 1
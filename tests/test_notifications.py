@@ -0,0 +1,136 @@
+import json
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import notifications
+import utils
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class CollectingHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    handler = CollectingHandler()
+    port = free_port()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    monkeypatch.setenv("SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(port))
+    monkeypatch.setenv("SMTP_USERNAME", "grants@example.org")
+    monkeypatch.setenv("SMTP_PASSWORD", "")
+    monkeypatch.setenv("SMTP_STARTTLS", "false")
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def slack_server(monkeypatch):
+    posted = []
+
+    class SlackStub(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            posted.append((self.path, self.headers["Authorization"], json.loads(body)))
+            payload = json.dumps({"ok": True}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlackStub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(utils, "SLACK_API_URL", f"http://127.0.0.1:{server.server_address[1]}/api")
+    monkeypatch.setenv("SLACK_TOKEN", "xoxb-test")
+    yield posted
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "notifications.db")
+
+
+def test_emails_are_delivered_over_smtp(smtp_server, queue_path):
+    dispatcher = notifications.NotificationDispatcher(queue_path).start()
+    try:
+        dispatcher.enqueue_digest(["a@example.org", "b@example.org", "c@example.org"], "New grants", "Three new grants")
+        assert dispatcher.flush(timeout=10)
+    finally:
+        dispatcher.stop()
+
+    assert sorted(envelope.rcpt_tos[0] for envelope in smtp_server.messages) == ["a@example.org", "b@example.org", "c@example.org"]
+    assert b"Subject: New grants" in smtp_server.messages[0].content
+    assert dispatcher.counts() == {"sent": 3}
+
+
+def test_slack_messages_are_delivered(slack_server, queue_path):
+    dispatcher = notifications.NotificationDispatcher(queue_path).start()
+    try:
+        dispatcher.enqueue_slack("#grants", "Two new grants")
+        assert dispatcher.flush(timeout=10)
+    finally:
+        dispatcher.stop()
+
+    assert slack_server == [("/api/chat.postMessage", "Bearer xoxb-test", {"channel": "#grants", "text": "Two new grants"})]
+    assert dispatcher.counts() == {"sent": 1}
+
+
+def test_unreachable_smtp_server_leaves_emails_queued_for_retry(queue_path, monkeypatch):
+    monkeypatch.setenv("SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(free_port()))
+    monkeypatch.setenv("SMTP_USERNAME", "grants@example.org")
+    dispatcher = notifications.NotificationDispatcher(queue_path).start()
+    try:
+        dispatcher.enqueue_digest(["a@example.org", "b@example.org"], "New grants", "Body")
+        assert dispatcher.flush(timeout=10)
+    finally:
+        dispatcher.stop()
+    assert dispatcher.counts() == {"pending": 2}
+
+
+def test_starting_a_dispatcher_leaves_other_processes_claims_alone(queue_path, monkeypatch):
+    sender = notifications.NotificationDispatcher(queue_path)
+    sender.enqueue_email("a@example.org", "New grants", "Body")
+    claimed = sender._claim("email", 10)
+    assert len(claimed) == 1
+
+    # Another process starts on the same queue while the first is still sending
+    other = notifications.NotificationDispatcher(queue_path)
+    assert other.counts() == {"in_flight": 1}
+    assert other._claim("email", 10) == []
+
+    # Once the claim is older than CLAIM_TIMEOUT its process is presumed dead
+    monkeypatch.setattr(notifications, "CLAIM_TIMEOUT", 0)
+    time.sleep(0.01)
+    assert [row_id for row_id, _, _ in other._claim("email", 10)] == [claimed[0][0]]
+
+    # The first process finishing late does not overwrite the new claim
+    sender._finish([(claimed[0][0], claimed[0][2], None)])
+    assert other.counts() == {"in_flight": 1}
+    other._finish([(claimed[0][0], claimed[0][2], None)])
+    assert other.counts() == {"sent": 1}
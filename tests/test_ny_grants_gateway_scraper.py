@@ -0,0 +1,83 @@
+import pytest
+
+import ny_grants_gateway_scraper as ny
+
+DETAIL_HTML = """
+<html><body><main>
+<p>This program funds workforce training for adults across New York State communities.</p>
+<p>Applications are due by December 31, 2030.</p>
+</main></body></html>
+"""
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+
+def listing(url):
+    return {
+        "Title": f"Grant at {url}", "Funder": "New York State", "Link": url,
+        "Description": ny.PLACEHOLDER_DESCRIPTION, "Eligibility": ny.PLACEHOLDER_ELIGIBILITY,
+        "Deadline": None, "Award Amount": None
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ny.DetailPageCache(str(tmp_path / "details.db"))
+    yield cache
+    cache.close()
+
+
+def test_a_page_that_fails_to_parse_does_not_drop_the_others(cache, monkeypatch):
+    monkeypatch.setattr(ny.http_client, "get", lambda url, **kwargs: FakeResponse(200, DETAIL_HTML if "good" in url else "bad"))
+    parse = ny.parse_detail_page
+
+    def parse_or_fail(html):
+        if html == "bad":
+            raise ValueError("unparseable")
+        return parse(html)
+
+    monkeypatch.setattr(ny, "parse_detail_page", parse_or_fail)
+    listings = [listing("https://example.org/good"), listing("https://example.org/bad")]
+
+    ny.enrich_from_detail_pages(listings, cache=cache)
+    assert listings[0]["Description"].startswith("This program funds")
+    assert listings[1]["Description"] == ny.PLACEHOLDER_DESCRIPTION
+
+
+def test_a_cache_failure_keeps_the_fetched_fields(cache, monkeypatch):
+    monkeypatch.setattr(ny.http_client, "get", lambda url, **kwargs: FakeResponse(200, DETAIL_HTML))
+
+    def locked(*args, **kwargs):
+        raise ny.sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(cache, "put", locked)
+    listings = [listing("https://example.org/good")]
+    ny.enrich_from_detail_pages(listings, cache=cache)
+    assert listings[0]["Description"].startswith("This program funds")
+
+
+def test_not_modified_keeps_the_stored_validators(cache, monkeypatch):
+    url = "https://example.org/good"
+    grant = listing(url)
+    cache.put(url, "stale-fingerprint", {"Description": "Cached description of the program."},
+              etag='"v1"', last_modified="Wed, 01 Jan 2030 00:00:00 GMT")
+
+    sent = {}
+
+    def not_modified(url, headers=None, **kwargs):
+        sent.update(headers)
+        return FakeResponse(304)
+
+    monkeypatch.setattr(ny.http_client, "get", not_modified)
+    ny.enrich_from_detail_pages([grant], cache=cache)
+
+    assert sent["If-None-Match"] == '"v1"'
+    entry = cache.get(url)
+    assert entry["etag"] == '"v1"'
+    assert entry["last_modified"] == "Wed, 01 Jan 2030 00:00:00 GMT"
+    assert grant["Description"] == "Cached description of the program."
@@ -0,0 +1,82 @@
+import datetime
+
+import pytest
+
+import job_queue
+import pipeline
+import refresh_scheduler
+from benchmarks.corpus import make_corpus
+from connectors import GrantConnector, register_connector
+from grant_processor import process_grants, tag_grants
+from quality_rules import filter_low_quality
+from database import Grant
+from tests.conftest import count
+
+
+def test_large_batches_are_processed_in_parallel(clean_database, monkeypatch):
+    raw = make_corpus(300)
+    raw["Deadline"] = (datetime.date.today() + datetime.timedelta(days=30)).isoformat()
+    expected = tag_grants(filter_low_quality(process_grants(raw), quarantine_path=None))
+
+    calls = []
+    parallel = pipeline.process_and_tag_parallel
+
+    def counting_parallel(*args, **kwargs):
+        calls.append(kwargs)
+        return parallel(*args, **kwargs)
+
+    monkeypatch.setattr(pipeline, "PARALLEL_INGEST_MIN_ROWS", 100)
+    monkeypatch.setattr(pipeline, "INGEST_WORKERS", 2)
+    monkeypatch.setattr(pipeline, "process_and_tag_parallel", counting_parallel)
+
+    assert pipeline.ingest_grants(raw) == len(expected)
+    assert calls == [{"workers": 2, "min_rows": 100, "filter_quality": True}]
+    assert count(Grant) == len(expected)
+
+
+def test_parallel_path_filters_before_tagging_like_the_sequential_one():
+    raw = make_corpus(200)
+    # The whole first shard fails the quality rules
+    raw.loc[raw.index[:50], "Description"] = "Tiny."
+    expected = tag_grants(filter_low_quality(process_grants(raw), quarantine_path=None))
+
+    result = pipeline.process_and_tag_parallel(raw, workers=2, chunk_size=50, min_rows=0, filter_quality=True)
+    assert list(result["Grant ID"]) == list(expected["Grant ID"])
+    assert list(result["Tags"]) == list(expected["Tags"])
+
+
+@register_connector
+class StubConnector(GrantConnector):
+    name = "pipeline-test"
+    records = []
+
+    def fetch_records(self):
+        return [dict(record) for record in self.records]
+
+
+@pytest.fixture
+def stub_source(clean_database, monkeypatch, tmp_path):
+    monkeypatch.setattr(refresh_scheduler, "LOCK_DIR", str(tmp_path))
+    raw = make_corpus(5)
+    raw["Deadline"] = (datetime.date.today() + datetime.timedelta(days=30)).isoformat()
+    monkeypatch.setattr(StubConnector, "records", raw.to_dict("records"))
+    return raw
+
+
+def test_run_that_saves_nothing_is_not_a_failure(stub_source, monkeypatch):
+    # Every grant fails the quality rules
+    monkeypatch.setattr(StubConnector, "records", [dict(record, Description="Tiny.") for record in StubConnector.records])
+    assert pipeline.ingest_grants(StubConnector().fetch_dataframe()) == 0
+
+    report = refresh_scheduler.refresh_source(StubConnector.name)
+    assert (report["status"], report["fetched"], report["saved"]) == ("ok", 5, 0)
+
+
+def test_failed_save_fails_the_run(stub_source, monkeypatch):
+    monkeypatch.setattr(pipeline, "save_grants_to_db", lambda grants_df: False)
+    assert pipeline.ingest_grants(StubConnector().fetch_dataframe()) is None
+
+    report = refresh_scheduler.refresh_source(StubConnector.name)
+    assert (report["status"], report["saved"]) == ("failed", 0)
+    job_report = job_queue.run_job({"source": StubConnector.name, "partition": None})
+    assert (job_report["status"], job_report["saved"]) == ("failed", 0)
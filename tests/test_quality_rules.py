@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from quality_rules import is_low_quality_title, score_quality
+
+REAL_TITLES = [
+    "Help America Vote Act Election Security Grants",
+    "Back to Work Initiative",
+    "Next Generation Sequencing Centers",
+    "Healthy Home Production Program",
+    "Homelessness Prevention Grant",
+]
+
+NAVIGATION_TITLES = ["Home", "Help", "Next »", "« Back", "Register", "Click here to apply", "NYSGGPortal Login"]
+
+
+@pytest.mark.parametrize("title", REAL_TITLES)
+def test_real_titles_pass(title):
+    assert not is_low_quality_title(title)
+    assert not score_quality(pd.DataFrame({"Title": [title]}), ["title_keyword"])["title_keyword"].iat[0]
+
+
+@pytest.mark.parametrize("title", NAVIGATION_TITLES)
+def test_navigation_titles_are_rejected(title):
+    assert is_low_quality_title(title)
+    assert score_quality(pd.DataFrame({"Title": [title]}), ["title_keyword"])["title_keyword"].iat[0]
@@ -0,0 +1,47 @@
+import json
+
+import query_planner
+
+
+def corpus(keyword, size):
+    return [{"Grant ID": f"{keyword}-{position}", "Title": f"{keyword.title()} energy program"} for position in range(size)]
+
+
+class FakeSearch:
+    """Keyword search that only honours the first `honoured` terms of an OR query."""
+
+    def __init__(self, hits, honoured=None):
+        self.hits = hits
+        self.honoured = honoured
+        self.queries = []
+
+    def __call__(self, query):
+        self.queries.append(query)
+        terms = [term.strip('"') for term in query.split(" OR ")][:self.honoured]
+        return [record for term in terms for record in self.hits[term]]
+
+
+def write_stats(path, hits):
+    path.write_text(json.dumps({"keywords": {keyword: {"hits": count, "runs": 1} for keyword, count in hits.items()}}))
+
+
+def test_partly_honoured_or_query_is_split(tmp_path):
+    stats_path = tmp_path / "stats.json"
+    write_stats(stats_path, {"solar": 10, "wind": 10})
+    search = FakeSearch({"solar": corpus("solar", 10), "wind": corpus("wind", 10)}, honoured=1)
+
+    records = query_planner.run_planned_search(["solar", "wind"], search, 100, stats_path=str(stats_path))
+    assert search.queries == ["solar OR wind", "solar", "wind"]
+    assert {record["Grant ID"] for record in records} == {f"{keyword}-{position}" for keyword in ("solar", "wind") for position in range(10)}
+
+
+def test_requests_saved_is_never_negative(tmp_path):
+    stats_path = tmp_path / "stats.json"
+    write_stats(stats_path, {"solar": 1, "wind": 1})
+    # More hits than last time: the merged query comes back full and is split
+    search = FakeSearch({"solar": corpus("solar", 2), "wind": corpus("wind", 2)})
+
+    records = query_planner.run_planned_search(["solar", "wind"], search, 4, stats_path=str(stats_path))
+    assert len(search.queries) == 3 and len(records) == 4
+    run = query_planner.load_query_stats(str(stats_path))["runs"][-1]
+    assert (run["requests"], run["saved"]) == (3, 0)
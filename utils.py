@@ -1,14 +1,152 @@
 import os
 import smtplib
-import requests
 import logging
+import http_client
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 
+# Timeout for Slack API calls, in seconds
+SLACK_TIMEOUT = 10
+
+# Slack Web API base URL; point it at a local mock for testing
+SLACK_API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api").rstrip("/")
+
+# Timeout for SMTP connections, in seconds
+SMTP_TIMEOUT = 30
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+
+def smtp_settings():
+    """Read SMTP configuration from the environment."""
+    return {
+        "server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
+        "port": int(os.getenv("SMTP_PORT", "587")),
+        "username": os.getenv("SMTP_USERNAME", ""),
+        "password": os.getenv("SMTP_PASSWORD", ""),
+        # Disable for local SMTP stand-ins that do not offer TLS
+        "starttls": os.getenv("SMTP_STARTTLS", "true").lower() not in ("0", "false", "no")
+    }
+
+
+def build_email(sender, recipient, subject, body, attachment=None, attachment_name=None):
+    """Build a plain-text email with an optional attachment."""
+    # Create a multipart message
+    msg = MIMEMultipart()
+    msg["From"] = sender
+    msg["To"] = recipient
+    msg["Subject"] = subject
+    
+    # Add body to email
+    msg.attach(MIMEText(body, "plain"))
+    
+    # Add attachment if provided
+    if attachment and attachment_name:
+        attachment_part = MIMEApplication(attachment)
+        attachment_part.add_header(
+            "Content-Disposition", 
+            f"attachment; filename={attachment_name}"
+        )
+        msg.attach(attachment_part)
+    
+    return msg
+
+
+def open_smtp_connection(settings):
+    """Connect to the SMTP server, upgrade to TLS and log in according to settings."""
+    server = smtplib.SMTP(settings["server"], settings["port"], timeout=SMTP_TIMEOUT)
+    try:
+        if settings["starttls"]:
+            server.starttls()
+        if settings["password"]:
+            server.login(settings["username"], settings["password"])
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def send_emails(messages):
+    """
+    Send a batch of emails over one authenticated SMTP connection.
+    
+    The connection is opened, upgraded to TLS and authenticated once for the whole batch.
+    If the server drops it mid-batch, it is reopened once and sending continues. If a
+    connection cannot be opened at all, the rest of the batch fails with that error
+    without further attempts, so a down server costs one timeout rather than one per message.
+    
+    Parameters:
+    - messages: List of dicts with recipient, subject, body and optional attachment/attachment_name
+    
+    Returns:
+    - List with one entry per message: None if it was sent, otherwise the error text
+    """
+    settings = smtp_settings()
+    
+    # The username doubles as the From address; a password is only needed if the server requires login
+    if not settings["username"]:
+        logging.error("SMTP credentials not configured. Email sending is disabled.")
+        return ["SMTP credentials not configured"] * len(messages)
+    
+    results = []
+    server = None
+    reconnected = False
+    connect_error = None
+    try:
+        for message in messages:
+            if connect_error is not None:
+                results.append(connect_error)
+                continue
+            msg = build_email(
+                settings["username"], message["recipient"], message["subject"], message["body"],
+                message.get("attachment"), message.get("attachment_name")
+            )
+            try:
+                if server is None:
+                    server = open_smtp_connection(settings)
+            except Exception as e:
+                connect_error = str(e)
+                logging.error(f"Could not connect to SMTP server, failing {len(messages) - len(results)} emails: {connect_error}")
+                results.append(connect_error)
+                continue
+            try:
+                server.send_message(msg)
+                results.append(None)
+            except smtplib.SMTPServerDisconnected as e:
+                server = None
+                if reconnected:
+                    results.append(str(e))
+                    continue
+                reconnected = True
+                try:
+                    server = open_smtp_connection(settings)
+                except Exception as retry_error:
+                    connect_error = str(retry_error)
+                    logging.error(f"Could not reconnect to SMTP server, failing {len(messages) - len(results)} emails: {connect_error}")
+                    results.append(connect_error)
+                    continue
+                try:
+                    server.send_message(msg)
+                    results.append(None)
+                except Exception as retry_error:
+                    server = None
+                    results.append(str(retry_error))
+            except Exception as e:
+                results.append(str(e))
+    finally:
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+    
+    sent = results.count(None)
+    logging.info(f"Sent {sent} of {len(messages)} emails in one SMTP session")
+    return results
+
+
 def send_email(recipient, subject, body, attachment=None, attachment_name=None):
     """
     Send an email with optional attachment.
@@ -24,41 +162,18 @@ def send_email(recipient, subject, body, attachment=None, attachment_name=None):
     - Boolean indicating success or failure
     """
     try:
-        # Get email configuration from environment variables
-        smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
-        smtp_port = int(os.getenv("SMTP_PORT", "587"))
-        smtp_username = os.getenv("SMTP_USERNAME", "")
-        smtp_password = os.getenv("SMTP_PASSWORD", "")
+        error = send_emails([{
+            "recipient": recipient,
+            "subject": subject,
+            "body": body,
+            "attachment": attachment,
+            "attachment_name": attachment_name
+        }])[0]
         
-        # If credentials are missing, log an error and return
-        if not smtp_username or not smtp_password:
-            logging.error("SMTP credentials not configured. Email sending is disabled.")
+        if error:
+            logging.error(f"Error sending email: {error}")
             return False
         
-        # Create a multipart message
-        msg = MIMEMultipart()
-        msg["From"] = smtp_username
-        msg["To"] = recipient
-        msg["Subject"] = subject
-        
-        # Add body to email
-        msg.attach(MIMEText(body, "plain"))
-        
-        # Add attachment if provided
-        if attachment and attachment_name:
-            attachment_part = MIMEApplication(attachment)
-            attachment_part.add_header(
-                "Content-Disposition", 
-                f"attachment; filename={attachment_name}"
-            )
-            msg.attach(attachment_part)
-        
-        # Connect to server and send email
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.starttls()
-            server.login(smtp_username, smtp_password)
-            server.send_message(msg)
-        
         logging.info(f"Email sent successfully to {recipient}")
         return True
         
@@ -100,10 +215,11 @@ def send_slack(channel, message, file_content=None, file_name=None):
             "text": message
         }
         
-        message_response = requests.post(
-            "https://slack.com/api/chat.postMessage",
+        message_response = http_client.post(
+            f"{SLACK_API_URL}/chat.postMessage",
             headers=headers,
-            json=message_data
+            json=message_data,
+            timeout=SLACK_TIMEOUT
         )
         
         if not message_response.json().get("ok", False):
@@ -118,10 +234,11 @@ def send_slack(channel, message, file_content=None, file_name=None):
                 "initial_comment": (None, "Here's the grant data you requested.")
             }
             
-            file_response = requests.post(
-                "https://slack.com/api/files.upload",
+            file_response = http_client.post(
+                f"{SLACK_API_URL}/files.upload",
                 headers={"Authorization": f"Bearer {slack_token}"},
-                files=files
+                files=files,
+                timeout=SLACK_TIMEOUT
             )
             
             if not file_response.json().get("ok", False):